@@ -1,4 +1,6 @@
 from enum import Enum
+from typing import FrozenSet, Optional
+
 from app.data.database.components import Component, ComponentType, get_objs_using
 
 class SkillTags(Enum):
@@ -23,6 +25,10 @@ class SkillTags(Enum):
 class SkillComponent(Component):
     skill = None
     ignore_conditional = False
+    # Aspects of the skill, unit and item that this component's condition reads
+    # (e.g. 'data', 'mana', 'equipment'). None means it could read anything,
+    # so its result is recalculated whenever the game state changes
+    condition_dependencies: Optional[FrozenSet[str]] = None
 
 def get_skills_using(expose: ComponentType, value, db) -> list:
     return get_objs_using(db.skills.values(), expose, value)
@@ -24,12 +24,13 @@ from app.engine import engine
 from app.utilities import utils, static_random
 from app.utilities.typing import Pos
 from app.engine.source_type import SourceType
+from app.engine.utils.ltcache import Alteration
 
 def alters_game_state(func):
     @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        func(*args, **kwargs)
-        game.on_alter_game_state()
+    def wrapper(self, *args, **kwargs):
+        func(self, *args, **kwargs)
+        game.on_alter_game_state(self.get_alterations())
     return wrapper
 
 def wrap_do_exec_reverse(_cls):
@@ -61,6 +62,13 @@ class Action():
     def reverse(self):
         pass
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        """Which objects this action changes, and in what aspect,
+        so that only the cached hook results that depend on them are dropped.
+        None (the default) means anything could have changed.
+        """
+        return None
+
     def __repr__(self):
         s = "%s: " % self.__class__.__name__
         for attr in self.__dict__.items():
@@ -121,6 +129,31 @@ class Action():
             setattr(self, name, self.restore_obj(value))
         return self
 
+def restore_records(records: List[tuple], schemas: List[tuple]) -> List[Action]:
+    """
+    Restores actions from the compact records made by action_codec,
+    the same as Action.restore would from their serialized form
+    """
+    classes = [getattr(sys.modules[__name__], name) for name, _ in schemas]
+
+    def restore_value(kind: str, value):
+        if kind == 'generic':
+            return value
+        elif kind == 'list':
+            return [restore_value(k, v) for k, v in value]
+        elif kind == 'action':
+            return restore_record(value)
+        return Action.restore_obj((kind, value))
+
+    def restore_record(record: tuple) -> Action:
+        cls = classes[record[0]]
+        self = cls.__new__(cls)
+        for (name, kind), value in zip(schemas[record[0]][1], record[1:]):
+            setattr(self, name, restore_value(kind, value))
+        return self
+
+    return [restore_record(record) for record in records]
+
 def recalc_unit(unit):
     # Currently Equipped Item may have changed
     unit.autoequip()
@@ -204,6 +237,12 @@ class Move(Action):
         game.arrive(self.unit, self.old_pos)
         self.unit.movement_left = self.prev_movement_left
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        if isinstance(self, SimpleMove) or type(self) not in (Move, CantoMove):
+            return None
+        # Terrain and aura skills are added and removed with their own actions
+        return [(self.unit, 'position'), (self.unit, 'movement')]
+
 # Just another name for move
 class CantoMove(Move):
     pass
@@ -336,6 +375,12 @@ class QuickArrive(Action):
     def reverse(self):
         game.leave(self.unit, self.test)
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        if not self.test:
+            return None
+        # Testing adds terrain and aura skills directly
+        return [(self.unit, 'position'), (self.unit, 'skills')]
+
 class QuickLeave(Action):
     """
     Similar to LeaveMap, but doesn't do the Fog of War changes
@@ -350,10 +395,18 @@ class QuickLeave(Action):
         game.leave(self.unit, self.test)
         if self.keep_position:
             self.unit.position = self.old_pos
+            if not self.test:
+                # Still on the map while it moves, so it can still be found near its position
+                game.board.unit_index.add_moving(self.unit)
 
     def reverse(self):
         game.arrive(self.unit, self.old_pos, self.test)
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        if not self.test:
+            return None
+        return [(self.unit, 'position'), (self.unit, 'skills')]
+
 
 class ArriveOnMap(Action):
     """
@@ -506,11 +559,17 @@ class MarkActionGroupStart(Action):
         self.unit = unit
         self.state = state
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        return []
+
 
 class MarkActionGroupEnd(Action):
     def __init__(self, state: str):
         self.state = state
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        return []
+
 
 class ChangePhaseMusic(Action):
     def __init__(self, phase, music):
@@ -584,6 +643,9 @@ class SetMovementLeft(Action):
     def reverse(self):
         self.unit.movement_left = self.old_val
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        return [(self.unit, 'movement')]
+
 class Wait(Action):
     def __init__(self, unit):
         self.unit = unit
@@ -1671,12 +1733,14 @@ class AddSkillComponent(Action):
         if component.defines('init'):
             component.init(self.skill)
         self._did_add = True
+        SkillObject.components_changed()
 
     def reverse(self):
         if self._did_add:
             self.skill.components.remove_key(self.component_nid)
             del self.skill.__dict__[self.component_nid]
             self._did_add = False
+            SkillObject.components_changed()
 
 class ModifySkillComponent(Action):
     def __init__(self, skill, component_nid, new_component_value, component_property=None, additive: bool = False):
@@ -1728,6 +1792,7 @@ class RemoveSkillComponent(Action):
             self.skill.components.remove_key(self.component_nid)
             del self.skill.__dict__[self.component_nid]
             self._did_remove = True
+            SkillObject.components_changed()
         else:
             logging.warning("remove_skill_component: component with nid %s not found for skill %s", self.component_nid, self.skill)
 
@@ -1740,6 +1805,7 @@ class RemoveSkillComponent(Action):
             # Assign parent to component
             component.skill = self.skill
             self._did_remove = False
+            SkillObject.components_changed()
 
 class SetObjData(Action):
     def __init__(self, obj, keyword, value):
@@ -1757,6 +1823,9 @@ class SetObjData(Action):
         if self.keyword in self.obj.data:
             self.obj.data[self.keyword] = self.old_value
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        return [(self.obj, 'data')]
+
 class SetItemOwner(Action):
     def __init__(self, obj: ItemObject, nid: NID):
         self.obj = obj
@@ -2236,6 +2305,9 @@ class ChangeHP(Action):
     def reverse(self):
         self.unit.set_hp(self.old_hp)
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        return [(self.unit, 'hp')]
+
 class SetName(Action):
     def __init__(self, unit, new_name):
         self.unit = unit
@@ -2316,6 +2388,9 @@ class SetHP(Action):
     def reverse(self):
         self.unit.set_hp(self.old_hp)
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        return [(self.unit, 'hp')]
+
 class ChangeMana(Action):
     def __init__(self, unit, num):
         self.unit = unit
@@ -2328,6 +2403,9 @@ class ChangeMana(Action):
     def reverse(self):
         self.unit.set_mana(self.old_mana)
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        return [(self.unit, 'mana')]
+
 class SetMana(Action):
     def __init__(self, unit, new_mana):
         self.unit = unit
@@ -2340,6 +2418,9 @@ class SetMana(Action):
     def reverse(self):
         self.unit.set_mana(self.old_mana)
 
+    def get_alterations(self) -> Optional[List[Alteration]]:
+        return [(self.unit, 'mana')]
+
 class ChangeFatigue(Action):
     def __init__(self, unit, num):
         self.unit = unit
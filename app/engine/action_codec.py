@@ -0,0 +1,158 @@
+"""
+Compact encoding for saved actions
+
+Works on the serialized form of actions, what Action.save returns:
+(class name, {attribute name: (kind, value)}), where kind is one of
+'unit', 'item', 'skill', 'region', 'list', 'action' or 'generic'.
+
+Most of that form is the same attribute names and kinds over and over,
+so each distinct (class name, ((attribute name, kind), ...)) is written once
+as a schema, and each action becomes a record: a tuple of its schema's index
+followed by its values in order, without their kinds. Lists keep a kind
+for each of their values, and nested actions are records themselves.
+
+Records are made of plain tuples, strings and small integers, which pickle
+stores compactly (small integers take one or two bytes, and the same nid
+string object is only stored once), and loads with its C unpickler,
+so restoring actions from records is faster than from the serialized form.
+
+Binary stream format: MAGIC, version byte, flags byte, then frames.
+Each frame is a length followed by a pickled (new schemas, records) pair,
+compressed with zlib if the flags say so.
+"""
+
+import io
+import pickle
+import struct
+import zlib
+from typing import IO, Any, Dict, Iterator, List, Tuple
+
+MAGIC = b'LTAL'
+VERSION = 1
+FLAG_ZLIB = 1
+# How many records go in each frame of a stream
+FRAME_SIZE = 256
+
+_frame_length = struct.Struct('<I')
+
+SerializedAction = Tuple[str, Dict[str, tuple]]
+# (class name, ((attribute name, kind), ...))
+Schema = Tuple[str, Tuple[Tuple[str, str], ...]]
+# (schema index, value, value, ...)
+Record = tuple
+
+class ActionEncoder():
+    """
+    Turns serialized actions into records, adding to its schemas as it goes
+    """
+    def __init__(self, schemas: List[Schema] = None):
+        self.schemas: List[Schema] = list(schemas) if schemas else []
+        self.schema_index: Dict[Schema, int] = {schema: idx for idx, schema in enumerate(self.schemas)}
+
+    def encode_value(self, saved: tuple) -> Any:
+        kind, value = saved
+        if kind == 'list':
+            return [(v[0], self.encode_value(v)) for v in value]
+        elif kind == 'action':
+            return self.encode(value)
+        return value
+
+    def encode(self, action: SerializedAction) -> Record:
+        name, ser_dict = action
+        schema = (name, tuple([(attr, saved[0]) for attr, saved in ser_dict.items()]))
+        idx = self.schema_index.get(schema)
+        if idx is None:
+            idx = self.schema_index[schema] = len(self.schemas)
+            self.schemas.append(schema)
+        return (idx, *[self.encode_value(saved) for saved in ser_dict.values()])
+
+def _expand_value(kind: str, value: Any, schemas: List[Schema]) -> tuple:
+    if kind == 'list':
+        return ('list', [_expand_value(k, v, schemas) for k, v in value])
+    elif kind == 'action':
+        return ('action', expand(value, schemas))
+    return (kind, value)
+
+def expand(record: Record, schemas: List[Schema]) -> SerializedAction:
+    """Turns a record back into the serialized action it came from"""
+    name, fields = schemas[record[0]]
+    return (name, {attr: _expand_value(kind, value, schemas) for (attr, kind), value in zip(fields, record[1:])})
+
+class ActionLogWriter():
+    """
+    Writes serialized actions to a binary stream.
+    Actions are written out a frame at a time, so close must be called at the end.
+    """
+    def __init__(self, fp: IO[bytes], compress: bool = True):
+        self.fp = fp
+        self.compress = compress
+        self.encoder = ActionEncoder()
+        self.num_written_schemas = 0
+        self.records: List[Record] = []
+        fp.write(MAGIC + bytes((VERSION, FLAG_ZLIB if compress else 0)))
+
+    def write(self, action: SerializedAction):
+        self.records.append(self.encoder.encode(action))
+        if len(self.records) >= FRAME_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.records:
+            return
+        new_schemas = self.encoder.schemas[self.num_written_schemas:]
+        self.num_written_schemas = len(self.encoder.schemas)
+        data = pickle.dumps((new_schemas, self.records), pickle.HIGHEST_PROTOCOL)
+        if self.compress:
+            data = zlib.compress(data)
+        self.fp.write(_frame_length.pack(len(data)) + data)
+        self.records = []
+
+    def close(self):
+        """Writes out the last frame. Does not close the file"""
+        self.flush()
+
+class ActionLogReader():
+    """
+    Reads the actions written by an ActionLogWriter, a frame at a time
+    """
+    def __init__(self, fp: IO[bytes]):
+        self.fp = fp
+        header = fp.read(len(MAGIC) + 2)
+        if len(header) < len(MAGIC) + 2 or header[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not an encoded action log")
+        version, flags = header[len(MAGIC)], header[len(MAGIC) + 1]
+        if version > VERSION:
+            raise ValueError("Action log version %d is newer than this engine supports (%d)" % (version, VERSION))
+        self.compressed = bool(flags & FLAG_ZLIB)
+        self.schemas: List[Schema] = []
+
+    def iter_records(self) -> Iterator[Record]:
+        """Records, which can be expanded with self.schemas (which grow as frames are read)"""
+        while True:
+            length = self.fp.read(_frame_length.size)
+            if not length:
+                return
+            data = self.fp.read(_frame_length.unpack(length)[0])
+            if self.compressed:
+                data = zlib.decompress(data)
+            new_schemas, records = pickle.loads(data)
+            self.schemas.extend(new_schemas)
+            yield from records
+
+    def __iter__(self) -> Iterator[SerializedAction]:
+        for record in self.iter_records():
+            yield expand(record, self.schemas)
+
+def is_encoded(data: bytes) -> bool:
+    return data[:len(MAGIC)] == MAGIC
+
+def encode_actions(actions: List[SerializedAction], compress: bool = True) -> bytes:
+    fp = io.BytesIO()
+    writer = ActionLogWriter(fp, compress)
+    for action in actions:
+        writer.write(action)
+    writer.close()
+    return fp.getvalue()
+
+def decode_actions(data: bytes) -> List[SerializedAction]:
+    return list(ActionLogReader(io.BytesIO(data)))
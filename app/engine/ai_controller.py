@@ -1,22 +1,23 @@
 import logging
-import functools
 import math
-from typing import List, Set
+from typing import Dict, List, Optional, Set, Tuple
 
+import app.engine.config as cf
 from app.constants import FRAMERATE
 from app.data.database.database import DB
 from app.engine import (action, combat_calcs, engine, equations, evaluate,
                         item_funcs, item_system, line_of_sight,
                         skill_system)
 from app.engine.objects.unit import UnitObject
-from app.engine.pathfinding import pathfinding
 from app.engine.combat import interaction
+from app.engine.ai_planning import AIProfile, PositionSnapshot
+from app.engine.combat_forecast import CombatForecastEngine
 from app.engine.game_state import game
 from app.engine.movement import movement_funcs
 from app.events import triggers
 from app.events.regions import RegionType
 from app.utilities import utils
-from app.utilities.typing import Point, Pos
+from app.utilities.typing import NID, Point, Pos
 
 
 class AIController():
@@ -24,6 +25,9 @@ class AIController():
         # Controls whether we should be skipping through the AI's turns
         self.do_skip: bool = False
 
+        # Key: unit nid, Value: profile of the last time the AI thought for that unit
+        self.profiles: Dict[NID, AIProfile] = {}
+
         self.reset()
 
     def skip(self):
@@ -46,6 +50,8 @@ class AIController():
         self.attack_ai_complete = False
         self.canto_ai_complete = False
 
+        self.profile: Optional[AIProfile] = None
+
     def finalize(self):
         # Anything that needs to be done when the AI is finished with the unit
         action.do(action.MarkActionGroupEnd('ai'))
@@ -53,6 +59,17 @@ class AIController():
     def load_unit(self, unit):
         self.reset()
         self.unit = unit
+        self.profile = AIProfile(unit.nid)
+
+    def get_think_budget(self) -> float:
+        """How many milliseconds the AI can spend thinking each frame"""
+        return cf.SETTINGS.get('ai_think_budget', FRAMERATE/2)
+
+    def get_profile_report(self) -> str:
+        return '\n'.join(profile.get_report() for profile in self.profiles.values())
+
+    def clear_profiles(self):
+        self.profiles.clear()
 
     def is_done(self):
         return self.move_ai_complete and \
@@ -114,7 +131,9 @@ class AIController():
             if self.goal_position in witch_warp and self.goal_position not in normal_moves:
                 action.do(action.Warp(self.unit, self.goal_position))
             else:
-                path = game.path_system.get_path(self.unit, self.goal_position)
+                # The valid moves we just looked up already know the shortest path
+                path = game.path_system.get_cached_path(self.unit, self.goal_position) or \
+                    game.path_system.get_path(self.unit, self.goal_position)
                 game.state.change('movement')
                 # If we pass in speed=0 to Move it'll use your unit_speed setting
                 speedup = 10 if self.do_skip else 0
@@ -188,7 +207,7 @@ class AIController():
 
     def canto_retreat(self):
         valid_positions = self.get_true_valid_moves()
-        enemy_positions = {u.position for u in game.units if u.position and skill_system.check_enemy(self.unit, u)}
+        enemy_positions = {u.position for u in game.board.unit_index.get_units() if u.position and skill_system.check_enemy(self.unit, u)}
         self.goal_position = utils.farthest_away_pos(self.unit.position, valid_positions, enemy_positions)
 
     def smart_retreat(self) -> bool:
@@ -231,15 +250,18 @@ class AIController():
 
     def think(self):
         time = engine.get_time()
+        think_start = engine.get_true_time()
         success = False
         self.did_something = False
         orig_pos = self.unit.position
+        budget = self.get_think_budget()
+        self.profile.frames += 1
 
         logging.info("*** AI Thinking... ***")
 
         while True:
-            # Can spend up to half a frame thinking
-            over_time: bool = engine.get_true_time() - time >= FRAMERATE/2
+            # Can spend up to the budget (by default, half a frame) thinking
+            over_time: bool = engine.get_true_time() - time >= budget
             logging.info("Current State: %s", self.state)
 
             if self.state == 'Init':
@@ -326,11 +348,15 @@ class AIController():
             if self.state == 'Done':
                 self.did_something = success
                 self.state = 'Init'
+                self.profile.total_time += (engine.get_true_time() - think_start) / 1000
+                self.profiles[self.unit.nid] = self.profile
+                logging.info(self.profile.get_report())
                 return True
 
             if over_time:
                 break
 
+        self.profile.total_time += (engine.get_true_time() - think_start) / 1000
         return False
 
     def ai_group_ping(self, ai_group):
@@ -341,15 +367,17 @@ class AIController():
                     unit.has_run_ai = False  # So it can be run through the AI state again
 
     def build_primary(self):
-        valid_moves = self.get_true_valid_moves()
-        return PrimaryAI(self.unit, valid_moves, self.behaviour)
+        with self.profile.timed('pathing'):
+            valid_moves = self.get_true_valid_moves()
+        return PrimaryAI(self.unit, valid_moves, self.behaviour, self.profile)
 
     def build_secondary(self):
-        return SecondaryAI(self.unit, self.behaviour)
+        return SecondaryAI(self.unit, self.behaviour, self.profile)
 
 class PrimaryAI():
-    def __init__(self, unit: UnitObject, valid_moves: Set[Pos], behaviour):
+    def __init__(self, unit: UnitObject, valid_moves: Set[Pos], behaviour, profile: AIProfile = None):
         self.max_tp = 0
+        self.profile = profile or AIProfile(unit.nid)
 
         self.unit: UnitObject = unit
         self.orig_pos = self.unit.position
@@ -386,8 +414,11 @@ class PrimaryAI():
         logging.info("Testing Items: %s", self.items)
 
         self.item_index = 0
-        self.move_index = 0
         self.target_index = 0
+        self.candidate_index = 0
+        # (order, move, target) for the current item.
+        # Order is the order the candidate was found in, which decides ties
+        self.candidates: List[Tuple[Tuple[int, int], Pos, Pos]] = []
 
         self.valid_moves = list(valid_moves)
         logging.debug(f"Valid Moves: {self.valid_moves}")
@@ -395,18 +426,27 @@ class PrimaryAI():
         self.best_target = None
         self.best_position = None
         self.best_item = None
+        self.best_order = None
+
+        # Nobody else moves while we think
+        self.snapshot = PositionSnapshot(game.units, self.unit)
+        self.enemy_positions: Optional[Set[Pos]] = None
+        # Other units don't change while we think, so forecasts can be shared across the whole decision
+        self.forecasts = CombatForecastEngine()
 
         self.item_setup()
 
     def item_setup(self):
+        self.target_index = 0
+        self.candidate_index = 0
+        self.candidates = []
         if self.item_index < len(self.items):
             item = self.items[self.item_index]
             logging.info("Testing %s" % item)
             if self.unit.can_equip(item):
                 action.do(action.EquipItem(self.unit, item))
-            self.get_all_valid_targets()
-            self.possible_moves = self.get_possible_moves()
-            logging.info(self.possible_moves)
+            with self.profile.timed('targeting'):
+                self.get_all_valid_targets()
 
     def get_all_valid_targets(self):
         item = self.items[self.item_index]
@@ -428,9 +468,34 @@ class PrimaryAI():
         else:
             return []
 
+    def add_candidates(self):
+        """Adds every position we should try striking the current target from"""
+        target = self.valid_targets[self.target_index]
+        with self.profile.timed('targeting'):
+            possible_moves = self.get_possible_moves()
+        logging.info(possible_moves)
+        # If too many legal targets, just try for the best move
+        # Otherwise it spends way too long trying every possible position to strike from
+        if len(self.valid_targets) > 10 and possible_moves:
+            move = utils.farthest_away_pos(self.orig_pos, possible_moves, self.get_enemy_positions())
+            if not move:
+                move = possible_moves[0]
+            possible_moves = [move]
+        for move in possible_moves:
+            order = (self.item_index, len(self.candidates))
+            self.candidates.append((order, move, target))
+
+    def get_enemy_positions(self) -> Set[Pos]:
+        # Other units don't move while we think, so only check once
+        if self.enemy_positions is None:
+            self.enemy_positions = self.snapshot.get_positions(lambda u: skill_system.check_enemy(self.unit, u))
+        return self.enemy_positions
+
     def quick_move(self, move):
-        action.QuickLeave(self.unit, True).do()
-        action.QuickArrive(self.unit, move, True).do()
+        with self.profile.timed('moving'):
+            action.QuickLeave(self.unit, True).do()
+            action.QuickArrive(self.unit, move, True).do()
+        self.profile.positions += 1
 
     def run(self):
         if self.item_index >= len(self.items):
@@ -439,28 +504,21 @@ class PrimaryAI():
                 action.do(action.EquipItem(self.unit, self.orig_item))
             return (True, self.best_target, self.best_position, self.best_item)
 
-        elif self.target_index >= len(self.valid_targets):
-            self.target_index = 0
+        elif self.target_index < len(self.valid_targets):
+            self.add_candidates()
+            self.target_index += 1
+            if self.target_index >= len(self.valid_targets):
+                # Try every candidate from the same position one after another,
+                # so the unit only has to be moved to each position once
+                self.candidates.sort(key=lambda candidate: (candidate[1], candidate[0]))
+
+        elif self.candidate_index >= len(self.candidates):
             self.item_index += 1
             self.item_setup()
 
-        elif self.move_index >= len(self.possible_moves):
-            self.move_index = 0
-            self.target_index += 1
-            self.possible_moves = self.get_possible_moves()
-
         else:
-            target = self.valid_targets[self.target_index]
+            order, move, target = self.candidates[self.candidate_index]
             item = self.items[self.item_index]
-            # If too many legal targets, just try for the best move first
-            # Otherwise it spends way too long trying every possible position to strike from
-            if len(self.valid_targets) > 10:
-                enemy_positions = {u.position for u in game.units if u.position and skill_system.check_enemy(self.unit, u)}
-                move = utils.farthest_away_pos(self.orig_pos, self.possible_moves, enemy_positions)
-                if not move:
-                    move = self.possible_moves[self.move_index]
-            else:
-                move = self.possible_moves[self.move_index]
 
             if self.unit.position != move:
                 self.quick_move(move)
@@ -468,33 +526,36 @@ class PrimaryAI():
             # Check line of sight
             line_of_sight_flag = True
             if DB.constants.value('line_of_sight') and not item_system.ignore_line_of_sight(self.unit, item):
-                item_range = item_funcs.get_range(self.unit, item)
-                if item_range:
-                    max_item_range = max(item_range)
-                    valid_targets = line_of_sight.line_of_sight([move], [target], max_item_range)
-                    if not valid_targets:
+                with self.profile.timed('targeting'):
+                    item_range = item_funcs.get_range(self.unit, item)
+                    if item_range:
+                        max_item_range = max(item_range)
+                        valid_targets = line_of_sight.line_of_sight([move], [target], max_item_range)
+                        if not valid_targets:
+                            line_of_sight_flag = False
+                    else:
                         line_of_sight_flag = False
-                else:
-                    line_of_sight_flag = False
 
             if line_of_sight_flag:
-                self.determine_utility(move, target, item)
-            self.move_index += 1
-            # If too many legal targets, do not bother with every possible move
-            if len(self.valid_targets) > 10:
-                self.move_index = len(self.possible_moves)
+                self.determine_utility(move, target, item, order)
+            self.candidate_index += 1
 
         # Not done yet
         return (False, self.best_target, self.best_position, self.best_item)
 
-    def determine_utility(self, move, target_pos, item):
+    def determine_utility(self, move, target_pos, item, order=None):
         tp = 0
         assert self.unit.position == move
-        if game.target_system.check_target_from_position(self.unit, item, target_pos):
-            main_target_pos, splash = game.target_system.get_target_from_position(self.unit, item, target_pos)
-            tp = self.compute_priority(main_target_pos, splash, move, item)
-
-        target = game.board.get_unit(target_pos)
+        self.profile.candidates += 1
+        with self.profile.timed('targeting'):
+            can_target = game.target_system.check_target_from_position(self.unit, item, target_pos)
+            if can_target:
+                main_target_pos, splash = game.target_system.get_target_from_position(self.unit, item, target_pos)
+        if can_target:
+            with self.profile.timed('scoring'):
+                tp = self.compute_priority(main_target_pos, splash, move, item)
+
+        target = self.snapshot.get_unit(target_pos)
         # Don't target self if I've already moved and I'm not targeting my new position
         if target is self.unit and target_pos != self.unit.position:
             return
@@ -506,15 +567,19 @@ class PrimaryAI():
                 return
 
         logging.info("Choice %.5f - Weapon: %s, Position: %s, Target: %s, Target Position: %s", tp, item, move, target.nid if target else '--', target_pos)
-        if tp > self.max_tp:
+        # Candidates are not tried in the order they were found,
+        # so ties go to whichever was found first
+        if tp > self.max_tp or \
+                (tp == self.max_tp and order is not None and self.best_order is not None and order < self.best_order):
             self.best_target = target_pos
             self.best_position = move
             self.best_item = item
             self.max_tp = tp
+            self.best_order = order
 
     def compute_priority(self, main_target_pos, splash, move, item) -> float:
         tp = 0
-        main_target = game.board.get_unit(main_target_pos)
+        main_target = self.snapshot.get_unit(main_target_pos)
         # Only count main target if it's one of the legal targets
         if main_target and main_target_pos in self.behaviour_targets:
             ai_priority = item_system.ai_priority(self.unit, item, main_target, move)
@@ -533,7 +598,7 @@ class PrimaryAI():
                 tp += ai_priority * ai_priority_multiplier
 
         for splash_pos in splash:
-            target = game.board.get_unit(splash_pos)
+            target = self.snapshot.get_unit(splash_pos)
             # Only count splash target if it's one of the legal targets
             if not target or splash_pos not in self.behaviour_targets:
                 continue
@@ -546,8 +611,9 @@ class PrimaryAI():
                 tp += total_priority
 
             if item_system.damage(self.unit, item):
-                accuracy = utils.clamp(combat_calcs.compute_hit(self.unit, target, item, target.get_weapon(), "attack", (0, 0))/100., 0, 1)
-                raw_damage = combat_calcs.compute_damage(self.unit, target, item, target.get_weapon(), "attack", (0, 0))
+                forecast = self.forecasts.get_forecast(self.unit, item, target, move)
+                accuracy = utils.clamp(forecast.hit/100., 0, 1)
+                raw_damage = forecast.damage
                 lethality = utils.clamp(raw_damage / float(target.get_hp()), 0, 1)
                 ai_priority = 3 if lethality * accuracy >= 1 else lethality * accuracy
                 if skill_system.check_enemy(self.unit, target):
@@ -562,19 +628,20 @@ class PrimaryAI():
         offense_term = 0
         defense_term = 1
 
-        raw_damage = combat_calcs.compute_damage(self.unit, main_target, item, main_target.get_weapon(), "attack", (0, 0))
-        crit_damage = combat_calcs.compute_damage(self.unit, main_target, item, main_target.get_weapon(), "attack", (0, 0), crit=True)
+        forecast = self.forecasts.get_forecast(self.unit, item, main_target, move)
+        raw_damage = forecast.damage
+        crit_damage = forecast.crit_damage
 
         # Damage I do compared to target's current hp
         lethality = utils.clamp(raw_damage / float(main_target.get_hp()), 0, 1)
         crit_lethality = utils.clamp(crit_damage / float(main_target.get_hp()), 0, 1)
         # Accuracy
-        hit_comp = combat_calcs.compute_hit(self.unit, main_target, item, main_target.get_weapon(), "attack", (0, 0))
+        hit_comp = forecast.hit
         if hit_comp:
             accuracy = utils.clamp(hit_comp/100., 0, 1)
         else:
             accuracy = 0
-        crit_comp = combat_calcs.compute_crit(self.unit, main_target, item, main_target.get_weapon(), "attack", (0, 0))
+        crit_comp = forecast.crit
         if crit_comp:
             crit_accuracy = utils.clamp(crit_comp/100., 0, 1)
         else:
@@ -582,22 +649,20 @@ class PrimaryAI():
 
         # Determine if I would get countered
         # Even if I wouldn't get countered, check anyway how much damage I would take
-        target_weapon = main_target.get_weapon()
-        target_damage = combat_calcs.compute_damage(main_target, self.unit, target_weapon, item, "defense", (0, 0))
+        target_damage = forecast.target_damage
         if not target_damage:
             target_damage = 0
         target_damage = utils.clamp(target_damage/main_target.get_hp(), 0, 1)
-        target_accuracy = combat_calcs.compute_hit(main_target, self.unit, target_weapon, item, "defense", (0, 0))
+        target_accuracy = forecast.target_hit
         if not target_accuracy:
             target_accuracy = 0
         target_accuracy = utils.clamp(target_accuracy/100., 0, 1)
         # If I wouldn't get counterattacked, much less important, so multiply by 10 %
-        if not combat_calcs.can_counterattack(self.unit, item, main_target, target_weapon):
+        if not forecast.can_counter:
             target_damage *= 0.3
             target_accuracy *= 0.3
 
-        num_attacks = combat_calcs.compute_attack_phases(self.unit, main_target, item, target_weapon, "attack", (0, 0))
-        num_attacks *= combat_calcs.compute_multiattacks(self.unit, main_target, item, "attack", (0, 0))
+        num_attacks = forecast.num_attacks
         first_strike = lethality * accuracy if lethality >= 1 else 0
 
         if num_attacks > 1 and target_damage >= 1:
@@ -701,9 +766,10 @@ def get_targets(unit, behaviour) -> List[Point]:
     return all_targets
 
 class SecondaryAI():
-    def __init__(self, unit, behaviour):
+    def __init__(self, unit, behaviour, profile: AIProfile = None):
         self.unit = unit
         self.behaviour = behaviour
+        self.profile = profile or AIProfile(unit.nid)
         self.view_range = self.behaviour.view_range
         if self.view_range == -4 or game.ai_group_active(self.unit.ai_group):
             self.view_range = -3  # Try this first
@@ -719,8 +785,6 @@ class SecondaryAI():
 
         movement_group = movement_funcs.get_movement_group(self.unit)
         self.grid = game.board.get_movement_grid(movement_group)
-        self.pathfinder = \
-            pathfinding.AStar(self.unit.position, None, self.grid)
 
         self.widen_flag = False  # Determines if we've widened our search
         self.reset()
@@ -756,12 +820,15 @@ class SecondaryAI():
         if self.available_targets:
             target = self.available_targets.pop()
             # Find a path to the target
-            path = self.get_path(target)
+            with self.profile.timed('pathing'):
+                path = self.get_path(target)
             if not path:
                 logging.info("No valid path to %s.", target)
                 return False, None
             # We found a path
-            tp = self.compute_priority(target, len(path))
+            self.profile.candidates += 1
+            with self.profile.timed('scoring'):
+                tp = self.compute_priority(target, len(path))
             logging.info("Path to %s. -- %s", target, tp)
             if tp > self.max_tp:
                 self.max_tp = tp
@@ -784,27 +851,59 @@ class SecondaryAI():
                 return True, None
         return False, None
 
-    def get_path(self, goal_pos):
-        self.pathfinder.set_goal_pos(goal_pos)
-
+    def get_goal_positions(self, target) -> List[Pos]:
+        """Where the unit could end up to have reached the target"""
         if self.behaviour.target == 'Event':
             adj_good_enough = False
-        elif self.behaviour.target == 'Position' and not game.board.get_unit(goal_pos):
+        elif self.behaviour.target == 'Position' and not game.board.get_unit(target):
             adj_good_enough = False  # Don't move adjacent if it's not necessary
         elif self.behaviour.target == 'Terrain':
             adj_good_enough = False
         else:
             adj_good_enough = True
 
-        limit = self.get_limit()
-        if skill_system.pass_through(self.unit):
-            can_move_through = lambda adj: True
-        else:
-            can_move_through = functools.partial(game.board.can_move_through, self.unit.team)
+        if adj_good_enough:
+            return [target] + list(game.target_system.get_adjacent_positions(target))
+        return [target]
+
+    def get_path(self, target) -> List[Pos]:
+        """
+        Returns the shortest path for the unit to reach the target, with the
+        target end of the path first, just like AStar.process.
+        Returns an empty list if there is no path within the limit
+        """
+        goals = self.get_goal_positions(target)
+        if self.unit.position in goals:
+            return [self.unit.position]
+
+        # One distance field from the unit's position answers for every target,
+        # and is shared with any unit that starts there with the same movement and team.
+        # Distances in it are from each position back to the unit, which follow the same
+        # positions as the paths out from the unit, but count the cost of entering the
+        # unit's position instead of the cost of entering the goal
+        movement_group = movement_funcs.get_movement_group(self.unit)
         max_movement_limit = self.unit.get_movement()
-        path = self.pathfinder.process(can_move_through, adj_good_enough=adj_good_enough, limit=limit, max_movement_limit=max_movement_limit)
-        self.pathfinder.reset()
-        return path
+        pass_through = skill_system.pass_through(self.unit)
+        field = game.board.distance_fields.get_distance_field(
+            movement_group, self.unit.team, [self.unit.position], pass_through, max_movement_limit)
+        cost_array = self.grid.cost_array
+        start_cost = cost_array.costs[cost_array.to_idx(self.unit.position)]
+
+        best_goal, best_cost = None, self.get_limit()
+        for goal in goals:
+            if not self.grid.check_bounds(goal):
+                continue
+            idx = cost_array.to_idx(goal)
+            # The path out has to be able to enter the goal
+            if not cost_array.passable[idx] or cost_array.costs[idx] > max_movement_limit or \
+                    not (pass_through or game.board.can_move_through(self.unit.team, goal)):
+                continue
+            cost = field.get_distance(goal) - start_cost + cost_array.costs[idx]
+            if cost <= best_cost and (best_goal is None or cost < best_cost):
+                best_goal, best_cost = goal, cost
+        if best_goal is None:
+            return []
+        return list(reversed(field.get_path(best_goal)))
 
     def default_priority(self, enemy):
         hp_max = equations.parser.hitpoints(enemy)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Set
+
+from app.utilities.typing import NID, Pos
+
+if TYPE_CHECKING:
+    from app.engine.objects.unit import UnitObject
+
+class PositionSnapshot():
+    """
+    Read-only copy of where every unit on the map is standing,
+    taken when an AI unit starts thinking.
+
+    While the AI thinks, it tries out positions for the thinking unit,
+    but nobody else moves, so lookups of other units can go through
+    the snapshot instead of the live game state.
+    """
+    def __init__(self, units: List[UnitObject], thinking_unit: UnitObject):
+        self.thinking_unit = thinking_unit
+        self.units: Dict[Pos, UnitObject] = {}
+        for unit in units:
+            if unit.position:
+                self.units[unit.position] = unit
+
+    def get_unit(self, pos: Pos) -> Optional[UnitObject]:
+        return self.units.get(pos)
+
+    def get_positions(self, condition) -> Set[Pos]:
+        """Positions of every unit (other than the thinking unit) that satisfies condition"""
+        return {pos for pos, unit in self.units.items() if unit is not self.thinking_unit and condition(unit)}
+
+class AIProfile():
+    """
+    How much work the AI did deciding what one unit should do
+    """
+    categories = ('pathing', 'targeting', 'moving', 'scoring')
+
+    def __init__(self, unit_nid: NID):
+        self.unit_nid = unit_nid
+        self.candidates: int = 0  # Number of (item, target, position) combinations scored
+        self.positions: int = 0  # Number of positions the unit was moved to to try them out
+        self.frames: int = 0
+        self.times: Dict[str, float] = {category: 0. for category in self.categories}
+        self.total_time: float = 0.
+
+    @contextmanager
+    def timed(self, category: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[category] += time.perf_counter() - start
+
+    def get_report(self) -> str:
+        times = ', '.join('%s: %.2f ms' % (category, self.times[category] * 1000) for category in self.categories)
+        return "AI %s: %d candidates at %d positions over %d frames in %.2f ms (%s)" % \
+            (self.unit_nid, self.candidates, self.positions, self.frames, self.total_time * 1000, times)
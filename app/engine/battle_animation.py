@@ -10,42 +10,36 @@ from app.engine import engine, image_mods, item_system, item_funcs, skill_system
 from app.data.resources.combat_anims import CombatAnimation, WeaponAnimation, EffectAnimation
 from app.data.resources.combat_palettes import Palette
 
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, Dict, List, Optional
 import logging
+import queue
+import threading
 
 battle_anim_speed = 1
-battle_anim_registry = {}
 
 class BattleAnimation():
     idle_poses = {'Stand', 'RangedStand', 'TransformStand'}
 
     @classmethod
     def get_anim(cls, combat_anim, weapon_anim, palette_name, palette, unit, item):
-        unique_hash = combat_anim.nid + '_' + weapon_anim.nid + '_' + palette_name + '_' + palette.nid
-        battle_anim = battle_anim_registry.get(unique_hash)
-        if battle_anim:
-            if battle_anim.unit and battle_anim.unit is not unit:
-                # There's already a unit using this animation, just make a new one, I guess
-                battle_anim = cls(weapon_anim, palette_name, palette, unit, item)
-            else:
-                battle_anim.unit = unit
-                battle_anim.item = item
-                battle_anim.clear()
+        unique_hash = get_anim_key(combat_anim, weapon_anim, palette_name, palette)
+        battle_anim = battle_anim_registry.build(unique_hash, partial(cls, weapon_anim, palette_name, palette, None, None))
+        if battle_anim.unit and battle_anim.unit is not unit:
+            # There's already a unit using this animation, so make a new one that shares its frames
+            battle_anim = cls(weapon_anim, palette_name, palette, unit, item, battle_anim.image_directory)
         else:
-            battle_anim = cls(weapon_anim, palette_name, palette, unit, item)
-            battle_anim_registry[unique_hash] = battle_anim
+            battle_anim.unit = unit
+            battle_anim.item = item
+            battle_anim.clear()
         return battle_anim
 
     @classmethod
     def get_effect_anim(cls, effect, palette_name, palette, unit, item):
-        unique_hash = effect.nid + '_' + palette_name + '_' + palette.nid
-        child_effect = battle_anim_registry.get(unique_hash)
-        if child_effect:
-            image_directory = child_effect.image_directory
-            child_effect = cls(effect, palette_name, palette, unit, item, image_directory)
-        else:
-            child_effect = cls(effect, palette_name, palette, unit, item)
-            battle_anim_registry[unique_hash] = child_effect
-        return child_effect
+        unique_hash = get_effect_key(effect, palette_name, palette)
+        child_effect = battle_anim_registry.build(unique_hash, partial(cls, effect, palette_name, palette, None, None))
+        return cls(effect, palette_name, palette, unit, item, child_effect.image_directory)
 
     def __init__(self, anim_prefab: WeaponAnimation, palette_name: str,
                  palette: Palette, unit, item, image_directory: dict = None):
@@ -60,8 +54,9 @@ class BattleAnimation():
         self.current_pose = None
 
         # Load frames as images
-        if not anim_prefab.image and anim_prefab.frames:
-            self.load_full_image()
+        with _sheet_lock:
+            if not anim_prefab.image and anim_prefab.frames:
+                self.load_full_image()
 
         self._transform = anim_prefab.nid in ('Transform', 'Revert')
         self._refresh = anim_prefab.nid.endswith('Refresh')
@@ -301,22 +296,7 @@ class BattleAnimation():
     def get_effect(self, effect_nid: str, enemy: bool = False, pose=None) -> EffectAnimation:
         effect = RESOURCES.combat_effects.get(effect_nid)
         if effect:
-            # Determine effect's palette
-            effect_palette_names = [palette[0] for palette in effect.palettes]
-            effect_palette_nids = [palette[1] for palette in effect.palettes]
-
-            if self.current_palette.nid in effect_palette_nids:
-                palette = self.current_palette
-            elif self.palette_name in effect_palette_names:
-                idx = effect_palette_names.index(self.palette_name)
-                palette_nid = effect_palette_nids[idx]
-                palette = RESOURCES.combat_palettes.get(palette_nid)
-            elif effect.palettes:
-                first_palette_nid = effect.palettes[0][1]
-                palette = RESOURCES.combat_palettes.get(first_palette_nid)
-            else:  # Effect does not have a palette
-                palette = self.current_palette
-
+            palette = get_effect_palette(effect, self.palette_name, self.current_palette)
             child_effect = BattleAnimation.get_effect_anim(effect, self.palette_name, palette, self.unit, self.item)
             right = not self.right if enemy else self.right
             parent = self.parent.partner_anim if enemy else self.parent
@@ -863,6 +843,133 @@ class BattleAnimation():
                 self.screen_dodge_image = None
         return image
 
+class BattleAnimRegistry():
+    """
+    Battle animations with their frames already converted to their palette,
+    least recently used first.
+
+    Once the converted frames take up more than max_bytes, the least
+    recently used animations are thrown away. Animations that are still
+    in use keep their frames; they just have to be converted again the
+    next time they are asked for.
+
+    Animations can be built on the prewarmer thread while the main thread
+    is using the registry. If the main thread asks for an animation that is
+    being built, it waits for it instead of building it a second time.
+    """
+    max_bytes = 64 * 1024 * 1024
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.anims: OrderedDict[str, BattleAnimation] = OrderedDict()
+        self.nbytes: Dict[str, int] = {}
+        self.total_bytes = 0
+        # Key: unique hash, Value: set once the animation is built
+        self.pending: Dict[str, threading.Event] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.anims or key in self.pending
+
+    def __len__(self) -> int:
+        return len(self.anims)
+
+    def get(self, key: str) -> Optional[BattleAnimation]:
+        with self.lock:
+            anim = self.anims.get(key)
+            if anim:
+                self.anims.move_to_end(key)
+            return anim
+
+    def build(self, key: str, make: Callable[[], BattleAnimation]) -> BattleAnimation:
+        """Returns the animation stored under key, making it first if it is not there"""
+        while True:
+            with self.lock:
+                anim = self.anims.get(key)
+                if anim:
+                    self.anims.move_to_end(key)
+                    return anim
+                event = self.pending.get(key)
+                if not event:
+                    event = self.pending[key] = threading.Event()
+                    break
+            # Being built on the other thread
+            event.wait()
+
+        try:
+            anim = make()
+            self._add(key, anim)
+        finally:
+            with self.lock:
+                del self.pending[key]
+            event.set()
+        return anim
+
+    def _add(self, key: str, anim: BattleAnimation):
+        nbytes = sum(image.get_width() * image.get_height() * image.get_bytesize()
+                     for image in anim.image_directory.values())
+        with self.lock:
+            self.anims[key] = anim
+            self.nbytes[key] = nbytes
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes and len(self.anims) > 1:
+                old_key, _ = self.anims.popitem(last=False)
+                self.total_bytes -= self.nbytes.pop(old_key)
+
+    def clear(self):
+        with self.lock:
+            self.anims.clear()
+            self.nbytes.clear()
+            self.total_bytes = 0
+
+class BattleAnimPrewarmer():
+    """
+    Builds battle animations for the registry in the background, in the order they were asked for.
+    The prewarmer thread only lives while there are animations to build.
+    """
+    def __init__(self, registry: BattleAnimRegistry):
+        self.registry = registry
+        self.jobs: queue.Queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    def submit(self, key: str, make: Callable[[], BattleAnimation]):
+        if key in self.registry:
+            return
+        self.jobs.put((key, make))
+        with self.lock:
+            if not self.thread:
+                self.thread = threading.Thread(target=self._run, name='battle_anim_prewarmer', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                if self.jobs.empty():
+                    self.thread = None
+                    return
+            key, make = self.jobs.get()
+            try:
+                self.registry.build(key, make)
+            except Exception as e:
+                logging.exception("Failed to prewarm battle animation %s: %s", key, e)
+            finally:
+                self.jobs.task_done()
+
+    def join(self):
+        self.jobs.join()
+
+battle_anim_registry = BattleAnimRegistry()
+battle_anim_prewarmer = BattleAnimPrewarmer(battle_anim_registry)
+# Held while loading the sheet of an animation prefab,
+# since its frames are shared by every palette
+_sheet_lock = threading.Lock()
+
+def get_anim_key(combat_anim: CombatAnimation, weapon_anim: WeaponAnimation, palette_name: str, palette: Palette) -> str:
+    return combat_anim.nid + '_' + weapon_anim.nid + '_' + palette_name + '_' + palette.nid
+
+def get_effect_key(effect: EffectAnimation, palette_name: str, palette: Palette) -> str:
+    return effect.nid + '_' + palette_name + '_' + palette.nid
+
 def get_palette(anim_prefab: CombatAnimation, unit) -> tuple:
     palettes = anim_prefab.palettes
     palette_names = [palette[0] for palette in palettes]
@@ -891,7 +998,31 @@ def get_palette(anim_prefab: CombatAnimation, unit) -> tuple:
     current_palette = RESOURCES.combat_palettes.get(palette_nid)
     return palette_name, current_palette
 
-def get_battle_anim(unit, item, distance=1, klass=None, default_variant=False, allow_transform=False, allow_revert=False) -> BattleAnimation:
+def get_effect_palette(effect: EffectAnimation, palette_name: str, current_palette: Palette) -> Palette:
+    # Determine effect's palette
+    effect_palette_names = [palette[0] for palette in effect.palettes]
+    effect_palette_nids = [palette[1] for palette in effect.palettes]
+
+    if current_palette.nid in effect_palette_nids:
+        palette = current_palette
+    elif palette_name in effect_palette_names:
+        idx = effect_palette_names.index(palette_name)
+        palette_nid = effect_palette_nids[idx]
+        palette = RESOURCES.combat_palettes.get(palette_nid)
+    elif effect.palettes:
+        first_palette_nid = effect.palettes[0][1]
+        palette = RESOURCES.combat_palettes.get(first_palette_nid)
+    else:  # Effect does not have a palette
+        palette = current_palette
+    return palette
+
+def find_battle_anim(unit, item, distance=1, klass=None, default_variant=False, allow_transform=False, allow_revert=False):
+    """
+    Finds the combat animation, weapon animation and palette the unit would use,
+    and the nids of the spell effects the weapon animation uses.
+    Returns False if the item should use the map animation instead,
+    and None if there is no valid battle animation
+    """
     # klass is when you want to force a class (promotion, for instance)
     # Some items never want to have a battle anim
     if item_system.force_map_anim(unit, item):
@@ -967,6 +1098,7 @@ def get_battle_anim(unit, item, distance=1, klass=None, default_variant=False, a
     # Sanity check to make sure we have a valid spell to use in this animation
     # we don't want to start a battle animation that asks for a spell animation and then not have the 
     # right spell animation to use.
+    effect_nids: List[str] = []
     for pose in weapon_anim.poses:
         script = pose.timeline
         for command in script:
@@ -984,6 +1116,33 @@ def get_battle_anim(unit, item, distance=1, klass=None, default_variant=False, a
                 if effect not in RESOURCES.combat_effects:
                     logging.warning("Could not find spell animation for effect %s in weapon anim %s", effect, weapon_anim_nid)
                     return None
+                effect_nids.append(effect)
+
+    return res, weapon_anim, palette_name, palette, effect_nids
 
+def get_battle_anim(unit, item, distance=1, klass=None, default_variant=False, allow_transform=False, allow_revert=False) -> BattleAnimation:
+    found = find_battle_anim(unit, item, distance, klass, default_variant, allow_transform, allow_revert)
+    if not found:
+        return found
+    res, weapon_anim, palette_name, palette, _ = found
     battle_anim = BattleAnimation.get_anim(res, weapon_anim, palette_name, palette, unit, item)
     return battle_anim
+
+def prewarm_battle_anim(unit, item, distance=1, allow_transform=False):
+    """
+    Starts building the battle animation the unit would use with this item,
+    and the spell effects it uses, on the prewarmer thread, so that
+    get_battle_anim finds them already built when the combat starts
+    """
+    found = find_battle_anim(unit, item, distance, allow_transform=allow_transform)
+    if not found:
+        return
+    res, weapon_anim, palette_name, palette, effect_nids = found
+    battle_anim_prewarmer.submit(get_anim_key(res, weapon_anim, palette_name, palette),
+                                 partial(BattleAnimation, weapon_anim, palette_name, palette, None, None))
+    for effect_nid in effect_nids:
+        effect = RESOURCES.combat_effects.get(effect_nid)
+        effect_palette = get_effect_palette(effect, palette_name, palette)
+        if effect_palette:
+            battle_anim_prewarmer.submit(get_effect_key(effect, palette_name, effect_palette),
+                                         partial(BattleAnimation, effect, palette_name, effect_palette, None, None))
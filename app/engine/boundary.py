@@ -1,6 +1,6 @@
 from app.engine.objects.unit import UnitObject
-from app.utilities.typing import Color3, NID, Point
-from typing import Dict, Tuple
+from app.utilities.typing import Color3, NID, Point, Pos
+from typing import Dict, FrozenSet, Optional, Set, Tuple
 from app.constants import TILEWIDTH, TILEHEIGHT
 
 from app.data.database.database import DB
@@ -39,6 +39,9 @@ class BoundaryInterface():
         self.dictionaries = {'attack': {},
                              'spell': {},
                              'movement': {}}
+        # Key: Unit NID, Value: (position, valid moves, attack ranges) the unit's attacks were last found from
+        # If none of these have changed, neither have its attacks
+        self.attack_keys: Dict[NID, Tuple[Pos, FrozenSet[Pos], tuple]] = {}
 
         self.draw_flag = False
         self.all_on_flag = False
@@ -51,6 +54,8 @@ class BoundaryInterface():
         self.fog_of_war_surf = None
         self.aura_surf = None
         self.should_reset_surf: bool = False
+        # Positions whose tiles need to be redrawn on the display surf
+        self.dirty_positions: Set[Pos] = set()
         self.should_reset_aura_surf: bool = False
         self.frozen: bool = False  # Whether I should update my display surf (generally False, for immediate updates)
 
@@ -100,6 +105,8 @@ class BoundaryInterface():
         for pos in positions:
             grid[pos[0] * self.height + pos[1]].add(nid)
             self.dictionaries[mode][nid].add(pos)
+        if mode != 'movement':
+            self.dirty_positions |= self.dictionaries[mode][nid]
 
     def clear(self, mode=None):
         if mode:
@@ -110,6 +117,7 @@ class BoundaryInterface():
             for x in range(self.width):
                 for y in range(self.height):
                     self.grids[m][x * self.height + y].clear()
+        self.attack_keys.clear()
         self.reset_surf()
         self.reset_fog_of_war()
 
@@ -129,13 +137,22 @@ class BoundaryInterface():
             del self.registered_auras[key]
         self.should_reset_aura_surf = True
 
-    def _add_unit(self, unit):
+    def _get_valid_moves(self, unit) -> Set[Pos]:
         valid_moves = game.path_system.get_valid_moves(unit, force=True)
         if DB.constants.value('zero_move') and unit.get_ai() and not game.ai_group_active(unit.ai_group):
             ai_prefab = DB.ai.get(unit.get_ai())
             guard = ai_prefab.guard_ai()
             if guard:
                 valid_moves = {unit.position}
+        return valid_moves
+
+    def _get_attack_key(self, unit, valid_moves: Set[Pos]) -> Tuple[Pos, FrozenSet[Pos], tuple]:
+        return (unit.position, frozenset(valid_moves), game.target_system.get_attack_ranges(unit))
+
+    def _add_unit(self, unit, valid_moves: Optional[Set[Pos]] = None, attack_key: Optional[tuple] = None):
+        if valid_moves is None:
+            valid_moves = self._get_valid_moves(unit)
+        self.attack_keys[unit.nid] = attack_key or self._get_attack_key(unit, valid_moves)
 
         valid_attacks = game.target_system.get_all_attackable_positions_weapons(unit, valid_moves, force=True)
         valid_spells = game.target_system.get_all_attackable_positions_spells(unit, valid_moves, force=True)
@@ -146,15 +163,34 @@ class BoundaryInterface():
         area_of_influence = {pos for pos in area_of_influence if game.board.check_bounds(pos)}
         self._set(area_of_influence, 'movement', unit.nid)
 
-        self.reset_surf()
-
     def _remove_unit(self, unit):
         for mode, grid in self.grids.items():
             if unit.nid in self.dictionaries[mode]:
                 for (x, y) in self.dictionaries[mode][unit.nid]:
                     grid[x * self.height + y].discard(unit.nid)
+                if mode != 'movement':
+                    self.dirty_positions |= self.dictionaries[mode][unit.nid]
                 # del self.dictionaries[mode][unit.nid]
-        self.reset_surf()
+        self.attack_keys.pop(unit.nid, None)
+
+    def _update_units(self, units):
+        """
+        Finds the attacks of units again, but only for the units
+        whose valid moves or weapon and spell ranges have changed
+        """
+        changed = []
+        for unit in units:
+            if not unit.position:
+                self._remove_unit(unit)
+                continue
+            valid_moves = self._get_valid_moves(unit)
+            attack_key = self._get_attack_key(unit, valid_moves)
+            if self.attack_keys.get(unit.nid) != attack_key:
+                changed.append((unit, valid_moves, attack_key))
+        for unit, _, _ in changed:
+            self._remove_unit(unit)
+        for unit, valid_moves, attack_key in changed:
+            self._add_unit(unit, valid_moves, attack_key)
 
     def recalculate_unit(self, unit: UnitObject):
         if unit.team in self.enemy_teams:
@@ -175,11 +211,7 @@ class BoundaryInterface():
             # Set unit's position to non-existent for a brief momement
             game.board.remove_unit(unit.position, unit)
             unit.position = None
-            for other_unit in other_units:
-                self._remove_unit(other_unit)
-            for other_unit in other_units:
-                if other_unit.position:
-                    self._add_unit(other_unit)
+            self._update_units(other_units)
             unit.position = (x, y)  # Reset it back for future
             game.board.set_unit(unit.position, unit)
 
@@ -194,11 +226,7 @@ class BoundaryInterface():
             other_units = {game.get_unit(nid) for nid in self.grids['movement'][x * self.height + y]}
             other_units = {other_unit for other_unit in other_units if unit.team not in DB.teams.get_allies(other_unit.team)}
 
-            for other_unit in other_units:
-                self._remove_unit(other_unit)
-            for other_unit in other_units:
-                if other_unit.position:
-                    self._add_unit(other_unit)
+            self._update_units(other_units)
 
     # Called when map changes
     def reset(self):
@@ -257,63 +285,99 @@ class BoundaryInterface():
 
         if not self.surf:
             self.surf = engine.create_surface(full_size, transparent=True)
-            for grid_name in self.draw_order:
-                # Check whether we can skip this boundary interface
-                if grid_name == 'attack' and not self.displaying_units:
-                    continue
-                elif grid_name == 'spell' and not self.displaying_units:
-                    continue
-                elif grid_name == 'all_attack' and not self.all_on_flag:
-                    continue
-                elif grid_name == 'all_spell' and not self.all_on_flag:
-                    continue
-
-                if grid_name == 'all_attack' or grid_name == 'attack':
-                    grid = self.grids['attack']
-                else:
-                    grid = self.grids['spell']
-
-                # Remove all units that we shouldn't be able to see from the boundary
-                # Fog of War application
-                if game.get_current_fog_info().is_active or game.board.fog_region_set:
-                    new_grid = []
-                    for cell in grid:
-                        new_grid.append({nid for nid in cell if game.board.in_vision(game.get_unit(nid).position)})
-                else:
-                    new_grid = grid
-
-                for y in range(self.height):
-                    for x in range(self.width):
-                        # Only make boundaries within game board bounds
-                        if not game.board.check_bounds((x, y)):
-                            continue
-
-                        cell = new_grid[x * self.height + y]
-                        if cell:
-                            # Determine whether this tile should have a red display
-                            red_display = False
-                            for nid in cell:
-                                if nid in self.displaying_units:
-                                    red_display = True
-                                    break
-
-                            if grid_name == 'all_attack' and red_display:
-                                continue
-                            if grid_name == 'all_spell' and red_display:
-                                continue
-
-                            if grid_name == 'attack' and not red_display:
-                                continue
-                            if grid_name == 'spell' and not red_display:
-                                continue
-
-                            image = self.create_image(new_grid, x, y, grid_name)
-                            self.surf.blit(image, (x * TILEWIDTH, y * TILEHEIGHT))
+            self._draw_tiles(None)
+            self.dirty_positions.clear()
+        elif self.dirty_positions and not self.frozen:
+            # Only redraw the tiles that changed, and their neighbors, whose edges may have changed
+            positions = set()
+            for (x, y) in self.dirty_positions:
+                positions.update(((x, y), (x, y - 1), (x - 1, y), (x + 1, y), (x, y + 1)))
+            positions = {pos for pos in positions if game.board.check_bounds(pos)}
+            for (x, y) in positions:
+                self.surf.fill((0, 0, 0, 0), (x * TILEWIDTH, y * TILEHEIGHT, TILEWIDTH, TILEHEIGHT))
+            self._draw_tiles(positions)
+            self.dirty_positions.clear()
 
         im = engine.subsurface(self.surf, cull_rect)
         surf.blit(im, (0, 0))
         return surf
 
+    def _get_visible_grid(self, grid, positions: Optional[Set[Pos]]) -> list:
+        """
+        Remove all units that we shouldn't be able to see from the boundary
+        (Fog of War application). Only the cells for positions (and their neighbors)
+        are filtered, or every cell if positions is None
+        """
+        if not (game.get_current_fog_info().is_active or game.board.fog_region_set):
+            return grid
+        visible: Dict[NID, bool] = {}
+
+        def in_vision(nid: NID) -> bool:
+            if nid not in visible:
+                visible[nid] = game.board.in_vision(game.get_unit(nid).position)
+            return visible[nid]
+
+        if positions is None:
+            return [{nid for nid in cell if in_vision(nid)} for cell in grid]
+        new_grid = list(grid)
+        for (x, y) in positions:
+            for (i, j) in ((x, y), (x, y - 1), (x - 1, y), (x + 1, y), (x, y + 1)):
+                if game.board.check_bounds((i, j)):
+                    idx = i * self.height + j
+                    new_grid[idx] = {nid for nid in grid[idx] if in_vision(nid)}
+        return new_grid
+
+    def _draw_tiles(self, positions: Optional[Set[Pos]]):
+        """
+        Draws the boundary tiles at positions onto the display surf,
+        or every tile if positions is None
+        """
+        redraw_all = positions is None
+        if redraw_all:
+            positions = [(x, y) for y in range(self.height) for x in range(self.width)
+                         if game.board.check_bounds((x, y))]  # Only make boundaries within game board bounds
+
+        for grid_name in self.draw_order:
+            # Check whether we can skip this boundary interface
+            if grid_name == 'attack' and not self.displaying_units:
+                continue
+            elif grid_name == 'spell' and not self.displaying_units:
+                continue
+            elif grid_name == 'all_attack' and not self.all_on_flag:
+                continue
+            elif grid_name == 'all_spell' and not self.all_on_flag:
+                continue
+
+            if grid_name == 'all_attack' or grid_name == 'attack':
+                grid = self.grids['attack']
+            else:
+                grid = self.grids['spell']
+
+            new_grid = self._get_visible_grid(grid, None if redraw_all else positions)
+
+            for (x, y) in positions:
+                cell = new_grid[x * self.height + y]
+                if cell:
+                    # Determine whether this tile should have a red display
+                    red_display = False
+                    for nid in cell:
+                        if nid in self.displaying_units:
+                            red_display = True
+                            break
+
+                    if grid_name == 'all_attack' and red_display:
+                        continue
+                    if grid_name == 'all_spell' and red_display:
+                        continue
+
+                    if grid_name == 'attack' and not red_display:
+                        continue
+                    if grid_name == 'spell' and not red_display:
+                        continue
+
+                    image = self.create_image(new_grid, x, y, grid_name)
+                    self.surf.blit(image, (x * TILEWIDTH, y * TILEHEIGHT))
+
     def create_image(self, grid, x, y, grid_name):
         top_pos = (x, y - 1)
         left_pos = (x - 1, y)
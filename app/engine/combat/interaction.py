@@ -13,23 +13,25 @@ from app.engine import config as cf
 from app.engine.objects.unit import UnitObject
 from app.engine.objects.item import ItemObject
 
+def animation_wanted(attacker: UnitObject, defender: UnitObject) -> bool:
+    return cf.SETTINGS['animation'] == 'Always' or \
+        (cf.SETTINGS['animation'] == 'Your Turn' and attacker.team == 'player') or \
+        (cf.SETTINGS['animation'] == 'Combat Only' and skill_system.check_enemy(attacker, defender))
+
+def _get_distance(attacker: UnitObject, defender: UnitObject) -> int:
+    if attacker.position and defender.position:
+        return utils.calculate_distance(attacker.position, defender.position)
+    return 1
+
 def has_animation(attacker: UnitObject, item: ItemObject, main_target: tuple, force_animation=False, force_no_animation=False) -> bool:
     defender: UnitObject = game.board.get_unit(main_target)
     if not defender:
         return False
 
-    def animation_wanted(attacker: UnitObject, defender: UnitObject) -> bool:
-        return cf.SETTINGS['animation'] == 'Always' or \
-            (cf.SETTINGS['animation'] == 'Your Turn' and attacker.team == 'player') or \
-            (cf.SETTINGS['animation'] == 'Combat Only' and skill_system.check_enemy(attacker, defender))
-
     toggle_anim = get_input_manager().is_pressed('START')
     anim = animation_wanted(attacker, defender) != toggle_anim
     if attacker is not defender and (anim or force_animation) and not force_no_animation:
-        if attacker.position and defender.position:
-            distance = utils.calculate_distance(attacker.position, defender.position)
-        else:
-            distance = 1
+        distance = _get_distance(attacker, defender)
         attacker_anim = battle_animation.get_battle_anim(attacker, item, distance)
         def_item = defender.get_weapon()
         defender_anim = battle_animation.get_battle_anim(defender, def_item, distance)
@@ -37,6 +39,20 @@ def has_animation(attacker: UnitObject, item: ItemObject, main_target: tuple, fo
 
     return False
 
+def prewarm_animation(attacker: UnitObject, item: ItemObject, main_target: tuple):
+    """
+    Starts building the battle animations that attacking main_target with item
+    would use in the background, while the player is still choosing the target
+    """
+    defender: UnitObject = game.board.get_unit(main_target)
+    if not defender or attacker is defender or not animation_wanted(attacker, defender):
+        return
+    distance = _get_distance(attacker, defender)
+    for unit, unit_item in ((attacker, item), (defender, defender.get_weapon())):
+        # Animation combat also looks for the transform animation
+        for allow_transform in (False, True):
+            battle_animation.prewarm_battle_anim(unit, unit_item, distance, allow_transform)
+
 def engage(attacker: UnitObject, positions: list, main_item: ItemObject, skip: bool = False, script: list = None,
            total_rounds: int = 1, force_animation: bool = False, force_no_animation: bool = False, arena_combat: bool = False):
     """
@@ -1,3 +1,6 @@
+import functools
+from typing import Dict, Optional
+
 from app.engine.combat_calcs_utils import resolve_defensive_formula, resolve_offensive_formula
 from app.engine.game_state import game
 from app.utilities import utils
@@ -6,6 +9,23 @@ from app.data.database import weapons
 from app.engine import equations, item_system, item_funcs, skill_system, line_of_sight
 from app.engine.combat.utils import resolve_weapon
 
+# While set, the base stat calculations below are memoized in this dict.
+# Only set by the CombatForecastEngine while nothing about the board can change
+_memo: Optional[Dict] = None
+
+def memoized_in_forecast(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        memo = _memo
+        if memo is None:
+            return func(*args, **kwargs)
+        key = (wrapper, args, tuple(sorted(kwargs.items())))
+        if key not in memo:
+            memo[key] = func(*args, **kwargs)
+        return memo[key]
+    return wrapper
+
+@memoized_in_forecast
 def get_weapon_rank_bonus(unit, item):
     weapon_type = item_system.weapon_type(unit, item)
     if not weapon_type:
@@ -23,6 +43,7 @@ def get_weapon_rank_bonus(unit, item):
             best_combat_bonus = combat_bonus
     return best_combat_bonus
 
+@memoized_in_forecast
 def get_support_rank_bonus(unit, target=None):
     from app.engine.game_state import game
 
@@ -68,6 +89,7 @@ def get_support_rank_bonus(unit, target=None):
     bonuses = [_[0] for _ in bonuses]
     return bonuses, allies
 
+@memoized_in_forecast
 def compute_advantage(unit1, unit2, item1, item2, advantage=True):
     if not item1 or not item2:
         return None
@@ -130,6 +152,7 @@ def can_counterattack(attacker, aweapon, defender, dweapon) -> bool:
         return True
     return False
 
+@memoized_in_forecast
 def accuracy(unit, item=None):
     if not item:
         item = unit.get_weapon()
@@ -165,6 +188,7 @@ def accuracy(unit, item=None):
 
     return accuracy
 
+@memoized_in_forecast
 def avoid(unit, item, item_to_avoid=None):
     equation = resolve_defensive_formula(
         unit, item, None, item_to_avoid,
@@ -191,6 +215,7 @@ def avoid(unit, item, item_to_avoid=None):
     avoid += skill_system.modify_avoid(unit, item)
     return avoid
 
+@memoized_in_forecast
 def crit_accuracy(unit, item=None):
     if not item:
         item = unit.get_weapon()
@@ -222,6 +247,7 @@ def crit_accuracy(unit, item=None):
 
     return crit_accuracy
 
+@memoized_in_forecast
 def crit_avoid(unit, item, item_to_avoid=None):
     equation = resolve_defensive_formula(
         unit, item, None, item_to_avoid,
@@ -244,6 +270,7 @@ def crit_avoid(unit, item, item_to_avoid=None):
     avoid += skill_system.modify_crit_avoid(unit, item)
     return avoid
 
+@memoized_in_forecast
 def damage(unit, item=None):
     if not item:
         item = unit.get_weapon()
@@ -275,6 +302,7 @@ def damage(unit, item=None):
 
     return might
 
+@memoized_in_forecast
 def defense(atk_unit, def_unit, item, item_to_avoid=None):
     equation = resolve_defensive_formula(
         def_unit, item, atk_unit, item_to_avoid,
@@ -298,6 +326,7 @@ def defense(atk_unit, def_unit, item, item_to_avoid=None):
     res += skill_system.modify_resist(def_unit, item)
     return res
 
+@memoized_in_forecast
 def attack_speed(unit, item=None):
     if not item:
         item = unit.get_weapon()
@@ -329,6 +358,7 @@ def attack_speed(unit, item=None):
 
     return attack_speed
 
+@memoized_in_forecast
 def defense_speed(unit, item, item_to_avoid=None):
     equation = resolve_defensive_formula(
         unit, item, None, item_to_avoid,
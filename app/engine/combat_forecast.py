@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from app.engine import combat_calcs
+from app.utilities.typing import Pos
+
+if TYPE_CHECKING:
+    from app.engine.objects.item import ItemObject
+    from app.engine.objects.unit import UnitObject
+
+class CombatForecast():
+    """
+    Everything the AI wants to know about one unit attacking a target
+    with an item from a position, calculated together
+    """
+    __slots__ = ['damage', 'crit_damage', 'hit', 'crit',
+                 'target_damage', 'target_hit', 'can_counter', 'num_attacks']
+
+    def __init__(self, damage: Optional[int], crit_damage: Optional[int], hit: Optional[int], crit: Optional[int],
+                 target_damage: Optional[int], target_hit: Optional[int], can_counter: bool, num_attacks: int):
+        self.damage = damage
+        self.crit_damage = crit_damage
+        self.hit = hit
+        self.crit = crit
+        # What the target would do back to the unit
+        self.target_damage = target_damage
+        self.target_hit = target_hit
+        self.can_counter = can_counter
+        # Attack phases times multiattacks
+        self.num_attacks = num_attacks
+
+class CombatForecastEngine():
+    """
+    Computes combat forecasts for the AI.
+
+    Calculating a forecast requires the same attacker and defender stats
+    (accuracy, avoid, damage, defense, weapon triangle, support bonuses, etc.)
+    many times over. While a forecast is being calculated, those base stats are
+    memoized, and the memo is kept for as long as the engine lives, so an
+    engine should only live for the duration of one AI decision, when the only
+    thing that changes is where the deciding unit is standing and what it has equipped.
+    Memos are kept separately for each of those.
+    """
+    def __init__(self):
+        # Key: (position, equipped weapon), Value: memo of base stat calculations
+        self.memos: Dict[Tuple[Pos, Optional[ItemObject]], Dict] = {}
+        # Key: (unit, item, target, position), Value: forecast
+        self.forecasts: Dict[Tuple[UnitObject, ItemObject, UnitObject, Pos], CombatForecast] = {}
+
+    def clear(self):
+        self.memos.clear()
+        self.forecasts.clear()
+
+    def get_forecast(self, unit: UnitObject, item: ItemObject, target: UnitObject, position: Pos) -> CombatForecast:
+        """
+        unit should already be standing at position with its equipment set up for the attack
+        """
+        key = (unit, item, target, position)
+        forecast = self.forecasts.get(key)
+        if forecast is None:
+            memo = self.memos.setdefault((position, unit.equipped_weapon), {})
+            prev_memo = combat_calcs._memo
+            combat_calcs._memo = memo
+            try:
+                forecast = self._compute_forecast(unit, item, target)
+            finally:
+                combat_calcs._memo = prev_memo
+            self.forecasts[key] = forecast
+        return forecast
+
+    def _compute_forecast(self, unit: UnitObject, item: ItemObject, target: UnitObject) -> CombatForecast:
+        target_weapon = target.get_weapon()
+        damage = combat_calcs.compute_damage(unit, target, item, target_weapon, "attack", (0, 0))
+        crit_damage = combat_calcs.compute_damage(unit, target, item, target_weapon, "attack", (0, 0), crit=True)
+        hit = combat_calcs.compute_hit(unit, target, item, target_weapon, "attack", (0, 0))
+        crit = combat_calcs.compute_crit(unit, target, item, target_weapon, "attack", (0, 0))
+
+        target_damage = combat_calcs.compute_damage(target, unit, target_weapon, item, "defense", (0, 0))
+        target_hit = combat_calcs.compute_hit(target, unit, target_weapon, item, "defense", (0, 0))
+        can_counter = combat_calcs.can_counterattack(unit, item, target, target_weapon)
+
+        num_attacks = combat_calcs.compute_attack_phases(unit, target, item, target_weapon, "attack", (0, 0))
+        num_attacks *= combat_calcs.compute_multiattacks(unit, target, item, "attack", (0, 0))
+
+        return CombatForecast(damage, crit_damage, hit, crit, target_damage, target_hit, can_counter, num_attacks)
@@ -158,37 +158,44 @@ def generate_skill_hook_str(hook_name: str, hook_info: HookInfo):
 
     conditional_check = "condition(skill, unit)" if 'item' not in args else 'condition(skill, unit, item)'
     default_handling = "return result"
-    unconditional_handling = ""
+    empty_handling = "return utils.{policy_resolution}([])".format(policy_resolution=hook_info.policy.value)
+    hook_names = "'{hook_name}'".format(hook_name=hook_name)
+    conditional_handling = """
+        if component.ignore_conditional or {conditional_check}:
+            values.append(component.{hook_name}({args}))""".format(hook_name=hook_name, conditional_check=conditional_check, args=', '.join(args))
     cache_handling = ""
     if hook_info.has_default_value:
         default_handling = "return result if values else Defaults.{hook_name}({args})".format(hook_name=hook_name, args=', '.join(args))
+        empty_handling = "return Defaults.{hook_name}({args})".format(hook_name=hook_name, args=', '.join(args))
     if hook_info.has_unconditional:
-        unconditional_handling = """
-            if component.defines('{hook_name}_unconditional'):
-                values.append(component.{hook_name}_unconditional({args}))
-""".format(hook_name=hook_name, args=', '.join(args))
+        # Implementers may define either or both versions of the hook
+        hook_names = "'{hook_name}', '{hook_name}_unconditional'".format(hook_name=hook_name)
+        conditional_handling = """
+        if component.defines('{hook_name}'):
+            if component.ignore_conditional or {conditional_check}:
+                values.append(component.{hook_name}({args}))
+        if component.defines('{hook_name}_unconditional'):
+            values.append(component.{hook_name}_unconditional({args}))""".format(hook_name=hook_name, conditional_check=conditional_check, args=', '.join(args))
     if hook_info.is_cached:
         cache_handling = """
 @ltcached"""
 
     func_text = """{cache_handling}
 def {hook_name}({func_signature}):
+    implementers = unit.get_skill_hook_implementers({hook_names})
+    if not implementers:
+        {empty_handling}
     values = []
-    for skill in unit.skills[:]:
-        for component in skill.components:
-            if component.defines('{hook_name}'):
-                if component.ignore_conditional or {conditional_check}:
-                    values.append(component.{hook_name}({args}))
-{unconditional_handling}
+    for skill, component in implementers:{conditional_handling}
     result = utils.{policy_resolution}(values)
     {default_handling}
 """.format(hook_name=hook_name,
            func_signature=', '.join(func_signature),
-           conditional_check=conditional_check,
-           args=', '.join(args),
+           hook_names=hook_names,
+           empty_handling=empty_handling,
+           conditional_handling=conditional_handling,
            policy_resolution=hook_info.policy.value,
            default_handling=default_handling,
-           unconditional_handling=unconditional_handling,
            cache_handling=cache_handling)
 
     return func_text
@@ -167,7 +167,23 @@ class Defaults():
     def thracia_critical_multiplier_formula(unit) -> str:
         return 'THRACIA_CRIT'
 
-@ltcached
+def _condition_dependencies(skill, unit: UnitObject, item=None):
+    """What the result of condition(skill, unit, item) depends on.
+    Returns None if any of the skill's condition components could read anything"""
+    objs = {skill, unit}
+    aspects = set()
+    if item:
+        objs.add(item)
+    else:
+        aspects.add('equipment')  # Reads the equipped weapon
+    for component in skill.components:
+        if component.defines('condition'):
+            if component.condition_dependencies is None:
+                return None
+            aspects |= component.condition_dependencies
+    return frozenset(objs), frozenset(aspects)
+
+@ltcached(dependencies=_condition_dependencies)
 def condition(skill, unit: UnitObject, item=None) -> bool:
     # print('Checking condition for', skill, unit, item)
     if not item:
@@ -186,30 +202,26 @@ def hidden(skill, unit) -> bool:
 
 def stat_change(unit, stat_nid) -> int:
     bonus = 0
-    for skill in unit.skills:
-        for component in skill.components:
-            if component.defines('stat_change'):
-                d = component.stat_change(unit)
-                d_bonus = d.get(stat_nid, 0)
-                if d_bonus == 0:
-                    continue
-                # Why did we write the component condition check after the evaluation of the bonus?
-                # Was there a good reason?
-                if component.ignore_conditional or condition(skill, unit):
-                    bonus += d_bonus
+    for skill, component in unit.get_skill_hook_implementers('stat_change'):
+        d = component.stat_change(unit)
+        d_bonus = d.get(stat_nid, 0)
+        if d_bonus == 0:
+            continue
+        # Why did we write the component condition check after the evaluation of the bonus?
+        # Was there a good reason?
+        if component.ignore_conditional or condition(skill, unit):
+            bonus += d_bonus
     return bonus
 
 def subtle_stat_change(unit, stat_nid) -> int:
     bonus = 0
-    for skill in unit.skills:
-        for component in skill.components:
-            if component.defines('subtle_stat_change'):
-                d = component.subtle_stat_change(unit)
-                d_bonus = d.get(stat_nid, 0)
-                if d_bonus == 0:
-                    continue
-                if component.ignore_conditional or condition(skill, unit):
-                    bonus += d_bonus
+    for skill, component in unit.get_skill_hook_implementers('subtle_stat_change'):
+        d = component.subtle_stat_change(unit)
+        d_bonus = d.get(stat_nid, 0)
+        if d_bonus == 0:
+            continue
+        if component.ignore_conditional or condition(skill, unit):
+            bonus += d_bonus
     return bonus
 
 def stat_change_contribution(unit, stat_nid) -> dict:
@@ -229,41 +241,33 @@ def stat_change_contribution(unit, stat_nid) -> dict:
 
 def growth_change(unit, stat_nid) -> int:
     bonus = 0
-    for skill in unit.skills:
-        for component in skill.components:
-            if component.defines('growth_change'):
-                if component.ignore_conditional or condition(skill, unit):
-                    d = component.growth_change(unit)
-                    bonus += d.get(stat_nid, 0)
+    for skill, component in unit.get_skill_hook_implementers('growth_change'):
+        if component.ignore_conditional or condition(skill, unit):
+            d = component.growth_change(unit)
+            bonus += d.get(stat_nid, 0)
     return bonus
 
 def unit_sprite_flicker_tint(unit) -> list:
     flicker = []
-    for skill in unit.skills:
-        for component in skill.components:
-            if component.defines('unit_sprite_flicker_tint'):
-                if component.ignore_conditional or condition(skill, unit):
-                    d = component.unit_sprite_flicker_tint(unit, skill)
-                    flicker.append(d)
+    for skill, component in unit.get_skill_hook_implementers('unit_sprite_flicker_tint'):
+        if component.ignore_conditional or condition(skill, unit):
+            d = component.unit_sprite_flicker_tint(unit, skill)
+            flicker.append(d)
     return flicker
 
 def should_draw_anim(unit) -> list:
     avail = []
-    for skill in unit.skills:
-        for component in skill.components:
-            if component.defines('should_draw_anim'):
-                if component.ignore_conditional or condition(skill, unit):
-                    d = component.should_draw_anim(unit, skill)
-                    avail.append(d)
+    for skill, component in unit.get_skill_hook_implementers('should_draw_anim'):
+        if component.ignore_conditional or condition(skill, unit):
+            d = component.should_draw_anim(unit, skill)
+            avail.append(d)
     return avail
 
 def additional_tags(unit) -> set:
     new_tags = set()
-    for skill in unit.skills:
-        for component in skill.components:
-            if component.defines('additional_tags'):
-                if component.ignore_conditional or condition(skill, unit):
-                    new_tags = new_tags | set(component.additional_tags(unit, skill))
+    for skill, component in unit.get_skill_hook_implementers('additional_tags'):
+        if component.ignore_conditional or condition(skill, unit):
+            new_tags = new_tags | set(component.additional_tags(unit, skill))
     return new_tags
 
 def before_crit(actions, playback, attacker, item, defender, item2, mode, attack_info) -> bool:
@@ -12,8 +12,10 @@ def base_config() -> OrderedDict:
                         ('screen_size', 2),
                         ('fullscreen', 0),
                         ('sound_buffer_size', 2),
+                        ('music_cache_mb', 256),
                         ('animation', 'Always'),
                         ('display_fps', 0),
+                        ('ai_think_budget', 8),
                         ('battle_bg', 0),
                         ('unit_speed', 120),
                         ('text_speed', 32),
@@ -221,6 +221,16 @@ def set_colorkey(surf, color, rleaccel=True):
 def make_pixel_array(surf):
     return pygame.PixelArray(surf)
 
+def make_color_mask(surf, color) -> pygame.mask.Mask:
+    """Mask of the pixels in surf that are exactly color, ignoring alpha"""
+    return pygame.mask.from_threshold(surf, color, (1, 1, 1, 255))
+
+def make_transparent_mask(surf) -> pygame.mask.Mask:
+    """Mask of the pixels in surf that are fully transparent (or the colorkey)"""
+    mask = pygame.mask.from_surface(surf, 0)
+    mask.invert()
+    return mask
+
 def draw_line(surf, color, start, end, width=1):
     return pygame.draw.line(surf, color, start, end, width)
 
@@ -237,6 +247,16 @@ def transform_scale(surf, scale):
 def transform_rotate(surf, degrees):
     return pygame.transform.rotate(surf, degrees)
 
+def transform_grayscale(surf, dest=None):
+    if dest:
+        return pygame.transform.grayscale(surf, dest)
+    return pygame.transform.grayscale(surf)
+
+def transform_invert(surf, dest=None):
+    if dest:
+        return pygame.transform.invert(surf, dest)
+    return pygame.transform.invert(surf)
+
 # === event functions ===
 def get_key_name(key_code):
     return pygame.key.name(key_code)
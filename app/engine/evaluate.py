@@ -1,6 +1,9 @@
 import logging
 import math, random, re
-from typing import Any, Dict
+import time
+from collections import ChainMap, OrderedDict
+from types import CodeType
+from typing import Any, Dict, List, Tuple
 
 from app.utilities import utils, static_random
 from app.data.database.database import DB
@@ -17,14 +20,27 @@ Essentially just a repository that imports a lot of different things so that man
 will be accepted
 """
 
-def get_context(unit1=None, unit2=None, position=None,
-                local_args: Dict = None, game=None) -> Dict:
+class EvalContext(dict):
     """
-    Returns the local + global namespace context to be used for evaling expressions
+    Namespace used to eval expressions.
+
+    Only the names specific to this call (unit, target, position, local_args, etc.)
+    are stored in the dict itself. Everything else is looked up in the shared
+    parent layers (the query engine functions, then this module's namespace),
+    so they don't need to be copied on every call.
+    Must be a dict subclass, since eval requires its globals to be a dict.
     """
-    if not game:
-        from app.engine.game_state import game
+    __slots__ = ['parents']
+
+    def __init__(self, local_names: Dict, parents: ChainMap):
+        super().__init__(local_names)
+        self.parents = parents
 
+    def __missing__(self, key):
+        return self.parents[key]
+
+def _get_local_names(unit1=None, unit2=None, position=None,
+                     local_args: Dict = None, game=None) -> Dict:
     def check_pair(s1: str, s2: str) -> bool:
         """
         Determines whether two units are in combat with one another
@@ -47,8 +63,7 @@ def get_context(unit1=None, unit2=None, position=None,
         else:
             return False
 
-    temp_globals = globals().copy()
-    temp_globals.update({
+    local_names = {
         'unit1': unit1,
         'unit': unit1,
         'unit2': unit2,
@@ -58,15 +73,79 @@ def get_context(unit1=None, unit2=None, position=None,
         'check_default': check_default,
         'game': game,
         'target_system': game.target_system,
-    })
+    }
+    if local_args:
+        local_names.update(local_args)
+    return local_names
+
+def get_context(unit1=None, unit2=None, position=None,
+                local_args: Dict = None, game=None) -> Dict:
+    """
+    Returns the local + global namespace context to be used for evaling expressions
+    """
+    if not game:
+        from app.engine.game_state import game
+
+    temp_globals = globals().copy()
     if game:
         temp_globals.update(game.query_engine.func_dict)
-    if local_args:
-        temp_globals.update(local_args)
+    temp_globals.update(_get_local_names(unit1, unit2, position, local_args, game))
     return temp_globals
 
+def get_eval_context(unit1=None, unit2=None, position=None,
+                     local_args: Dict = None, game=None) -> EvalContext:
+    """
+    Same names as get_context, but layered over the shared namespaces instead of copying them
+    """
+    if not game:
+        from app.engine.game_state import game
+
+    if game:
+        parents = ChainMap(game.query_engine.func_dict, globals())
+    else:
+        parents = ChainMap(globals())
+    return EvalContext(_get_local_names(unit1, unit2, position, local_args, game), parents)
+
+# Key: expression as written, Value: compiled code object
+CODE_CACHE_SIZE = 1024
+_code_cache: OrderedDict[str, CodeType] = OrderedDict()
+# Key: expression as written, Value: [number of evaluations, total time spent evaluating in seconds]
+MAX_TRACKED_EXPRESSIONS = 4096
+_expression_stats: Dict[str, List] = {}
+
+def get_code(string: str) -> CodeType:
+    code = _code_cache.get(string)
+    if code is None:
+        code = compile(string.strip(), '<evaluate>', 'eval')
+        _code_cache[string] = code
+        if len(_code_cache) > CODE_CACHE_SIZE:
+            _code_cache.popitem(last=False)
+    else:
+        _code_cache.move_to_end(string)
+    return code
+
+def get_hot_expressions(num: int = 10) -> List[Tuple[str, int, float]]:
+    """
+    Returns the num expressions that have taken the most total time to evaluate,
+    as (expression, number of evaluations, total time in seconds)
+    """
+    stats = sorted(_expression_stats.items(), key=lambda kv: kv[1][1], reverse=True)
+    return [(string, count, total_time) for string, (count, total_time) in stats[:num]]
+
+def clear_expression_stats():
+    _expression_stats.clear()
+
 def evaluate(string: str, unit1=None, unit2=None, position=None,
              local_args: Dict = None, game=None) -> Any:
-    context = get_context(unit1, unit2, position, local_args, game)
-    string = string.strip()
-    return eval(string, context)
+    code = get_code(string)
+    context = get_eval_context(unit1, unit2, position, local_args, game)
+    start = time.perf_counter()
+    try:
+        return eval(code, context)
+    finally:
+        stats = _expression_stats.get(string)
+        if stats is None and len(_expression_stats) < MAX_TRACKED_EXPRESSIONS:
+            stats = _expression_stats[string] = [0, 0.0]
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += time.perf_counter() - start
@@ -3,10 +3,14 @@ from __future__ import annotations
 from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 
 from app.data.database.database import DB
-from app.engine import line_of_sight
+from app.engine.pathfinding.cost_array import CostArray, MovementGrid
+from app.engine.pathfinding.distance_field import DistanceFieldService
 from app.engine.pathfinding.node import Node
+from app.engine.pathfinding.reachability_cache import ReachabilityCache
 from app.engine.game_state import game
+from app.engine.spatial_index import SpatialUnitIndex
 from app.engine.fog_of_war import FogOfWarType
+from app.engine.vision import VisionEngine
 from app.engine.objects.unit import UnitObject
 from app.utilities.grid import Grid, BoundedGrid
 from app.utilities.typing import NID, Pos, UID
@@ -20,6 +24,16 @@ class GameBoard(object):
         self.height: int = tilemap.height
         self.bounds: Tuple[int, int, int, int] = (0, 0, self.width - 1, self.height - 1)
         self.mcost_grids: Dict[NID, Grid[Node]] = {}
+        # Flat copies of the mcost grids used by the pathfinders
+        self.mcost_arrays: Dict[NID, CostArray] = {}
+        # Caches the valid moves of units until the board changes under them
+        self.reachability_cache = ReachabilityCache()
+        # Distance fields and threat maps shared by the AI
+        self.distance_fields = DistanceFieldService(self)
+        # Incremented whenever the opacity of any position changes
+        self.opacity_version: int = 0
+        # What each unit can see through the fog of war
+        self.vision = VisionEngine(self)
 
         self.reset_tile_grids(tilemap)
 
@@ -27,6 +41,8 @@ class GameBoard(object):
         self.team_grid: Grid[List[NID]] = self.initialize_list_grid()
         # Keeps track of which unit occupies which tile
         self.unit_grid: Grid[List[UnitObject]] = self.initialize_list_grid()
+        # Which units are near each other, for neighbourhood queries
+        self.unit_index = SpatialUnitIndex()
 
         # Fog of War -- one for each team
         self.fog_of_war_grids = {}
@@ -48,6 +64,8 @@ class GameBoard(object):
 
     def set_bounds(self, min_x: int, min_y: int, max_x: int, max_y: int):
         self.bounds = (min_x, min_y, max_x, max_y)
+        self.reachability_cache.terrain_changed()
+        self.distance_fields.terrain_changed()
 
     def check_bounds(self, pos: Pos) -> bool:
         return self.bounds[0] <= pos[0] <= self.bounds[2] and self.bounds[1] <= pos[1] <= self.bounds[3]
@@ -70,7 +88,11 @@ class GameBoard(object):
                 mtype_grid.append(terrain.mtype)
         for mode in DB.mcost.unit_types:
             self.mcost_grids[mode] = self.init_movement_grid(mode, tilemap, mtype_grid)
+            self.mcost_arrays[mode] = CostArray.from_grid(self.mcost_grids[mode])
         self.opacity_grid = self.init_opacity_grid(tilemap)
+        self.opacity_changed()
+        self.reachability_cache.terrain_changed()
+        self.distance_fields.terrain_changed()
 
     def reset_pos(self, tilemap, pos: Pos):
         terrain_nid = game.get_terrain_nid(tilemap, pos)
@@ -86,13 +108,18 @@ class GameBoard(object):
                 tile_cost = DB.mcost.get_mcost(movement_group, mtype)
             else:
                 tile_cost = 1
-            mcost_grid.insert(pos, Node(*pos, tile_cost < 99, tile_cost))
+            node = Node(*pos, tile_cost < 99, tile_cost)
+            mcost_grid.insert(pos, node)
+            self.mcost_arrays[movement_group].set_node(pos, node)
 
         # Opacity reset
-        if terrain:
-            self.opacity_grid.insert(pos, terrain.opaque)
-        else:
-            self.opacity_grid.insert(pos, False)
+        opaque = terrain.opaque if terrain else False
+        if opaque != self.opacity_grid.get(pos):
+            self.opacity_grid.insert(pos, opaque)
+            self.opacity_changed(pos)
+
+        self.reachability_cache.terrain_changed()
+        self.distance_fields.terrain_changed()
 
     # For movement
     def init_movement_grid(self, movement_group: NID, tilemap, mtype_grid: Grid[NID]) -> Grid[Node]:
@@ -109,7 +136,10 @@ class GameBoard(object):
         return grid
 
     def get_movement_grid(self, movement_group: NID) -> BoundedGrid[Node]:
-        return self.mcost_grids[movement_group].apply_bounds(self.bounds)
+        grid = self.mcost_grids[movement_group]
+        movement_grid = MovementGrid((self.width, self.height), self.bounds, self.mcost_arrays[movement_group])
+        movement_grid._cells = grid.cells()
+        return movement_grid
 
     def initialize_list_grid(self) -> Grid[List]:
         grid = Grid[List[NID]]((self.width, self.height))
@@ -122,11 +152,18 @@ class GameBoard(object):
         if unit not in self.unit_grid.get(pos):
             self.unit_grid.get(pos).append(unit)
             self.team_grid.get(pos).append(unit.team)
+            self.unit_index.add(unit, pos)
+            self.reachability_cache.occupancy_changed(pos)
+            self.distance_fields.occupancy_changed(unit.team)
 
     def remove_unit(self, pos: Pos, unit: UnitObject):
+        # Also forgets units that were moving
+        self.unit_index.remove(unit)
         if unit in self.unit_grid.get(pos):
             self.unit_grid.get(pos).remove(unit)
             self.team_grid.get(pos).remove(unit.team)
+            self.reachability_cache.occupancy_changed(pos)
+            self.distance_fields.occupancy_changed(unit.team)
 
     def get_unit(self, pos: Pos) -> Optional[UnitObject]:
         if not pos:
@@ -172,19 +209,15 @@ class GameBoard(object):
     # === Fog of War ===
     def update_fow(self, pos: Optional[Pos], unit: UnitObject, sight_range: int):
         """Modifies the state of the fog of war game board to reflect the unit moving to the pos"""
-        grid: Grid[List[UnitObject]] = self.fog_of_war_grids[unit.team]
-        # Remove the old vision
-        self.fow_vantage_point[unit.nid] = None
-        for cell in grid.cells():
-            cell.discard(unit.nid)
-        # Add new vision
+        self.fow_vantage_point[unit.nid] = pos or None
+        extra_range = sight_range - self.get_fog_of_war_radius(unit.team)
+        positions = self.vision.set_sight(unit.nid, unit.team, pos or None, sight_range, extra_range)
         if pos:
-            self.fow_vantage_point[unit.nid] = pos
-            positions = game.target_system.find_manhattan_spheres(range(sight_range + 1), *pos)
-            positions = {pos for pos in positions if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height}
-            for position in positions:
-                grid.get(position).add(unit.nid)
             self._update_previously_visited(positions, unit.team)
+        # Vision only affects movement when there is fog to hide units in
+        if game.get_current_fog_info().is_active or self.fog_region_set:
+            self.reachability_cache.vision_changed()
+            self.distance_fields.vision_changed()
 
     def change_sight_range(self, unit: UnitObject, new_sight_range: int):
         """Modifies the state of the fog of war game board 
@@ -206,11 +239,9 @@ class GameBoard(object):
                     # No need to recheck if we have already visited
                     if position in self.previously_visited_tiles:
                         continue
-                    valid: bool = False  # Can we see the pos?
-                    # We can if any of our allies can see the pos.
-                    for team_nid in DB.teams.get_allies(team):
-                        valid |= line_of_sight.simple_check(position, team_nid, fog_of_war_radius, self.fow_vantage_point)
-                    if valid:
+                    # We can see the pos if any of our allies can see the pos.
+                    if any(self.vision.in_line_of_sight(position, team_nid, fog_of_war_radius)
+                           for team_nid in DB.teams.get_allies(team)):
                         self.previously_visited_tiles.add(position)
             else:
                 for position in positions:
@@ -226,11 +257,15 @@ class GameBoard(object):
             positions = {pos for pos in positions if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height}
             for position in positions:
                 self.fog_regions.get(position).add(region.nid)
+            self.reachability_cache.vision_changed()
+            self.distance_fields.vision_changed()
 
     def remove_fog_region(self, region):
         self.fog_region_set.discard(region.nid)
         for cell in self.fog_regions.cells():
             cell.discard(region.nid)
+        self.reachability_cache.vision_changed()
+        self.distance_fields.vision_changed()
 
     def add_vision_region(self, region):
         if region.position:
@@ -243,10 +278,14 @@ class GameBoard(object):
                 self.vision_regions.get(position).add(region.nid)
                 # Anyone can see a vision region
                 self.previously_visited_tiles.add(position)
+            self.reachability_cache.vision_changed()
+            self.distance_fields.vision_changed()
 
     def remove_vision_region(self, region):
         for cell in self.vision_regions.cells():
             cell.discard(region.nid)
+        self.reachability_cache.vision_changed()
+        self.distance_fields.vision_changed()
 
     def in_vision(self, pos: Tuple[int, int], team: NID = 'player') -> bool:
         # Anybody can see things in vision regions no matter what
@@ -260,11 +299,9 @@ class GameBoard(object):
                 # Since I'm not sure how we'd handle cases where a vision region is obscured by an opaque tile
                 if DB.constants.value('fog_los'):
                     fog_of_war_radius = game.get_current_fog_info().default_radius
-                    valid: bool = False  # Can we see the pos?
-                    # We can if any of our allies can see the pos.
-                    for team_nid in DB.teams.get_allies(team):
-                        valid |= line_of_sight.simple_check(pos, team_nid, fog_of_war_radius, self.fow_vantage_point)
-                    if not valid:
+                    # We can see the pos if any of our allies can see the pos.
+                    if not any(self.vision.in_line_of_sight(pos, team_nid, fog_of_war_radius)
+                               for team_nid in DB.teams.get_allies(team)):
                         return False
                 
                 for team_nid in DB.teams.get_allies(team):
@@ -274,8 +311,7 @@ class GameBoard(object):
             else:
                 if DB.constants.value('fog_los'):
                     fog_of_war_radius = self.get_fog_of_war_radius(team)
-                    valid = line_of_sight.simple_check(pos, team, fog_of_war_radius, self.fow_vantage_point)
-                    if not valid:
+                    if not self.vision.in_line_of_sight(pos, team, fog_of_war_radius):
                         return False
                 grid = self.fog_of_war_grids[team]
                 if grid.get(pos):
@@ -327,6 +363,10 @@ class GameBoard(object):
                     grid.append(False)
         return grid
 
+    def opacity_changed(self, pos: Optional[Pos] = None):
+        self.opacity_version += 1
+        self.vision.opacity_changed(pos)
+
     def get_opacity(self, pos: Pos) -> bool:
         if not pos:
             return False
@@ -103,6 +103,9 @@ class GameState():
 
         # global registries
         self.unit_registry: Dict[NID, UnitObject] = {}
+        self.unit_registry_version: int = 0  # Incremented whenever a unit is registered or unregistered
+        self._registry_order: Dict[NID, int] = {}
+        self._registry_order_key: Tuple[Optional[Dict[NID, UnitObject]], int] = (None, -1)
         self.item_registry: Dict[UID, ItemObject] = {}
         self.skill_registry: Dict[UID, SkillObject] = {}
         self.terrain_status_registry: Dict[Tuple[int, int, NID], UID] = {}
@@ -159,8 +162,8 @@ class GameState():
 
         self.clear()
 
-    def on_alter_game_state(self):
-        ltcache.alter_state()
+    def on_alter_game_state(self, alterations=None):
+        ltcache.alter_state(alterations)
 
     def clear(self):
         self.game_vars = PrimitiveCounter()
@@ -863,13 +866,36 @@ class GameState():
         """
         return list(self.region_registry.values())
 
+    def sort_in_registry_order(self, units: List[UnitObject]) -> List[UnitObject]:
+        """
+        Sorts units into the same order as self.units, so results gathered from
+        somewhere else (like the board's unit index) come out in the same order
+        as they would from going through every unit.
+
+        Args:
+            units (List[UnitObject]): Registered units to sort.
+
+        Returns:
+            List[UnitObject]: The units in the order they were registered in.
+        """
+        if len(units) <= 1:
+            return list(units)
+        registry, version = self._registry_order_key
+        if registry is not self.unit_registry or version != self.unit_registry_version:
+            self._registry_order = {nid: idx for idx, nid in enumerate(self.unit_registry)}
+            self._registry_order_key = (self.unit_registry, self.unit_registry_version)
+        order = self._registry_order
+        return sorted(units, key=lambda unit: order.get(unit.nid, len(order)))
+
     def register_unit(self, unit):
         logging.debug("Registering unit %s as %s", unit, unit.nid)
         self.unit_registry[unit.nid] = unit
+        self.unit_registry_version += 1
 
     def unregister_unit(self, unit):
         logging.debug("Unregistering unit %s as %s", unit, unit.nid)
         del self.unit_registry[unit.nid]
+        self.unit_registry_version += 1
 
     def register_item(self, item):
         logging.debug("Registering item %s as %s", item, item.uid)
@@ -1368,6 +1394,8 @@ class GameState():
         # Board
         if not test:
             self.board.remove_unit(unit.position, unit)
+        else:
+            self.board.unit_index.remove(unit)
         unit.position = None
 
     def remove_terrain_skills(self, unit, test=False):
@@ -1410,6 +1438,8 @@ class GameState():
         unit.position = position
         if not test:
             self.board.set_unit(unit.position, unit)
+        else:
+            self.board.unit_index.add(unit, unit.position)
 
         # Tiles and Terrain Regions
         if not skill_system.ignore_terrain(unit):
@@ -1672,11 +1702,8 @@ def load_level(level_nid, save_loc):
         game = GameState()
     else:
         game.clear()
-    import pickle
-
-    from app.engine import save
-    with open(save_loc, 'rb') as fp:
-        s_dict = pickle.load(fp)
+    from app.engine import save, save_store
+    s_dict = save_store.read_save(save_loc)
     game.load_states(['start_level_asset_loading'])
     game.build_new()
     game.load(s_dict)
@@ -27,7 +27,6 @@ from app.engine.selection_helper import SelectionHelper
 from app.engine.abilities import ABILITIES, PRIMARY_ABILITIES, OTHER_ABILITIES, TradeAbility, SupplyAbility
 from app.engine.input_manager import get_input_manager
 from app.engine.fluid_scroll import FluidScroll
-import threading
 
 import logging
 
@@ -41,8 +40,6 @@ class LoadingState(State):
     def start(self):
         logging.debug("Loading state...")
         self.completed_time = None
-        # magic number, adjust at will
-        self.loading_threads: List[threading.Thread] = []
 
         # unload used assets
         # unload music
@@ -60,12 +57,11 @@ class LoadingState(State):
                 level_songs.add(music_command.parameters.get('Music'))
             for music_command in inspector.find_all_calls_of_command(event_commands.ChangeMusic(), self.level_nid).values():
                 level_songs.add(music_command.parameters.get('Music'))
-            loading_music_thread = threading.Thread(target=get_sound_thread().load_songs, args=[level_songs])
-            loading_music_thread.start()
-            self.loading_threads.append(loading_music_thread)
+            # Decoded in the background by the sound thread
+            get_sound_thread().load_songs(level_songs)
 
     def update(self):
-        if not self.completed_time and not any([thread.is_alive() for thread in self.loading_threads]):
+        if not self.completed_time and not get_sound_thread().is_loading_songs():
             self.completed_time = engine.get_time()
         if self.completed_time:
             if engine.get_time() - self.completed_time > self.duration:
@@ -2230,6 +2226,7 @@ class CombatTargetingState(MapState):
 
     def display_single_attack(self):
         game.highlight.remove_highlights()
+        interaction.prewarm_animation(self.cur_unit, self.item, game.cursor.position)
         splash_positions = item_system.splash_positions(self.cur_unit, self.item, game.cursor.position)
         valid_attacks = game.target_system.get_attackable_positions(self.cur_unit, self.item)
         if item_system.is_spell(self.cur_unit, self.item):
@@ -68,7 +68,7 @@ def draw_skill(surf, skill, topleft, compact=True, simple=False, grey=False):
         return None
 
     if grey:
-        image = image_mods.make_gray_colorkey(image)
+        image = image_mods.cached_transform(('icons16', skill.icon_nid, tuple(skill.icon_index)), image_mods.make_gray_colorkey, image)
 
     surf.blit(image, topleft)
     if simple:
@@ -111,7 +111,7 @@ def draw_weapon(surf, weapon_type, topleft, gray=False):
     engine.set_colorkey(image, COLORKEY, rleaccel=True)
 
     if gray:
-        image = image_mods.make_gray(image.convert_alpha())
+        image = image_mods.cached_transform(('icons16', w_type_obj.icon_nid, tuple(w_type_obj.icon_index)), image_mods.make_gray, image.convert_alpha())
 
     surf.blit(image, topleft)
     return surf
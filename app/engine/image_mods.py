@@ -3,6 +3,7 @@ from app.utilities import utils
 from app.utilities.typing import Color3
 from app.engine import engine
 
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import List
 
@@ -21,46 +22,63 @@ def color_convert_alpha(image, conversion_dict):
     px_array.close()
     return image
 
+def _keep_pixels(image, transform, keep_mask):
+    """
+    Applies transform to image in place,
+    except for the pixels set in keep_mask
+    """
+    if keep_mask.count():
+        original = engine.copy_surface(image)
+        transform(image, image)
+        keep_mask.to_surface(image, setsurface=original, unsetcolor=None)
+    else:
+        transform(image, image)
+    return image
+
 def invert_surface(image):
-    # Using px_array is about 2x as fast as native
-    # Using Cython invert is about >200x faster than native
-    px_array = engine.make_pixel_array(image)
-    colorkey = image.map_rgb(COLORKEY)
-    for x in range(image.get_width()):
-        for y in range(image.get_height()):
-            if px_array[x, y] != colorkey:
-                color = image.unmap_rgb(px_array[x, y])
-                px_array[x, y] = (255 - color[0], 255 - color[1], 255 - color[2])
-    px_array.close()
+    keep_mask = engine.make_color_mask(image, COLORKEY)
+    _keep_pixels(image, engine.transform_invert, keep_mask)
 
-def make_gray(image):
-    for row in range(image.get_width()):
-        for col in range(image.get_height()):
-            color = image.get_at((row, col))
-            if color[3] != 0:
-                avg = int(color[0] * 0.298 + color[1] * 0.587 + color[2] * 0.114)
-                image.set_at((row, col), (avg, avg, avg, color[3]))
-    return image
+def _make_gray(image, keep_color=None):
+    # Fully transparent pixels are left alone
+    keep_mask = engine.make_transparent_mask(image)
+    if keep_color:
+        keep_mask.draw(engine.make_color_mask(image, keep_color), (0, 0))
+    return _keep_pixels(image, engine.transform_grayscale, keep_mask)
 
+def make_gray(image):
+    return _make_gray(image)
 
 def make_gray_colorkey(image):
-    for row in range(image.get_width()):
-        for col in range(image.get_height()):
-            color = image.get_at((row, col))
-            if color[3] != 0 and color[:3] != COLORKEY:
-                avg = int(color[0] * 0.298 + color[1] * 0.587 + color[2] * 0.114)
-                image.set_at((row, col), (avg, avg, avg, color[3]))
-    return image
+    return _make_gray(image, COLORKEY)
 
 def make_anim_gray(image):
     # Different because animations have a small box of green around them
-    for row in range(image.get_width()):
-        for col in range(image.get_height()):
-            color = image.get_at((row, col))
-            if color[3] != 0 and (color[0], color[1], color[2]) != (128, 160, 128):
-                avg = int(color[0] * 0.298 + color[1] * 0.587 + color[2] * 0.114)
-                image.set_at((row, col), (avg, avg, avg, color[3]))
-    return image
+    return _make_gray(image, (128, 160, 128))
+
+# Results of cached_transform, least recently used first
+_transform_cache: 'OrderedDict[tuple, engine.Surface]' = OrderedDict()
+TRANSFORM_CACHE_SIZE = 256
+
+def cached_transform(key, transform, image, *args) -> engine.Surface:
+    """
+    Returns transform(image, *args), only computing it the first time
+    it is asked for with the same key, transform and args.
+    The key should say which image this is (like the nid of its resource),
+    since most images are new surfaces each time they are made.
+
+    The result is shared, so it should not be changed
+    """
+    cache_key = (key, transform.__name__, args)
+    result = _transform_cache.get(cache_key)
+    if result is not None:
+        _transform_cache.move_to_end(cache_key)
+        return result
+    result = transform(engine.copy_surface(image), *args)
+    _transform_cache[cache_key] = result
+    if len(_transform_cache) > TRANSFORM_CACHE_SIZE:
+        _transform_cache.popitem(last=False)
+    return result
 
 def make_translucent(image, t):
     """
@@ -22,11 +22,12 @@ def line_of_sight(source_pos: list, dest_pos: list, max_range: int) -> list:
         else:
             all_tiles[pos] = Visibility.Unknown
 
+    has_line = game.board.vision.los_table.has_line
     # Iterate over remaining tiles
     for pos, vis in all_tiles.items():
         if vis == Visibility.Unknown:
             for s_pos in source_pos:
-                if utils.calculate_distance(pos, s_pos) <= max_range and get_line(s_pos, pos, game.board.get_opacity):
+                if utils.calculate_distance(pos, s_pos) <= max_range and has_line(s_pos, pos):
                     all_tiles[pos] = Visibility.Lit
                     break
             else:
@@ -40,10 +41,11 @@ def simple_check(dest_pos: Pos, team: NID, default_range: int, fow_vantage_point
     Returns true if can see position with line of sight
     """
     info = [(fow_vantage_point[unit.nid], skill_system.sight_range(unit)) for unit in game.units if unit.team == team and fow_vantage_point.get(unit.nid)]
+    has_line = game.board.vision.los_table.has_line
     for s_pos, extra_range in info:
         if s_pos == dest_pos:
             return True
-        elif utils.calculate_distance(dest_pos, s_pos) <= default_range + extra_range and get_line(s_pos, dest_pos, game.board.get_opacity):
+        elif utils.calculate_distance(dest_pos, s_pos) <= default_range + extra_range and has_line(s_pos, dest_pos):
             return True
     return False
 
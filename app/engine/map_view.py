@@ -15,6 +15,16 @@ class MapView():
         self._unit_surf = engine.create_surface((WINWIDTH, WINHEIGHT), transparent=True)
         self._line_surf = engine.copy_surface(self._unit_surf)
         self._line_surf.fill((0, 0, 0, 0))
+        self._map_surf = None
+
+    def _get_map_surf(self, size, color):
+        """
+        Surface the map is drawn onto, reused from frame to frame
+        """
+        if not self._map_surf or self._map_surf.get_size() != size:
+            self._map_surf = engine.create_surface(size, transparent=True)
+        self._map_surf.fill(color)
+        return self._map_surf
 
     def save_screenshot(self):
         import os
@@ -124,14 +134,13 @@ class MapView():
             parallax_cull = (bg_x, bg_y, cull_rect[2], cull_rect[3])
             base_image = game.bg_tilemap.get_full_image(parallax_cull)
             map_image = game.tilemap.get_full_image(cull_rect)
-            surf = engine.copy_surface(base_image)
-            surf = surf.convert_alpha()
+            surf = self._get_map_surf(cull_rect[2:], (0, 0, 0, 0))
+            surf.blit(base_image, (0, 0))
             surf.blit(map_image, shake)
         else:
-            surf = engine.create_surface(cull_rect[2:])
+            surf = self._get_map_surf(cull_rect[2:], (0, 0, 0))
             map_image = game.tilemap.get_full_image(cull_rect)
             surf.blit(map_image, shake)
-            surf = surf.convert_alpha()
 
         surf = game.boundary.draw_auras(surf, full_size, cull_rect)
         surf = game.boundary.draw(surf, full_size, cull_rect)
@@ -8,6 +8,9 @@ import app.engine.skill_component_access as SCA
 
 class SkillObject():
     next_uid = 100
+    # Bumped whenever components are added to or removed from a skill after creation,
+    # so units know to rebuild their skill hook tables
+    component_generation = 0
 
     def __init__(self, nid, name, desc, icon_nid=None, icon_index=(0, 0), components=None):
         self.uid = SkillObject.next_uid
@@ -35,6 +38,10 @@ class SkillObject():
         self.subskill_uid = None
         self.parent_skill = None
 
+    @classmethod
+    def components_changed(cls):
+        cls.component_generation += 1
+
     @property
     def tags(self) -> set:
         all_tags = set()
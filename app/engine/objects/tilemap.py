@@ -1,4 +1,5 @@
-from typing import Dict, List, Tuple
+from collections import OrderedDict
+from typing import Dict, List, Set, Tuple
 from app.utilities.typing import NID, Pos
 
 from app.constants import TILEWIDTH, TILEHEIGHT, AUTOTILE_FRAMES, COLORKEY
@@ -8,6 +9,10 @@ from app.data.resources.resources import RESOURCES
 
 from app.engine import engine, image_mods, particles, animations
 
+# Background layers are merged together into square chunks of this many tiles,
+# which are kept around and reused every frame until their layers change
+CHUNK_SIZE = 16
+
 class LayerObject():
     transition_speed = 333
 
@@ -19,6 +24,8 @@ class LayerObject():
         self.terrain = {}
         self.image = None
         self.autotile_images = []
+        # Which chunks of the map have autotiles in them
+        self.autotile_chunks: Set[Tuple[int, int]] = set()
         self.pixel_bounds = None
 
         # For fade in
@@ -29,6 +36,7 @@ class LayerObject():
 
     def set_image(self, image):
         self.image = image
+        self.parent.clear_chunk_cache()
 
     def should_draw(self, cull_rect) -> bool:
         """
@@ -115,6 +123,10 @@ class LayerObject():
     # Restore not needed -- handled in TileMapObjects deserialize function
 
 class TileMapObject(Prefab):
+    # Once the merged chunk images take up more than this,
+    # the least recently drawn ones are thrown away
+    max_chunk_bytes = 32 * 1024 * 1024
+
     def __init__(self):
         super().__init__()
         self.weather: List[particles.SimpleParticleSystem] = []
@@ -123,6 +135,11 @@ class TileMapObject(Prefab):
         self.width: int = 0
         self.height: int = 0
         self.nid: NID = None
+        # Key: (chunk coord, which layers are drawn there, autotile frames), Value: merged image
+        # Least recently drawn first
+        self.chunk_cache: OrderedDict[tuple, engine.Surface] = OrderedDict()
+        self.chunk_cache_bytes: int = 0
+        self._full_image: engine.Surface = None
 
     @classmethod
     def from_prefab(cls, prefab):
@@ -175,6 +192,7 @@ class TileMapObject(Prefab):
                 # Handle Autotiles
                 if pos in tileset.autotiles and tileset.autotile_image:
                     has_autotiles = True
+                    new_layer.autotile_chunks.add((coord[0] // CHUNK_SIZE, coord[1] // CHUNK_SIZE))
                     column = tileset.autotiles[pos]
                     for idx, im in enumerate(autotile_images):
                         rect = (column * TILEWIDTH, idx * TILEHEIGHT, TILEWIDTH, TILEHEIGHT)
@@ -254,21 +272,82 @@ class TileMapObject(Prefab):
     def foreground_layers(self) -> List[LayerObject]:
         return [layer for layer in self.layers if layer.foreground]
 
+    def _get_full_image_surf(self, size) -> engine.Surface:
+        """
+        The same surface is handed back every frame,
+        so it should be drawn from before the next call
+        """
+        if not self._full_image or self._full_image.get_size() != size:
+            self._full_image = engine.create_surface(size)
+            engine.set_colorkey(self._full_image, COLORKEY)
+        engine.fill(self._full_image, COLORKEY)
+        return self._full_image
+
     def get_full_image(self, cull_rect):
-        image = engine.create_surface((cull_rect[2], cull_rect[3]))
-        engine.fill(image, COLORKEY)
-        engine.set_colorkey(image, COLORKEY)
-        layers = self.background_layers()
-        for layer in layers:
-            if (layer.visible or layer.state == 'fade_out') and \
-                    layer.should_draw(cull_rect):
-                main_image = layer.get_image(cull_rect)
-                image.blit(main_image, (0, 0))
-                autotile_image = layer.get_autotile_image(cull_rect)
-                if autotile_image:
-                    image.blit(autotile_image, (0, 0))
+        image = self._get_full_image_surf((cull_rect[2], cull_rect[3]))
+        layers = [layer for layer in self.background_layers() if layer.visible or layer.state == 'fade_out']
+        if any(layer.state for layer in layers):
+            # Fading layers change every frame, so there's no point caching them
+            for layer in layers:
+                if layer.should_draw(cull_rect):
+                    main_image = layer.get_image(cull_rect)
+                    image.blit(main_image, (0, 0))
+                    autotile_image = layer.get_autotile_image(cull_rect)
+                    if autotile_image:
+                        image.blit(autotile_image, (0, 0))
+            return image
+
+        # Same part of the map that engine.subsurface would cut out
+        left, top, width, height = engine.bound_subsurface(
+            (self.width * TILEWIDTH, self.height * TILEHEIGHT), cull_rect)
+        left, top, width, height = int(left), int(top), int(width), int(height)
+        if width <= 0 or height <= 0:
+            return image
+        chunk_width, chunk_height = CHUNK_SIZE * TILEWIDTH, CHUNK_SIZE * TILEHEIGHT
+        image.set_clip((0, 0, width, height))
+        for cy in range(top // chunk_height, (top + height - 1) // chunk_height + 1):
+            for cx in range(left // chunk_width, (left + width - 1) // chunk_width + 1):
+                chunk_image = self.get_chunk_image(layers, (cx, cy))
+                image.blit(chunk_image, (cx * chunk_width - left, cy * chunk_height - top))
+        image.set_clip(None)
         return image
 
+    def get_chunk_image(self, layers: List[LayerObject], chunk: Tuple[int, int]) -> engine.Surface:
+        """
+        The merged image of the layers drawn in this chunk of the map.
+        Kept for each set of layers drawn and each frame of the autotiles
+        in this chunk, until the cache goes over max_chunk_bytes
+        """
+        chunk_width, chunk_height = CHUNK_SIZE * TILEWIDTH, CHUNK_SIZE * TILEHEIGHT
+        rect = (chunk[0] * chunk_width, chunk[1] * chunk_height,
+                min(chunk_width, self.width * TILEWIDTH - chunk[0] * chunk_width),
+                min(chunk_height, self.height * TILEHEIGHT - chunk[1] * chunk_height))
+        drawn = [layer for layer in layers if layer.should_draw(rect)]
+        layer_key = tuple(layer.nid for layer in drawn)
+        frame_key = tuple(layer.autotile_frame for layer in drawn if chunk in layer.autotile_chunks)
+        key = (chunk, layer_key, frame_key)
+        chunk_image = self.chunk_cache.get(key)
+        if chunk_image:
+            self.chunk_cache.move_to_end(key)
+            return chunk_image
+        chunk_image = engine.create_surface(rect[2:])
+        engine.fill(chunk_image, COLORKEY)
+        for layer in drawn:
+            chunk_image.blit(layer.get_image(rect), (0, 0))
+            autotile_image = layer.get_autotile_image(rect)
+            if autotile_image:
+                chunk_image.blit(autotile_image, (0, 0))
+        self.chunk_cache[key] = chunk_image
+        self.chunk_cache_bytes += self._chunk_bytes(chunk_image)
+        while self.chunk_cache_bytes > self.max_chunk_bytes and len(self.chunk_cache) > 1:
+            _, old_image = self.chunk_cache.popitem(last=False)
+            self.chunk_cache_bytes -= self._chunk_bytes(old_image)
+        return chunk_image
+
+    @staticmethod
+    def _chunk_bytes(image: engine.Surface) -> int:
+        return image.get_width() * image.get_height() * image.get_bytesize()
+
     def get_foreground_image(self, cull_rect):
         image = engine.create_surface((cull_rect[2], cull_rect[3]), transparent=True)
         layers = self.foreground_layers()
@@ -308,6 +387,10 @@ class TileMapObject(Prefab):
     def reset(self):
         pass
 
+    def clear_chunk_cache(self):
+        self.chunk_cache.clear()
+        self.chunk_cache_bytes = 0
+
     def save(self):
         s_dict = {}
         s_dict['nid'] = self.nid
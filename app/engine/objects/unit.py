@@ -18,6 +18,7 @@ from app.utilities.typing import NID
 from typing import Union
 
 if TYPE_CHECKING:
+    from app.data.database.skill_components import SkillComponent
     from app.engine.unit_sound import UnitSound
     from app.engine.unit_sprite import UnitSprite
 
@@ -107,6 +108,9 @@ class UnitObject(Prefab):
 
     _skills: List[UnitSkill] = field(default_factory=list)
     _visible_skills_cache: List[SkillObject] = field(default_factory=list)
+    # Key: hook names, Value: the (skill, component) pairs among the visible skills that define them
+    _skill_hook_table: Dict[Tuple[str, ...], List[Tuple[SkillObject, SkillComponent]]] = field(default_factory=dict)
+    _skill_hook_table_generation: int = 0
 
     has_rescued: bool = False  #: Has the unit *rescued* someone this phase?
     has_taken: bool = False  #: Has the unit *taken* someone this phase?
@@ -318,7 +322,7 @@ class UnitObject(Prefab):
         # equip items and skill after initialization
         for s in self._skills:
             skill_system.after_add(self, s.get())
-        self._visible_skills_cache.clear()
+        self._clear_skill_caches()
 
         # -- Equipped Items
         self.autoequip()
@@ -441,7 +445,7 @@ class UnitObject(Prefab):
                 popped_skill = displaceable_skills[0]
         if not test:
             self._skills.append(UnitSkill(skill, source, source_type))
-            self._visible_skills_cache.clear()
+            self._clear_skill_caches()
         return popped_skill
 
     def remove_skill(self, skill, source, source_type=SourceType.DEFAULT, test=False):
@@ -460,9 +464,30 @@ class UnitObject(Prefab):
                 to_remove = s
         if not test and to_remove:
             self._skills.remove(to_remove)
-            self._visible_skills_cache.clear()
+            self._clear_skill_caches()
         return removed_skill_info
 
+    def _clear_skill_caches(self):
+        self._visible_skills_cache.clear()
+        self._skill_hook_table.clear()
+
+    def get_skill_hook_implementers(self, *hook_names: str) -> List[Tuple[SkillObject, SkillComponent]]:
+        """Returns the (skill, component) pairs among the unit's current skills
+        whose component defines any of the given hooks, in the order the hooks should run.
+
+        Utilizes a table that is reset when a skill is added or removed from self._skills,
+        or when any skill's components change
+        """
+        if self._skill_hook_table_generation != SkillObject.component_generation:
+            self._skill_hook_table.clear()
+            self._skill_hook_table_generation = SkillObject.component_generation
+        implementers = self._skill_hook_table.get(hook_names)
+        if implementers is None:
+            implementers = [(skill, component) for skill in self.skills for component in skill.components
+                            if any(component.defines(hook_name) for hook_name in hook_names)]
+            self._skill_hook_table[hook_names] = implementers
+        return implementers
+
     @property
     def all_skills(self) -> List[SkillObject]:
         return [s.get() for s in self._skills]
@@ -1023,7 +1048,7 @@ class UnitObject(Prefab):
 
         for s in self._skills:
             skill_system.after_add_from_restore(self, s.get())
-        self._visible_skills_cache.clear()
+        self._clear_skill_caches()
 
         return self
 
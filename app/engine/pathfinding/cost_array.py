@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+from app.engine.pathfinding.node import Node
+from app.utilities.grid import BoundedGrid, Grid
+from app.utilities.typing import Pos
+
+class CostArray():
+    """
+    Flat, array-backed view of a movement grid.
+    Indexed the same way as Grid: x * height + y
+
+    Also owns the scratch arrays used by the pathfinders. Instead of
+    resetting every cell before each query, each query bumps the generation
+    and a cell's scratch values are only valid if its stamp matches
+    the current generation.
+    """
+    __slots__ = ['width', 'height', 'costs', 'passable',
+                 'generation', 'stamp', 'closed', 'g', 'parent']
+
+    def __init__(self, width: int, height: int, costs: List[float], passable: List[bool]):
+        self.width: int = width
+        self.height: int = height
+        self.costs: List[float] = costs
+        self.passable: List[bool] = passable
+
+        size = width * height
+        self.generation: int = 0
+        self.stamp: List[int] = [0] * size  # Generation when g/parent was last written
+        self.closed: List[int] = [0] * size  # Generation when cell was last closed
+        self.g: List[float] = [0] * size  # Best known distance to start
+        self.parent: List[int] = [-1] * size  # Index of the previous cell on the best path
+
+    @classmethod
+    def from_grid(cls, grid: Grid[Node]) -> CostArray:
+        cells = grid.cells()
+        costs = [node.cost for node in cells]
+        passable = [node.reachable for node in cells]
+        return cls(grid.width, grid.height, costs, passable)
+
+    def set_node(self, pos: Pos, node: Node):
+        idx = pos[0] * self.height + pos[1]
+        self.costs[idx] = node.cost
+        self.passable[idx] = node.reachable
+
+    def next_generation(self) -> int:
+        self.generation += 1
+        return self.generation
+
+    def to_pos(self, idx: int) -> Pos:
+        return divmod(idx, self.height)
+
+    def to_idx(self, pos: Pos) -> int:
+        return pos[0] * self.height + pos[1]
+
+class MovementGrid(BoundedGrid[Node]):
+    """
+    BoundedGrid of Nodes that also carries the CostArray for the same cells,
+    so the pathfinders don't need to rebuild it on every query
+    """
+    __slots__ = ['cost_array']
+
+    def __init__(self, size: Tuple[int, int], bounds: Tuple[int, int, int, int], cost_array: CostArray):
+        super().__init__(size, bounds)
+        self.cost_array: CostArray = cost_array
+
+def get_cost_array(grid: BoundedGrid[Node]) -> CostArray:
+    cost_array = getattr(grid, 'cost_array', None)
+    if cost_array is None:
+        cost_array = CostArray.from_grid(grid)
+    return cost_array
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import heapq
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, FrozenSet, Iterable, List, Tuple
+
+from app.data.database.database import DB
+from app.engine.game_state import game
+from app.engine.pathfinding.cost_array import CostArray
+from app.utilities.typing import NID, Pos
+
+if TYPE_CHECKING:
+    from app.engine.game_board import GameBoard
+
+INF = float('inf')
+
+class DistanceField():
+    """
+    Distance from every position on the map to the nearest of a set of sources,
+    for a unit using a specific movement group.
+
+    Distances follow the same rules as the pathfinders: the cost of a path is
+    the sum of the costs of every position entered, not counting the start.
+    """
+    __slots__ = ['height', 'sources', 'dist', 'toward']
+
+    def __init__(self, height: int, sources: FrozenSet[Pos], dist: List[float], toward: List[int]):
+        self.height = height
+        self.sources = sources
+        self.dist = dist
+        # Index of the next position on the shortest path to the nearest source
+        self.toward = toward
+
+    def get_distance(self, pos: Pos) -> float:
+        """Returns inf if no source can be reached from pos"""
+        return self.dist[pos[0] * self.height + pos[1]]
+
+    def get_path(self, pos: Pos) -> List[Pos]:
+        """
+        Returns the shortest path from pos to the nearest source,
+        with the source first and pos last, just like AStar.process.
+        Returns an empty list if no source can be reached.
+        """
+        idx = pos[0] * self.height + pos[1]
+        if self.dist[idx] == INF:
+            return []
+        path = []
+        while idx >= 0:
+            path.append(divmod(idx, self.height))
+            idx = self.toward[idx]
+        path.reverse()
+        return path
+
+def compute_distance_field(cost_array: CostArray, bounds, sources: Iterable[Pos],
+                           can_move_through: Callable[[Pos], bool],
+                           max_movement_limit: float = 999) -> DistanceField:
+    """
+    Reverse multi-source Djikstra.
+    Moving from a position into its neighbor costs the neighbor's cost, so
+    when we work backwards from the sources, a neighbor's distance is this
+    position's distance plus this position's cost.
+    """
+    costs, passable = cost_array.costs, cost_array.passable
+    height = cost_array.height
+    min_x, min_y, max_x, max_y = bounds
+    size = cost_array.width * height
+    dist: List[float] = [INF] * size
+    toward: List[int] = [-1] * size
+    done = bytearray(size)
+
+    def can_enter(idx: int) -> bool:
+        return passable[idx] and costs[idx] <= max_movement_limit and \
+            can_move_through(divmod(idx, height))
+
+    open_heap = []
+    sources = frozenset(sources)
+    source_idxs = set()
+    for pos in sources:
+        if min_x <= pos[0] <= max_x and min_y <= pos[1] <= max_y:
+            idx = pos[0] * height + pos[1]
+            # Sources are the last position entered, so they must be enterable
+            if can_enter(idx):
+                dist[idx] = 0
+                source_idxs.add(idx)
+                open_heap.append((0, idx))
+    heapq.heapify(open_heap)
+
+    while open_heap:
+        d, idx = heapq.heappop(open_heap)
+        if done[idx]:
+            continue
+        done[idx] = 1
+        # Anything that is not enterable can still be where a path starts,
+        # but no path can pass through it
+        if idx not in source_idxs and not can_enter(idx):
+            continue
+        new_d = d + costs[idx]
+        x, y = divmod(idx, height)
+        for adj, valid in ((idx + 1, y < max_y), (idx + height, x < max_x),
+                           (idx - height, x > min_x), (idx - 1, y > min_y)):
+            if valid and not done[adj] and new_d < dist[adj]:
+                dist[adj] = new_d
+                toward[adj] = idx
+                heapq.heappush(open_heap, (new_d, adj))
+
+    return DistanceField(height, sources, dist, toward)
+
+class DistanceFieldService():
+    """
+    Keeps distance fields and threat maps around so that the AI can reuse
+    them, instead of pathfinding to each target one at a time.
+
+    Fields are keyed on everything that affects them: movement group, the
+    moving team, whether the unit can pass through other units, and the sources.
+    The highest tile cost a unit will enter only becomes part of the key when
+    some passable tile of the movement group costs more than that,
+    so units with different movement still share the same fields.
+    The board tells the service when something changes, and only the fields
+    that could be affected are dropped.
+    """
+    max_fields = 128
+
+    def __init__(self, board: GameBoard):
+        self.board = board
+        self.fields: OrderedDict[tuple, DistanceField] = OrderedDict()
+        # Key: movement group, Value: highest cost of any passable position
+        self.max_costs: Dict[NID, float] = {}
+        # Key: team, Value: (phase it was built in, flat list of the number of enemy units that can attack each position)
+        self.threat_maps: Dict[NID, Tuple[tuple, List[int]]] = {}
+
+    def clear(self):
+        self.fields.clear()
+        self.threat_maps.clear()
+        self.max_costs.clear()
+
+    def occupancy_changed(self, team: NID):
+        """A unit of this team arrived at or left a position"""
+        # Units never block their allies, so only fields for their enemies care
+        allies = DB.teams.get_allies(team)
+        for key in [key for key in self.fields if not key[2] and key[1] not in allies]:
+            del self.fields[key]
+        # Threat maps only follow the units that are threatening.
+        # How the team's own units block those threats is only updated each phase
+        for threat_team in [threat_team for threat_team in self.threat_maps if threat_team not in allies]:
+            del self.threat_maps[threat_team]
+
+    def terrain_changed(self):
+        self.clear()
+
+    def vision_changed(self):
+        self.clear()
+
+    def get_distance_field(self, movement_group: NID, team: NID, sources: Iterable[Pos],
+                           pass_through: bool = False, max_movement_limit: float = 999) -> DistanceField:
+        sources = frozenset(sources)
+        grid = self.board.get_movement_grid(movement_group)
+        if movement_group not in self.max_costs:
+            cost_array = grid.cost_array
+            self.max_costs[movement_group] = max(
+                (cost for cost, passable in zip(cost_array.costs, cost_array.passable) if passable), default=0)
+        if max_movement_limit >= self.max_costs[movement_group]:
+            max_movement_limit = 999  # Can enter every passable position anyway
+        key = (movement_group, team, bool(pass_through), max_movement_limit, sources)
+        field = self.fields.get(key)
+        if field is not None:
+            self.fields.move_to_end(key)
+            return field
+
+        if pass_through:
+            can_move_through = lambda pos: True
+        else:
+            can_move_through = lambda pos: self.board.can_move_through(team, pos)
+        field = compute_distance_field(grid.cost_array, grid.bounds, sources, can_move_through, max_movement_limit)
+
+        self.fields[key] = field
+        while len(self.fields) > self.max_fields:
+            self.fields.popitem(last=False)
+        return field
+
+    def get_threat_map(self, team: NID) -> List[int]:
+        """
+        Returns a flat list (indexed x * height + y) of how many units
+        hostile to team could attack each position with their weapons next turn
+        """
+        phase = (game.turncount, game.phase.get_current())
+        if team not in self.threat_maps or self.threat_maps[team][0] != phase:
+            threat_map = [0] * (self.board.width * self.board.height)
+            allies = DB.teams.get_allies(team)
+            for unit in game.units:
+                if not unit.position or unit.team in allies:
+                    continue
+                valid_moves = game.path_system.get_valid_moves(unit, force=True)
+                for pos in game.target_system.get_all_attackable_positions_weapons(unit, valid_moves, force=True):
+                    threat_map[pos[0] * self.board.height + pos[1]] += 1
+            self.threat_maps[team] = (phase, threat_map)
+        return self.threat_maps[team][1]
+
+    def get_threat(self, team: NID, pos: Pos) -> int:
+        return self.get_threat_map(team)[pos[0] * self.board.height + pos[1]]
@@ -6,8 +6,9 @@ import functools
 from app.engine import equations, skill_system
 from app.engine.movement import movement_funcs
 from app.engine.pathfinding import pathfinding
+from app.engine.pathfinding.reachability_cache import record_examined
 from app.engine.game_state import GameState
-from app.utilities.typing import Pos
+from app.utilities.typing import NID, Pos
 
 if TYPE_CHECKING:
     from app.engine.objects.unit import UnitObject
@@ -37,23 +38,57 @@ class PathSystem():
         if not force and unit.finished:
             return set()
         mtype = movement_funcs.get_movement_group(unit)
-        grid: BoundedGrid[Node] = self.game.board.get_movement_grid(mtype)
-        start_pos = unit.position
-        pathfinder = pathfinding.Djikstra(start_pos, grid)
         movement_left = unit.get_movement() if force else unit.movement_left
+        pass_through = skill_system.pass_through(unit)
 
-        if skill_system.pass_through(unit):
-            can_move_through = lambda adj: True
+        cache = self.game.board.reachability_cache
+        key = self._get_reachability_key(unit, mtype, movement_left, pass_through)
+        entry = cache.get(key)
+        if entry:
+            valid_moves = set(entry.valid_moves)
         else:
-            # Feed the unit's team into the function
-            can_move_through = functools.partial(self.game.board.can_move_through, unit.team)
-        valid_moves = pathfinder.process(can_move_through, movement_left)
+            grid: BoundedGrid[Node] = self.game.board.get_movement_grid(mtype)
+            start_pos = unit.position
+            pathfinder = pathfinding.Djikstra(start_pos, grid)
+
+            if pass_through:
+                can_move_through = lambda adj: True
+            else:
+                # Feed the unit's team into the function
+                can_move_through = functools.partial(self.game.board.can_move_through, unit.team)
+            examined: Set[Pos] = set()
+            valid_moves = pathfinder.process(record_examined(can_move_through, examined), movement_left)
+            cache.put(key, valid_moves, pathfinder.get_predecessors(), examined)
+
         valid_moves.add(unit.position)
         if witch_warp:
             witch_warp = set(skill_system.witch_warp(unit))
             valid_moves |= witch_warp
         return valid_moves
 
+    def _get_reachability_key(self, unit: UnitObject, mtype: NID, movement_left: float, pass_through: bool) -> tuple:
+        fog_info = self.game.get_current_fog_info()
+        return (unit.nid, unit.position, unit.team, mtype, movement_left, bool(pass_through),
+                fog_info.is_active, fog_info.mode, fog_info.default_radius, fog_info.ai_radius, fog_info.other_radius)
+
+    def get_cached_path(self, unit: UnitObject, position: Pos) -> Optional[List[Pos]]:
+        """Returns the shortest path for the unit to get to the goal position, 
+        using the results of the last call to get_valid_moves for this unit.
+
+        Args:
+            unit (UnitObject): The unit to get the path for
+            position (Pos): The goal position
+
+        Returns:
+            Optional[List[Pos]]: The path (a list of positions), with the goal position first and the start position last.
+                None if the unit's valid moves are not cached or the position is not reachable by normal movement.
+        """
+        if not unit.position:
+            return None
+        mtype = movement_funcs.get_movement_group(unit)
+        key = self._get_reachability_key(unit, mtype, unit.movement_left, skill_system.pass_through(unit))
+        return self.game.board.reachability_cache.get_path(key, position)
+
     def get_valid_xcom_moves(self, unit: UnitObject) -> Set[Pos]:
         """Given a unit, finds all positions on the map they can move to with their xcom move as well
         Assumes unit is on the map.
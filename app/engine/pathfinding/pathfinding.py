@@ -1,155 +1,179 @@
 import heapq
-from typing import Callable, List, Optional, Set, Tuple
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from app.engine import bresenham_line_algorithm
 
+from app.engine.pathfinding.cost_array import CostArray, get_cost_array
 from app.engine.pathfinding.node import Node
 from app.utilities.grid import BoundedGrid
 from app.utilities.typing import Pos
 
 class Djikstra:
-    __slots__ = ['open', 'closed', 'grid', 'start_pos', 'start_node']
+    __slots__ = ['open', 'closed', 'grid', 'cost_array', 'start_pos', 'start_idx', 'generation']
 
     def __init__(self, start_pos: Pos, grid: BoundedGrid[Node]):
-        self.open: List[Node] = []
-        heapq.heapify(self.open)
-        self.closed: Set[Node] = set()
+        # Heap of (g, idx). Stale entries are skipped when popped,
+        # so decrease-key is just a push plus an update to the g array
+        self.open: List[Tuple[float, int]] = []
+        self.closed: List[int] = []
         self.grid: BoundedGrid[Node] = grid
-        self._reset_grid()
+        self.cost_array: CostArray = get_cost_array(grid)
         self.start_pos: Pos = start_pos
-        self.start_node: Node = self.grid.get(start_pos)
+        self.start_idx: int = self.cost_array.to_idx(start_pos)
+        self.generation: int = 0
 
-    def _reset_grid(self):
-        for node in self.grid.cells():
-            node.reset()
+    def _get_adj_idxs(self, idx: int) -> List[int]:
+        height = self.cost_array.height
+        min_x, min_y, max_x, max_y = self.grid.bounds
+        x, y = divmod(idx, height)
+        adjs: List[int] = []
+        if y < max_y:
+            adjs.append(idx + 1)
+        if x < max_x:
+            adjs.append(idx + height)
+        if x > min_x:
+            adjs.append(idx - height)
+        if y > min_y:
+            adjs.append(idx - 1)
+        return adjs
 
-    def _get_adj_nodes(self, node: Node) -> List[Node]:
-        return self._get_manhattan_adj_nodes(node)
-
-    def _get_manhattan_adj_nodes(self, node: Node) -> List[Node]:
-        nodes: List[Node] = []
-        for adj in [(node.x, node.y + 1), (node.x + 1, node.y), 
-                    (node.x - 1, node.y), (node.x, node.y - 1)]:
-            if self.grid.check_bounds(adj):
-                nodes.append(self.grid.get(adj))
-        return nodes
-
-    def _update_node(self, adj: Node, node: Node):
-        # g is true distance between this node and starting position
-        adj.g = node.g + adj.cost
-        adj.parent = node
-
-    def process(self, can_move_through: Callable[[Pos], bool], 
+    def process(self, can_move_through: Callable[[Pos], bool],
                 movement_left: float) -> Set[Pos]:
+        arr = self.cost_array
+        costs, passable = arr.costs, arr.passable
+        stamp, closed, best, parent = arr.stamp, arr.closed, arr.g, arr.parent
+        height = arr.height
+        gen = self.generation = arr.next_generation()
+
+        self.closed = []
+        start = self.start_idx
+        stamp[start] = gen
+        best[start] = 0
+        parent[start] = -1
         # add starting node to open heap queue
-        heapq.heappush(self.open, (self.start_node.g, self.start_node))
+        self.open = [(0, start)]
         while self.open:
             # pop node from heap queue
-            g, node = heapq.heappop(self.open)
+            g, idx = heapq.heappop(self.open)
+            if closed[idx] == gen:  # Stale entry
+                continue
             # If we've traveled too far -- always g ordered, so leaving at the
             # first sign of trouble will always work
             if g > movement_left:
-                return {(node.x, node.y) for node in self.closed}
+                break
             # add node to closed set so we don't process it twice
-            self.closed.add(node)
-            # get adjacent nodes for node
-            adj_nodes = self._get_adj_nodes(node)
-            for adj in adj_nodes:
-                if adj.reachable and adj not in self.closed:
-                    if can_move_through((adj.x, adj.y)):
-                        if (adj.g, adj) in self.open:
-                            # if adj node in open list, check if current path
-                            # is better than the one previously found for this adj node
-                            if adj.g > node.g + adj.cost:
-                                self._update_node(adj, node)
-                                heapq.heappush(self.open, (adj.g, adj))
-                        else:
-                            self._update_node(adj, node)
-                            heapq.heappush(self.open, (adj.g, adj))
+            closed[idx] = gen
+            self.closed.append(idx)
+            for adj in self._get_adj_idxs(idx):
+                if passable[adj] and closed[adj] != gen:
+                    if can_move_through(divmod(adj, height)):
+                        new_g = g + costs[adj]
+                        # If adj is already in the open heap, only update it
+                        # if the current path is better than the one previously found
+                        if stamp[adj] != gen or new_g < best[adj]:
+                            stamp[adj] = gen
+                            best[adj] = new_g
+                            parent[adj] = idx
+                            heapq.heappush(self.open, (new_g, adj))
                     else:  # Unit is in the way
                         pass
         # Sometimes gets here if unit is fully enclosed
-        return {(node.x, node.y) for node in self.closed}
+        return {divmod(idx, height) for idx in self.closed}
+
+    def get_predecessors(self) -> Dict[Pos, Optional[Pos]]:
+        """
+        Returns the predecessor of each position found by the last call to process.
+        Must be called before any other pathfinder runs on the same grid.
+        """
+        arr = self.cost_array
+        if arr.generation != self.generation:
+            raise ValueError("Pathfinding scratch arrays were reused by another search")
+        height = arr.height
+        parent = arr.parent
+        return {divmod(idx, height): (divmod(parent[idx], height) if parent[idx] >= 0 else None)
+                for idx in self.closed}
 
 class AStar:
     def __init__(self, start_pos: Pos, goal_pos: Optional[Pos], grid: BoundedGrid[Node]):
         self.grid = grid
+        self.cost_array: CostArray = get_cost_array(grid)
         self.start_pos = start_pos
-        self.goal_pos = goal_pos
+        self.goal_pos = None
 
-        self.start_node: Node = self.grid.get(start_pos)
-        self.end_node: Node = self.grid.get(goal_pos) if goal_pos else None
-        self.adj_end: List[Node] = self._get_adj_nodes(self.end_node) if self.end_node else None
+        self.start_idx: int = self.cost_array.to_idx(start_pos)
+        self.end_idx: int = None
+        self.adj_end: Set[int] = None
+        if goal_pos:
+            self.set_goal_pos(goal_pos)
 
         self.reset()
 
-    def _reset_grid(self):
-        for node in self.grid.cells():
-            node.reset()
-
     def reset(self):
-        self.open: List[Node] = []
-        heapq.heapify(self.open)
-        self.closed: Set[Node] = set()
-        self._reset_grid()
+        # Scratch arrays are invalidated by the generation counter,
+        # so there is nothing on the grid itself to reset
+        self.open: List[Tuple[float, int]] = []
 
     def set_goal_pos(self, goal_pos: Pos):
         self.goal_pos = goal_pos
-        self.end_node = self.grid.get(goal_pos)
-        self.adj_end = self._get_adj_nodes(self.end_node)
+        self.end_idx = self.cost_array.to_idx(goal_pos)
+        self.adj_end = set(self._get_adj_idxs(self.end_idx))
 
-    def _get_simple_heuristic(self, node: Node) -> float:
+    def _get_simple_heuristic(self, x: int, y: int) -> float:
         """
-        Compute the heuristic for this node
-        h is the approximate distance between this node and the goal node
+        Compute the heuristic for this position
+        h is the approximate distance between this position and the goal position
         """
-        dx1 = node.x - self.end_node.x
-        dy1 = node.y - self.end_node.y
-        h = abs(dx1) + abs(dy1)
-        return h
+        return abs(x - self.goal_pos[0]) + abs(y - self.goal_pos[1])
 
-    def _get_heuristic(self, node: Node) -> float:
+    def _get_heuristic(self, x: int, y: int) -> float:
         """
-        Compute the heuristic for this node
-        h is the approximate distance between this node and the goal node
+        Compute the heuristic for this position
+        h is the approximate distance between this position and the goal position
         """
         # Get main heuristic
-        dx1 = node.x - self.end_node.x
-        dy1 = node.y - self.end_node.y
+        dx1 = x - self.goal_pos[0]
+        dy1 = y - self.goal_pos[1]
         h = abs(dx1) + abs(dy1)
         # Are we going in direction of goal?
         # Slight nudge in direction that lies along path from start to end
-        dx2 = self.start_node.x - self.end_node.x
-        dy2 = self.start_node.y - self.end_node.y
+        dx2 = self.start_pos[0] - self.goal_pos[0]
+        dy2 = self.start_pos[1] - self.goal_pos[1]
         cross = abs(dx1 * dy2 - dx2 * dy1)
         return h + cross * .001
 
-    def _get_adj_nodes(self, node: Node) -> List[Node]:
-        return self._get_manhattan_adj_nodes(node)
-
-    def _get_manhattan_adj_nodes(self, node: Node) -> List[Node]:
-        nodes: List[Node] = []
-        for adj in [(node.x, node.y + 1), (node.x + 1, node.y), 
-                    (node.x - 1, node.y), (node.x, node.y - 1)]:
-            if self.grid.check_bounds(adj):
-                nodes.append(self.grid.get(adj))
-        return nodes
+    def _get_adj_idxs(self, idx: int) -> List[int]:
+        height = self.cost_array.height
+        min_x, min_y, max_x, max_y = self.grid.bounds
+        x, y = divmod(idx, height)
+        adjs: List[int] = []
+        if y < max_y:
+            adjs.append(idx + 1)
+        if x < max_x:
+            adjs.append(idx + height)
+        if x > min_x:
+            adjs.append(idx - height)
+        if y > min_y:
+            adjs.append(idx - 1)
+        return adjs
 
-    def _update_node(self, adj: Node, node: Node):
-        # h is approximate distance between this node and the goal
-        # g is true distance between this node and the starting position
-        # f is simply them added together
-        adj.g = node.g + adj.cost
-        adj.h = self._get_heuristic(adj)
-        adj.parent = node
-        adj.f = adj.h + adj.g
-        adj.true_f = self._get_simple_heuristic(adj) + adj.g
+    def _update_node(self, adj: int, idx: int) -> float:
+        """
+        Records idx as the parent of adj and returns adj's new f
+        h is approximate distance between this node and the goal
+        g is true distance between this node and the starting position
+        f is simply them added together
+        """
+        arr = self.cost_array
+        arr.g[adj] = arr.g[idx] + arr.costs[adj]
+        arr.parent[adj] = idx
+        return arr.g[adj] + self._get_heuristic(*arr.to_pos(adj))
 
-    def _return_path(self, node: Node) -> List[Pos]:
+    def _return_path(self, idx: int) -> List[Pos]:
+        arr = self.cost_array
         path = []
-        while node:
-            path.append((node.x, node.y))
-            node = node.parent
+        while idx >= 0:
+            path.append(arr.to_pos(idx))
+            idx = arr.parent[idx]
         return path
 
     def process(self, can_move_through: Callable[[Pos], bool],
@@ -157,40 +181,48 @@ class AStar:
                 max_movement_limit: int = 999) -> List[Pos]:
         """
         Args:
-            can_move_through (Callable): Expects a callback function that takes in a position 
+            can_move_through (Callable): Expects a callback function that takes in a position
                 and returns whether an enemy unit is standing in that position, which means we can't move through it.
             adj_good_enough (bool, optional): If set, moving adjacent to the goal position also counts as meeting its goal.
             limit (float, optional): If set, return the best answer once we've evaluated all paths that cost <= this cost limit
             max_movement_limit (int, optional): Defaults to 999. Treat as impassable all nodes with cost > this limit.
         """
+        arr = self.cost_array
+        costs, passable = arr.costs, arr.passable
+        stamp, closed, best, parent = arr.stamp, arr.closed, arr.g, arr.parent
+        height = arr.height
+        gen = arr.next_generation()
+
+        start, end = self.start_idx, self.end_idx
+        stamp[start] = gen
+        best[start] = 0
+        parent[start] = -1
         # Add starting node to open queue
-        heapq.heappush(self.open, (self.start_node.f, self.start_node))
+        self.open = [(0, start)]
         while self.open:
-            f, node = heapq.heappop(self.open)
+            f, idx = heapq.heappop(self.open)
             # Make sure we don't process the node twice
-            self.closed.add(node)
+            if closed[idx] == gen:
+                continue
+            closed[idx] = gen
             # If this node is past the limit, just return None
             # Uses f, not g, because g will cut off if first greedy path fails
             # f only cuts off if all nodes are bad
-            if limit is not None and node.true_f > limit:
+            if limit is not None and idx != start and \
+                    best[idx] + self._get_simple_heuristic(*divmod(idx, height)) > limit:
                 return []
             # if ending node, display found path
-            if node is self.end_node or (adj_good_enough and node in self.adj_end):
-                return self._return_path(node)
+            if idx == end or (adj_good_enough and idx in self.adj_end):
+                return self._return_path(idx)
             # get adjacent nodes for node
-            adj_nodes = self._get_adj_nodes(node)
-            for adj in adj_nodes:
-                if adj.reachable and adj not in self.closed:
-                    if can_move_through((adj.x, adj.y)) and adj.cost <= max_movement_limit:
-                        if (adj.f, adj) in self.open:
-                            # if adj node in open list, check if current path
-                            # is better than the one previously found for this adj node
-                            if adj.g > node.g + adj.cost:
-                                self._update_node(adj, node)
-                                heapq.heappush(self.open, (adj.f, adj))
-                        else:
-                            self._update_node(adj, node)
-                            heapq.heappush(self.open, (adj.f, adj))
+            for adj in self._get_adj_idxs(idx):
+                if passable[adj] and closed[adj] != gen:
+                    if can_move_through(divmod(adj, height)) and costs[adj] <= max_movement_limit:
+                        # if adj node in open list, check if current path
+                        # is better than the one previously found for this adj node
+                        if stamp[adj] != gen or best[adj] > best[idx] + costs[adj]:
+                            stamp[adj] = gen
+                            heapq.heappush(self.open, (self._update_node(adj, idx), adj))
                     else:  # Is blocked
                         pass
         return []
@@ -200,28 +232,29 @@ class ThetaStar(AStar):
     # Just a slight modification to AStar that enables better straight line
     # pathing because we can skip nodes
     """
-    def _update_node(self, adj: Node, node: Node):
+    def _update_node(self, adj: int, idx: int) -> float:
         # h is approximate distance between this node and the goal
         # g is true distance between this node and the starting position
         # f is simply them added together
         # If line of sight is valid, we can just use the parent
         # of the current node rather than the current node
-        if node.parent and self._line_of_sight(node.parent, adj):
-            adj.g = node.parent.g + adj.cost
-            adj.parent = node.parent
+        arr = self.cost_array
+        grandparent = arr.parent[idx]
+        if grandparent >= 0 and self._line_of_sight(grandparent, adj):
+            arr.g[adj] = arr.g[grandparent] + arr.costs[adj]
+            arr.parent[adj] = grandparent
         else:
-            adj.g = node.g + adj.cost
-            adj.parent = node
-        adj.h = self._get_heuristic(adj)
-        adj.f = adj.h + adj.g
-        adj.true_f = self._get_simple_heuristic(adj) + adj.g
+            arr.g[adj] = arr.g[idx] + arr.costs[adj]
+            arr.parent[adj] = idx
+        return arr.g[adj] + self._get_heuristic(*arr.to_pos(adj))
+
+    def _line_of_sight(self, idx1: int, idx2: int) -> bool:
+        arr = self.cost_array
 
-    def _line_of_sight(self, node1: Node, node2: Node) -> bool:
         def cannot_move_through(pos: Tuple[int, int]) -> bool:
-            node = self.grid.get(pos)
-            return not node.reachable
+            return not arr.passable[pos[0] * arr.height + pos[1]]
 
-        pos1 = node1.x, node1.y
-        pos2 = node2.x, node2.y
+        pos1 = arr.to_pos(idx1)
+        pos2 = arr.to_pos(idx2)
         valid = bresenham_line_algorithm.get_line(pos1, pos2, cannot_move_through)
         return valid
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import bisect
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from app.utilities.typing import Pos
+
+class ReachabilityEntry():
+    __slots__ = ['valid_moves', 'predecessors', 'examined', 'occupancy_version']
+
+    def __init__(self, valid_moves: FrozenSet[Pos], predecessors: Dict[Pos, Optional[Pos]],
+                 examined: Set[Pos], occupancy_version: int):
+        self.valid_moves = valid_moves
+        self.predecessors = predecessors
+        # Every position whose occupancy was checked while finding the valid moves
+        # Changes in occupancy anywhere else cannot affect the result
+        self.examined = examined
+        self.occupancy_version = occupancy_version
+
+class ReachabilityCache():
+    """
+    Stores the result of the movement Djikstra for a unit so that repeated
+    move range queries for the same unit are nearly free.
+
+    The key is built by the PathSystem and should capture everything about
+    the unit that affects its move range (position, team, movement group,
+    movement left, etc.). The board tells the cache when something about
+    the map changes:
+
+    - occupancy_changed(pos): a unit arrived at or left pos. Only
+      entries that examined pos are invalidated.
+    - terrain_changed(): mcost or bounds changed. Everything is invalidated.
+    - vision_changed(): fog of war changed. Everything is invalidated.
+    """
+    max_entries = 256
+    max_occupancy_log = 1024
+
+    def __init__(self):
+        self.entries: OrderedDict[tuple, ReachabilityEntry] = OrderedDict()
+        self.occupancy_version: int = 0
+        # Sorted by version
+        self.occupancy_log: List[Tuple[int, Pos]] = []
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def clear(self):
+        self.entries.clear()
+
+    def occupancy_changed(self, pos: Pos):
+        self.occupancy_version += 1
+        self.occupancy_log.append((self.occupancy_version, pos))
+        if len(self.occupancy_log) > self.max_occupancy_log:
+            self.occupancy_log = self.occupancy_log[self.max_occupancy_log // 2:]
+
+    def terrain_changed(self):
+        self.clear()
+
+    def vision_changed(self):
+        self.clear()
+
+    def _is_valid(self, entry: ReachabilityEntry) -> bool:
+        if entry.occupancy_version == self.occupancy_version:
+            return True
+        if not self.occupancy_log or self.occupancy_log[0][0] > entry.occupancy_version + 1:
+            # We no longer know what changed since this entry was made
+            return False
+        start = bisect.bisect_right(self.occupancy_log, (entry.occupancy_version, (float('inf'), float('inf'))))
+        for _, pos in self.occupancy_log[start:]:
+            if pos in entry.examined:
+                return False
+        # Nothing this entry depends on has changed
+        entry.occupancy_version = self.occupancy_version
+        return True
+
+    def get(self, key: tuple) -> Optional[ReachabilityEntry]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            if self._is_valid(entry):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            del self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: tuple, valid_moves: Set[Pos], predecessors: Dict[Pos, Optional[Pos]],
+            examined: Set[Pos]) -> ReachabilityEntry:
+        entry = ReachabilityEntry(frozenset(valid_moves), predecessors, examined, self.occupancy_version)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def get_path(self, key: tuple, position: Pos) -> Optional[List[Pos]]:
+        """
+        Returns the path to position using the stored predecessor map,
+        with the goal position first and the start position last, like get_path.
+        Returns None if there is no valid entry or position is not reachable.
+        """
+        entry = self.get(key)
+        if not entry or position not in entry.predecessors:
+            return None
+        path = []
+        while position:
+            path.append(position)
+            position = entry.predecessors[position]
+        return path
+
+def record_examined(can_move_through: Callable[[Pos], bool], examined: Set[Pos]) -> Callable[[Pos], bool]:
+    def wrapped(pos: Pos) -> bool:
+        examined.add(pos)
+        return can_move_through(pos)
+    return wrapped
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.utilities.typing import Pos
+
+@lru_cache(256)
+def _group_offsets(offsets: FrozenSet[Pos]) -> List[Tuple[int, List[int]]]:
+    by_dx: Dict[int, List[int]] = {}
+    for dx, dy in offsets:
+        by_dx.setdefault(dx, []).append(dy)
+    return sorted((dx, sorted(dys)) for dx, dys in by_dx.items())
+
+class MaskGrid():
+    """
+    Stores sets of positions within some bounds as the bits of an int,
+    where position (x, y) is bit (y - top) * width + (x - left).
+
+    Set algebra on these masks is just int algebra (|, &, & ~),
+    and moving every position in a mask by the same offset is just a shift,
+    so spreading a set of positions out by a list of offsets
+    (like a weapon's range) takes one shift per offset,
+    no matter how many positions are in the set.
+
+    Use get_grid to get one, since they're cached per bounds.
+    """
+    def __init__(self, bounds: Tuple[int, int, int, int]):
+        self.bounds = bounds
+        self.left, self.top, right, bottom = bounds
+        self.width = right - self.left + 1
+        self.height = bottom - self.top + 1
+        self.size = self.width * self.height
+        self.full = (1 << self.size) - 1
+        # One bit at the start of each row
+        self._rows = sum(1 << (y * self.width) for y in range(self.height))
+        # Key: dx, Value: mask of the columns that stay in bounds when moved by dx
+        self._column_masks: Dict[int, int] = {}
+
+    def contains(self, pos: Pos) -> bool:
+        return self.bounds[0] <= pos[0] <= self.bounds[2] and self.bounds[1] <= pos[1] <= self.bounds[3]
+
+    def from_positions(self, positions: Iterable[Pos]) -> Optional[int]:
+        """
+        Mask of positions. Returns None if any of them are out of bounds,
+        since they could not be represented
+        """
+        data = bytearray((self.size + 7) // 8)
+        left, top, width, height = self.left, self.top, self.width, self.height
+        for x, y in positions:
+            x -= left
+            y -= top
+            if not (0 <= x < width and 0 <= y < height):
+                return None
+            idx = y * width + x
+            data[idx >> 3] |= 1 << (idx & 7)
+        return int.from_bytes(data, 'little')
+
+    def to_positions(self, mask: int) -> Set[Pos]:
+        positions = set()
+        left, top, width = self.left, self.top, self.width
+        # Reversed, so character i is bit i
+        bits = bin(mask)[:1:-1]
+        idx = bits.find('1')
+        while idx != -1:
+            y, x = divmod(idx, width)
+            positions.add((x + left, y + top))
+            idx = bits.find('1', idx + 1)
+        return positions
+
+    def _get_column_mask(self, dx: int) -> int:
+        column_mask = self._column_masks.get(dx)
+        if column_mask is None:
+            row = (1 << self.width) - 1
+            if dx >= 0:
+                row >>= dx
+            else:
+                row &= ~((1 << -dx) - 1)
+            column_mask = self._column_masks[dx] = row * self._rows
+        return column_mask
+
+    def spread(self, mask: int, offsets: FrozenSet[Pos]) -> int:
+        """
+        Mask of every position that is one of the offsets
+        away from a position in mask, and still in bounds
+        """
+        width, height = self.width, self.height
+        result = 0
+        for dx, dys in _group_offsets(offsets):
+            if -width < dx < width:
+                moved = mask & self._get_column_mask(dx)
+                moved = moved << dx if dx >= 0 else moved >> -dx
+                for dy in dys:
+                    if -height < dy < height:
+                        shift = dy * width
+                        result |= moved << shift if shift >= 0 else moved >> -shift
+        return result & self.full
+
+@lru_cache(16)
+def get_grid(bounds: Tuple[int, int, int, int]) -> MaskGrid:
+    return MaskGrid(bounds)
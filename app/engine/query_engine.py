@@ -187,10 +187,36 @@ class GameQueryEngine():
         """
         position = self._resolve_pos(position)
         if position:
+            if self.game.board:
+                nearest = self.game.board.unit_index.nearest(position, num, teams=('player',), condition=self._on_field)
+                distances = {unit: distance for unit, distance in nearest}
+                units = self.game.sort_in_registry_order(list(distances))
+                return sorted([(unit, distances[unit]) for unit in units], key=lambda pair: pair[1])[:num]
             return sorted([(unit, utils.calculate_distance(unit.position, position)) for unit in self.game.get_player_units()],
                             key=lambda pair: pair[1])[:num]
         return []
 
+    def _on_field(self, unit: UnitObject) -> bool:
+        """Same check as game.get_all_units, for units found in the board's unit index"""
+        return bool(unit.position) and not unit.dead and not unit.is_dying and 'Tile' not in unit.tags
+
+    def _get_nearby_units(self, units: List[UnitObject], nid=None, team=None, tag=None, party=None) -> List[UnitObject]:
+        """Filters units found in the board's unit index, and puts them back in the order of game.get_all_units"""
+        res = []
+        for unit in units:
+            if not self._on_field(unit):
+                continue
+            if tag and not tag in unit.tags:
+                continue
+            if nid and not unit.nid == nid:
+                continue
+            if team and not unit.team == team:
+                continue
+            if party and not unit.party == party:
+                continue
+            res.append(unit)
+        return self.game.sort_in_registry_order(res)
+
     def get_units_within_distance(self, position, dist: int = 1, nid=None, team=None, tag=None, party=None) -> List[Tuple[UnitObject, int]]:
         """Return a list containing all units within `dist` distance to the specific position
         that match specific criteria
@@ -206,6 +232,9 @@ class GameQueryEngine():
             within the specified `dist` that match criteria.
         """
         position = self._resolve_pos(position)
+        if position and self.game.board:
+            nearby = self.game.board.unit_index.in_radius(position, dist, teams=(team,) if team else None)
+            return self._get_nearby_units([unit for unit, _ in nearby], nid, team, tag, party)
         res = []
         for unit in self.game.get_all_units():
             if tag and not tag in unit.tags:
@@ -248,6 +277,8 @@ class GameQueryEngine():
             x1, x2 = x2, x1
         if y1 > y2:
             y1, y2 = y2, y1
+        if self.game.board:
+            return self._get_nearby_units(self.game.board.unit_index.in_rect((x1, y1), (x2, y2)))
         target_units = []
         for unit in self.game.get_all_units():
             ux, uy = unit.position
@@ -284,6 +315,9 @@ class GameQueryEngine():
         region = self._resolve_to_region(region)
         if not region:
             return []
+        if self.game.board:
+            units = self.game.board.unit_index.in_region(region, teams=(team,) if team else None)
+            return self._get_nearby_units(units, nid, team, tag)
         all_units = []
         for unit in self.game.get_all_units():
             if nid and nid != unit.nid:
@@ -377,6 +411,20 @@ class GameQueryEngine():
         pos = self._resolve_pos(pos)
         return self.game.get_terrain_nid(self.game.tilemap, pos)
 
+    def get_threat(self, position, team: NID = 'player') -> int:
+        """Returns how many units hostile to a team could attack a position with their weapons.
+        Computed once per phase, so it is cheap to call from AI conditions.
+        Args:
+            position: position or unit
+            team (optional): team being threatened. Defaults to 'player'.
+        Returns:
+            int: the number of hostile units that can reach and attack the position
+        """
+        position = self._resolve_pos(position)
+        if not position or not self.game.board.check_bounds(position):
+            return 0
+        return self.game.board.distance_fields.get_threat(team, position)
+
     def has_achievement(self, nid) -> bool:
         """Checks if an achievement is completed
         Args:
@@ -1,7 +1,6 @@
 import os, shutil, glob, re
 from datetime import datetime
 from typing import Optional
-import threading
 
 try:
     import cPickle as pickle
@@ -12,18 +11,27 @@ from app.utilities import str_utils
 from app.data.database.database import DB
 
 import app.engine.config as cf
+from app.engine import save_store
 from app.engine.objects.item import ItemObject
 from app.engine.objects.skill import SkillObject
 
 import logging
 
-SAVE_THREAD = None
+# Writes saves in the background, in the order they were made
+SAVE_WRITER = save_store.SaveWriter()
 
 def GAME_NID():
     return str(DB.constants.value('game_nid'))
 
 SUSPEND_LOC = 'saves/' + GAME_NID() + '-suspend.pmeta'
 
+def get_store_loc():
+    # Where the sections shared by all of this game's saves go
+    return 'saves/' + GAME_NID() + '-sections'
+
+# Metadata of every save, so save slots don't each have to read their metadata file
+CATALOG = save_store.SaveCatalog('saves/' + GAME_NID() + '-catalog.pidx')
+
 class SaveSlot():
     no_name = '--NO DATA--'
 
@@ -42,9 +50,8 @@ class SaveSlot():
         self.read()
 
     def read(self):
-        if os.path.exists(self.meta_loc):
-            with open(self.meta_loc, 'rb') as fp:
-                save_metadata = pickle.load(fp)
+        save_metadata = CATALOG.get(self.meta_loc)
+        if save_metadata:
             self.name = save_metadata['level_title']
             self.playtime = save_metadata['playtime']
             self.realtime = save_metadata['realtime']
@@ -86,28 +93,28 @@ def save_io(s_dict, meta_dict, old_slot, slot, force_loc=None, name=None):
 
     logging.info("Saving to %s", save_loc)
 
-    with open(save_loc, 'wb') as fp:
-        # pickle.dump(s_dict, fp, -1)
-        try:
-            pickle.dump(s_dict, fp)
-        except TypeError as e:
-            # There's a surface somewhere in the dictionary of things to save...
-            logging.error(e)
-            dict_print(s_dict)
-            print(e)
-            for k, v in s_dict.items():
-                try:
-                    pickle.dumps(v)
-                except TypeError as e2:
-                    logging.error(e2)
-                    print(e2)
-                    logging.error("The offending object is in %s" % k)
-                    print("The offending object is in %s" % k)
-                    logging.error(v)
-                    print(v)
+    try:
+        num_written = save_store.write_save(save_loc, s_dict, get_store_loc())
+        logging.info("Wrote %d new save sections", num_written)
+    except TypeError as e:
+        # There's a surface somewhere in the dictionary of things to save...
+        logging.error(e)
+        dict_print(s_dict)
+        print(e)
+        for k, v in s_dict.items():
+            try:
+                pickle.dumps(v)
+            except TypeError as e2:
+                logging.error(e2)
+                print(e2)
+                logging.error("The offending object is in %s" % k)
+                print("The offending object is in %s" % k)
+                logging.error(v)
+                print(v)
 
     with open(meta_loc, 'wb') as fp:
         pickle.dump(meta_dict, fp)
+    CATALOG.put(meta_loc, meta_dict)
 
     # For restart
     if not force_loc:
@@ -119,6 +126,7 @@ def save_io(s_dict, meta_dict, old_slot, slot, force_loc=None, name=None):
             if save_loc != r_save:
                 shutil.copy(save_loc, r_save)
                 shutil.copy(meta_loc, r_save_meta)
+                CATALOG.put(r_save_meta, meta_dict)
         elif old_slot is not None:
             old_name = 'saves/' + GAME_NID() + '-restart' + str(old_slot) + '.p'
             old_name_meta = old_name + 'meta'
@@ -136,6 +144,10 @@ def save_io(s_dict, meta_dict, old_slot, slot, force_loc=None, name=None):
 
         shutil.copy(save_loc, preload_save)
         shutil.copy(meta_loc, preload_save_meta)
+        CATALOG.put(preload_save_meta, meta_dict)
+
+    # Sections only used by saves that were just overwritten
+    save_store.collect_garbage(get_store_loc())
 
 def suspend_game(game_state, kind, slot: int = None, name=None, display_name=None):
     """
@@ -157,9 +169,7 @@ def suspend_game(game_state, kind, slot: int = None, name=None, display_name=Non
     else:
         force_loc = None
 
-    global SAVE_THREAD
-    SAVE_THREAD = threading.Thread(target=save_io, args=(s_dict, meta_dict, old_save_slot, slot, force_loc, name))
-    SAVE_THREAD.start()
+    SAVE_WRITER.submit(save_io, s_dict, meta_dict, old_save_slot, slot, force_loc, name)
 
 def load_game(game_state, save_slot: SaveSlot):
     """
@@ -167,8 +177,7 @@ def load_game(game_state, save_slot: SaveSlot):
     """
     save_loc = save_slot.save_loc
     logging.info("Loading from %s", save_loc)
-    with open(save_loc, 'rb') as fp:
-        s_dict = pickle.load(fp)
+    s_dict = save_store.read_save(save_loc)
     game_state.build_new()
     game_state.load(s_dict)
     game_state.current_save_slot = save_slot.idx
@@ -218,10 +227,12 @@ def get_all_saves():
 def remove_suspend():
     if not cf.SETTINGS['debug'] and os.path.exists(SUSPEND_LOC):
         os.remove(SUSPEND_LOC)
+        CATALOG.remove(SUSPEND_LOC)
 
 def delete_suspend():
     if os.path.exists(SUSPEND_LOC):
         os.remove(SUSPEND_LOC)
+        CATALOG.remove(SUSPEND_LOC)
 
 def delete_save(game_state, num: Optional[int] = None):
     """
@@ -237,10 +248,12 @@ def delete_save(game_state, num: Optional[int] = None):
     r_save_fn = 'saves/' + GAME_NID() + '-restart' + str(num) + '.p'
     if os.path.exists(meta_fn):
         os.remove(meta_fn)
+        CATALOG.remove(meta_fn)
     if os.path.exists(save_fn):
         os.remove(save_fn)
     if os.path.exists(r_save_fn):
         os.remove(r_save_fn)
+    SAVE_WRITER.submit(save_store.collect_garbage, get_store_loc())
 
 def get_save_title(save_slots):
     options = [save_slot.get_name() for save_slot in save_slots]
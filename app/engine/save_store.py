@@ -0,0 +1,344 @@
+"""
+Incremental save files
+
+Instead of pickling the whole game state into each save file, every top-level
+section of the save dict is pickled on its own and stored once in a shared,
+content-addressed section store (a directory of compressed blobs named by
+the hash of their contents). The save file itself is just a small manifest
+of which blobs make up the save.
+
+Sections that have not changed since the last save hash the same, so they
+are not written again. Long lists (like the action log) are split into
+fixed-size chunks, so a save only writes the chunks with new entries in them.
+Copies of a save (restart and preload saves) are copies of the manifest,
+and share all of their sections.
+
+Blobs are written before the manifest, and both are written to a temporary
+file and then renamed, so a crash mid-save leaves the previous save intact.
+Blobs that are no longer used by any manifest are removed by collect_garbage.
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import queue
+import struct
+import threading
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+MAGIC = b'LTSAVE1\n'
+# Lists are split into chunks of this many entries
+CHUNK_SIZE = 256
+# Pickled sections smaller than this are kept in the manifest itself
+INLINE_SIZE = 256
+BLOB_EXT = '.blob'
+
+_record_length = struct.Struct('<I')
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as fp:
+        fp.write(data)
+    os.replace(tmp_path, path)
+
+class SectionStore():
+    """
+    Directory of pickled sections, named by the hash of their contents
+    """
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        # Number of blobs actually written to disk, for diagnostics
+        self.num_written: int = 0
+
+    def _get_path(self, digest: str) -> str:
+        return os.path.join(self.store_dir, digest + BLOB_EXT)
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        path = self._get_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(self.store_dir, exist_ok=True)
+            _write_atomic(path, zlib.compress(data, 1))
+            self.num_written += 1
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        with open(self._get_path(digest), 'rb') as fp:
+            return zlib.decompress(fp.read())
+
+    def get_digests(self) -> Set[str]:
+        if not os.path.isdir(self.store_dir):
+            return set()
+        return {fn[:-len(BLOB_EXT)] for fn in os.listdir(self.store_dir) if fn.endswith(BLOB_EXT)}
+
+    def remove(self, digest: str):
+        try:
+            os.remove(self._get_path(digest))
+        except OSError as e:
+            logging.warning("Could not remove save section %s: %s", digest, e)
+
+    def _put_value(self, value) -> tuple:
+        data = pickle.dumps(value)
+        if len(data) < INLINE_SIZE:
+            return ('value', data)
+        return ('blob', self.put(data))
+
+    def _put_chunks(self, values: list) -> List[str]:
+        return [self.put(pickle.dumps(values[i:i + CHUNK_SIZE])) for i in range(0, len(values), CHUNK_SIZE)]
+
+    def put_section(self, key: str, value) -> tuple:
+        if key == 'action_log' and isinstance(value, tuple) and value and isinstance(value[0], list):
+            # (actions, first free action, record) -- only the actions grow
+            return ('action_log', self._put_chunks(value[0]), pickle.dumps(value[1:]))
+        if isinstance(value, list) and len(value) > CHUNK_SIZE:
+            return ('list', self._put_chunks(value))
+        return self._put_value(value)
+
+    def get_section(self, entry: tuple):
+        kind = entry[0]
+        if kind == 'value':
+            return pickle.loads(entry[1])
+        elif kind == 'blob':
+            return pickle.loads(self.get(entry[1]))
+        elif kind == 'list':
+            return self._get_chunks(entry[1])
+        elif kind == 'action_log':
+            return (self._get_chunks(entry[1]), *pickle.loads(entry[2]))
+        raise ValueError("Unknown save section kind %s" % kind)
+
+    def _get_chunks(self, digests: List[str]) -> list:
+        values = []
+        for digest in digests:
+            values.extend(pickle.loads(self.get(digest)))
+        return values
+
+def _get_digests(entry: tuple) -> List[str]:
+    kind = entry[0]
+    if kind == 'blob':
+        return [entry[1]]
+    elif kind in ('list', 'action_log'):
+        return list(entry[1])
+    return []
+
+def read_manifest(save_loc: str) -> Optional[dict]:
+    """Returns the manifest of an incremental save file, or None if it is an ordinary pickled save"""
+    with open(save_loc, 'rb') as fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            return None
+        return pickle.load(fp)
+
+def write_save(save_loc: str, s_dict: Dict[str, Any], store_dir: str) -> int:
+    """
+    Writes s_dict as an incremental save at save_loc, with its sections in store_dir,
+    which should be in the same directory as save_loc.
+
+    Returns how many new sections had to be written
+    """
+    store = SectionStore(store_dir)
+    sections = {key: store.put_section(key, value) for key, value in s_dict.items()}
+    manifest = {'store': os.path.basename(store_dir),
+                'sections': sections}
+    _write_atomic(save_loc, MAGIC + pickle.dumps(manifest))
+    return store.num_written
+
+def read_save(save_loc: str) -> Dict[str, Any]:
+    """
+    Reads a save file written by write_save, or an ordinary pickled save
+    """
+    manifest = read_manifest(save_loc)
+    if manifest is None:
+        with open(save_loc, 'rb') as fp:
+            return pickle.load(fp)
+    store = SectionStore(os.path.join(os.path.dirname(save_loc), manifest['store']))
+    return {key: store.get_section(entry) for key, entry in manifest['sections'].items()}
+
+def collect_garbage(store_dir: str) -> int:
+    """
+    Removes every section in store_dir that is not used by any
+    save file next to it.
+
+    Returns how many sections were removed
+    """
+    store = SectionStore(store_dir)
+    store_name = os.path.basename(store_dir)
+    used: Set[str] = set()
+    for save_loc in glob.glob(os.path.join(glob.escape(os.path.dirname(store_dir)), '*.p')):
+        try:
+            manifest = read_manifest(save_loc)
+        except Exception as e:
+            # Don't throw anything away if we can't tell what's in use
+            logging.error("Could not read save manifest %s: %s", save_loc, e)
+            return 0
+        if manifest and manifest['store'] == store_name:
+            for entry in manifest['sections'].values():
+                used.update(_get_digests(entry))
+    unused = store.get_digests() - used
+    for digest in unused:
+        store.remove(digest)
+    return len(unused)
+
+class SaveWriter():
+    """
+    Writes saves in the background, one at a time and in the order they were made.
+
+    At most max_pending saves can wait to be written. Past that, submit
+    blocks until the writer catches up. The writer thread only lives while
+    there is something to write, and is not a daemon, so the game does not
+    exit with saves half written.
+    """
+    def __init__(self, max_pending: int = 4):
+        self.jobs: queue.Queue = queue.Queue(max_pending)
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    def submit(self, func: Callable, *args):
+        self.jobs.put((func, args))
+        with self.lock:
+            if not self.thread:
+                self.thread = threading.Thread(target=self._run, name='save_writer')
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                if self.jobs.empty():
+                    self.thread = None
+                    return
+            func, args = self.jobs.get()
+            try:
+                func(*args)
+            except Exception as e:
+                logging.exception("Failed to write save: %s", e)
+            finally:
+                self.jobs.task_done()
+
+    def join(self):
+        """Waits until every submitted save has been written"""
+        self.jobs.join()
+
+class SaveCatalog():
+    """
+    Index of the metadata of every save, so the save menus don't have
+    to open and unpickle a metadata file for every save slot.
+
+    The index is read once when the catalog is made. After that, changes
+    are appended to the end of the index file, one record at a time.
+    A record that was only partly written (because the game crashed)
+    is ignored. When the file has built up enough old records,
+    it is rewritten to a temporary file and renamed over the old one.
+
+    Entries remember the modification time and size of their metadata file.
+    They are checked against the file when they are looked up, and the
+    metadata file is only read if it changed, so saves written by other
+    versions of the engine, or copied in by hand, are still picked up.
+    """
+    def __init__(self, index_loc: str):
+        self.index_loc = index_loc
+        self.lock = threading.Lock()
+        # Key: metadata file location, Value: ((mtime, size), metadata)
+        self.entries: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+        self.num_records: int = 0
+        self._read_index()
+
+    def _read_index(self):
+        if not os.path.exists(self.index_loc):
+            return
+        with open(self.index_loc, 'rb') as fp:
+            data = fp.read()
+        pos = 0
+        while pos + _record_length.size <= len(data):
+            length = _record_length.unpack_from(data, pos)[0]
+            end = pos + _record_length.size + length
+            if end > len(data):
+                break
+            try:
+                meta_loc, stat, metadata = pickle.loads(data[pos + _record_length.size:end])
+            except Exception:
+                break
+            if metadata is None:
+                self.entries.pop(meta_loc, None)
+            else:
+                self.entries[meta_loc] = (stat, metadata)
+            self.num_records += 1
+            pos = end
+        if pos < len(data):
+            logging.warning("Save catalog %s was not fully written, rewriting it", self.index_loc)
+            self._rewrite()
+
+    def _append(self, meta_loc: str, stat: Optional[Tuple[int, int]], metadata: Optional[dict]):
+        record = pickle.dumps((meta_loc, stat, metadata))
+        try:
+            os.makedirs(os.path.dirname(self.index_loc) or '.', exist_ok=True)
+            with open(self.index_loc, 'ab') as fp:
+                fp.write(_record_length.pack(len(record)) + record)
+        except OSError as e:
+            logging.error("Could not write to save catalog %s: %s", self.index_loc, e)
+            return
+        self.num_records += 1
+        if self.num_records > 2 * len(self.entries) + 32:
+            self._rewrite()
+
+    def _rewrite(self):
+        data = bytearray()
+        for meta_loc, (stat, metadata) in self.entries.items():
+            record = pickle.dumps((meta_loc, stat, metadata))
+            data += _record_length.pack(len(record)) + record
+        try:
+            _write_atomic(self.index_loc, bytes(data))
+        except OSError as e:
+            logging.error("Could not rewrite save catalog %s: %s", self.index_loc, e)
+            return
+        self.num_records = len(self.entries)
+
+    @staticmethod
+    def _stat(meta_loc: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(meta_loc)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, meta_loc: str) -> Optional[dict]:
+        """The metadata saved at meta_loc, or None if there is no save there"""
+        stat = self._stat(meta_loc)
+        with self.lock:
+            entry = self.entries.get(meta_loc)
+            if stat is None:
+                if entry:
+                    del self.entries[meta_loc]
+                    self._append(meta_loc, None, None)
+                return None
+            if entry and entry[0] == stat:
+                return entry[1]
+            try:
+                with open(meta_loc, 'rb') as fp:
+                    metadata = pickle.load(fp)
+            except Exception as e:
+                logging.error("Could not read save metadata %s: %s", meta_loc, e)
+                return None
+            self.entries[meta_loc] = (stat, metadata)
+            self._append(meta_loc, stat, metadata)
+            return metadata
+
+    def put(self, meta_loc: str, metadata: dict):
+        """Call after writing metadata to meta_loc"""
+        stat = self._stat(meta_loc)
+        if stat is None:
+            return
+        with self.lock:
+            self.entries[meta_loc] = (stat, metadata)
+            self._append(meta_loc, stat, metadata)
+
+    def remove(self, meta_loc: str):
+        """Call after deleting the metadata file at meta_loc"""
+        with self.lock:
+            if meta_loc in self.entries:
+                del self.entries[meta_loc]
+                self._append(meta_loc, None, None)
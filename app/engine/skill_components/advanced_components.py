@@ -5,6 +5,7 @@ from app.data.database.components import ComponentType
 from app.data.database.skill_components import SkillComponent, SkillTags
 from app.engine import action, equations, item_funcs, skill_system
 from app.engine.game_state import game
+from app.engine.objects.skill import SkillObject
 import app.engine.combat.playback as pb
 from app.utilities import static_random
 from app.engine.source_type import SourceType
@@ -48,6 +49,7 @@ class MultiSkill(SkillComponent):
         for subaction in subactions:
             action.execute(subaction)
             subaction.skill_obj.components.append(parent_condition)
+            SkillObject.components_changed()
 
     # remove all child skills when the skill is removed
     def after_remove(self, unit, skill):
@@ -13,6 +13,7 @@ class BuildCharge(SkillComponent):
     value = 10
 
     ignore_conditional = True
+    condition_dependencies = frozenset({'data'})
 
     def init(self, skill):
         self.skill.data['charge'] = 0
@@ -45,6 +46,7 @@ class DrainCharge(SkillComponent):
     value = 1
 
     ignore_conditional = True
+    condition_dependencies = frozenset({'data'})
 
     def init(self, skill):
         self.skill.data['charge'] = self.value
@@ -166,6 +168,7 @@ class CostMana(SkillComponent):
     value = 2
 
     ignore_conditional = True
+    condition_dependencies = frozenset({'mana'})
 
     def condition(self, unit, item):
         return unit.current_mana >= self.value
@@ -184,6 +187,7 @@ class CheckMana(SkillComponent):
     value = 2
 
     ignore_conditional = True
+    condition_dependencies = frozenset({'mana'})
 
     def condition(self, unit, item):
         return unit.current_mana >= self.value
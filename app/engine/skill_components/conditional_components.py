@@ -11,6 +11,8 @@ class CombatCondition(SkillComponent):
     value = 'False'
 
     ignore_conditional = True
+    # Only reads its own flag, and every change to the flag alters the game state
+    condition_dependencies = frozenset()
     _condition = False
 
     def pre_combat(self, playback, unit, item, target, item2, mode):
@@ -1,45 +1,193 @@
 from app.data.resources.sounds import SongPrefab
 from app.utilities.data import HasNid
 from app.utilities.typing import NID
+from collections import OrderedDict
 from enum import Enum
-from typing import Set, List, Optional
+from typing import Dict, Set, List, Optional
 from abc import ABC, abstractmethod
+import queue
+import threading
+import time
 import pygame
 
 from app.utilities import utils
 from app.data.resources.resources import RESOURCES
+from app.engine import config as cf
 from app.engine import engine
 
 import logging
 
 class SongObject(HasNid):
+    """
+    A song, plus its battle variant and intro if it has them.
+
+    The sounds are decoded with load, which is usually called by the
+    SongDecoder thread, so a song can be handed to a channel before it
+    is ready to play. Until then, song, battle and intro are None.
+    """
     def __init__(self, prefab: SongPrefab):
         self.nid = prefab.nid
-        self.song = pygame.mixer.Sound(prefab.full_path)
-        self.battle = pygame.mixer.Sound(prefab.battle_full_path) if prefab.battle_full_path else None
-        self.intro = pygame.mixer.Sound(prefab.intro_full_path) if prefab.intro_full_path else None
+        self.prefab = prefab
+        self.has_battle = bool(prefab.battle_full_path)
+        self.song: Optional[pygame.mixer.Sound] = None
+        self.battle: Optional[pygame.mixer.Sound] = None
+        self.intro: Optional[pygame.mixer.Sound] = None
+
+        self.pending = False  # Waiting for the decoder
+        self.failed = False
+        self.loaded = threading.Event()  # Set when decoding finishes, whether or not it worked
+        self.nbytes = 0
+        self.decode_time = 0.0  # Seconds spent decoding the last time it was loaded
 
         self.channel = None
 
-class MusicDict(dict):
+    @property
+    def ready(self) -> bool:
+        return self.loaded.is_set() and not self.failed
+
+    def load(self):
+        start = time.perf_counter()
+        try:
+            prefab = self.prefab
+            self.song = pygame.mixer.Sound(prefab.full_path)
+            self.battle = pygame.mixer.Sound(prefab.battle_full_path) if prefab.battle_full_path else None
+            self.intro = pygame.mixer.Sound(prefab.intro_full_path) if prefab.intro_full_path else None
+            self.nbytes = sum(memoryview(sound).nbytes for sound in (self.song, self.battle, self.intro) if sound)
+        except Exception as e:
+            logging.warning("Could not load song %s: %s", self.nid, e)
+            self.failed = True
+        self.decode_time = time.perf_counter() - start
+        self.pending = False
+        self.loaded.set()
+
+    def unload(self):
+        self.song = self.battle = self.intro = None
+        self.nbytes = 0
+        self.loaded.clear()
+
+    def wait(self) -> bool:
+        """Blocks until the song has finished decoding. Returns whether it can be played"""
+        self.loaded.wait()
+        return not self.failed
+
+class SongDecoder():
+    """
+    Decodes songs in the background, one at a time and in the order they were asked for.
+    The decoder thread only lives while there are songs to decode.
+    """
+    def __init__(self):
+        self.jobs: queue.Queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    def submit(self, song: SongObject):
+        self.jobs.put(song)
+        with self.lock:
+            if not self.thread:
+                self.thread = threading.Thread(target=self._run, name='song_decoder', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                if self.jobs.empty():
+                    self.thread = None
+                    return
+            song = self.jobs.get()
+            try:
+                song.load()
+            finally:
+                self.jobs.task_done()
+
+    def is_busy(self) -> bool:
+        return self.jobs.unfinished_tasks > 0
+
+    def join(self):
+        self.jobs.join()
+
+class MusicDict(OrderedDict):
+    """
+    Songs that have been asked for, least recently used first.
+
+    The sounds of a song are decoded in the background by request, and
+    thrown away again (least recently used first) once the decoded songs
+    take up more than the budget, set by 'music_cache_mb' in the config.
+    A song that is on a channel is never thrown away. Thrown away songs keep
+    their SongObject, so the sound controller's song stack stays valid,
+    and are decoded again the next time they are asked for.
+    """
+    default_budget_mb = 256
+
+    def __init__(self):
+        super().__init__()
+        self.decoder = SongDecoder()
+
+    def get_max_bytes(self) -> int:
+        return int(cf.SETTINGS.get('music_cache_mb', self.default_budget_mb)) * 1024 * 1024
+
     def preload(self, nids):
         for nid in nids:
-            self.get(nid)
+            self.request(nid)
 
-    def get(self, val):
-        if val not in self:
-            logging.debug("Loading %s into MusicDict", val)
+    def request(self, val) -> Optional[SongObject]:
+        """
+        Returns the song without waiting for it to be decoded,
+        and queues it to be decoded if it is not already
+        """
+        song = super().get(val)
+        if song is None:
+            if val in self:  # Song that failed to load
+                return None
             prefab = RESOURCES.music.get(val)
-            if prefab:
-                try:
-                    self[val] = SongObject(prefab)
-                except Exception as e:
-                    self[val] = None
-                    logging.warning(e)
-                    return None
-            else:
+            if not prefab:
                 return None
-        return self[val]
+            logging.debug("Loading %s into MusicDict", val)
+            song = self[val] = SongObject(prefab)
+        elif song.failed:
+            return None
+        self.move_to_end(val)
+        if not song.loaded.is_set() and not song.pending:
+            song.pending = True
+            self.decoder.submit(song)
+        return song
+
+    def get(self, val) -> Optional[SongObject]:
+        """Returns the song, waiting for it to be decoded"""
+        song = self.request(val)
+        if song and not song.wait():
+            self[val] = None
+            return None
+        return song
+
+    def resident_bytes(self) -> int:
+        return sum(song.nbytes for song in self.values() if song and song.ready)
+
+    def trim(self):
+        """Throws away the least recently used songs until the rest fit in the budget"""
+        max_bytes = self.get_max_bytes()
+        total = self.resident_bytes()
+        if total <= max_bytes:
+            return
+        for nid, song in list(self.items()):
+            if song and song.ready and not song.channel:
+                logging.debug("Unloading %s from MusicDict", nid)
+                total -= song.nbytes
+                song.unload()
+                if total <= max_bytes:
+                    break
+
+    def get_stats(self) -> dict:
+        songs = {}
+        for nid, song in self.items():
+            if song:
+                songs[nid] = {'bytes': song.nbytes if song.ready else 0,
+                              'decode_time': song.decode_time,
+                              'ready': song.ready,
+                              'pending': song.pending}
+        return {'resident_bytes': self.resident_bytes(),
+                'max_bytes': self.get_max_bytes(),
+                'decoding': self.decoder.is_busy(),
+                'songs': songs}
 
     def clear(self, song_to_keep: NID = None):
         if not song_to_keep:
@@ -90,10 +238,24 @@ class Channel():
         # Because if we don't, we'll keep thinking play means we've changed songs and keep doing it
         # again and again
 
+        self.current_sound: Optional[pygame.mixer.Sound] = None
+
+        # Whether we were told to play before our song finished decoding
+        # If so, we'll start playing (and start any fade) once it's ready
+        self.waiting_for_song = False
+
     def update(self, event_list, current_time):
         if self.state == "stopped":
             pass
         if self.state in self.playing_states:
+            if self.waiting_for_song:
+                if not self.current_song.ready:
+                    if self.current_song.failed:  # Nothing to wait for
+                        self.waiting_for_song = False
+                    return False
+                logging.debug("%s finished waiting for %s", self.nid, self.current_song.nid)
+                self.last_update = current_time
+                self._play()
             for event in event_list:
                 if event.type == self._channel.get_endevent():
                     if current_time - self.last_play > 32:
@@ -149,27 +311,35 @@ class Channel():
             self.last_state = "stopped"
             self.state = "stopped"
             return
+        if not self.current_song.ready:
+            self.waiting_for_song = not self.current_song.failed
+            return
+        self.waiting_for_song = False
         if self.num_plays > 0:
             self.num_plays -= 1
 
         if self.name == "battle":
             if self.current_song.battle:
-                self._channel.play(self.current_song.battle, 0)
-                self.reset_volume()
+                self._play_sound(self.current_song.battle)
         else:
             if self.current_song.intro and not self.played_intro:
                 # logging.debug("Playing Intro %s", self.current_song.intro)
-                self._channel.play(self.current_song.intro, 0)
+                self._play_sound(self.current_song.intro)
                 self.played_intro = True
             else:
                 # logging.debug("Playing %s", self.current_song.song)
-                self._channel.play(self.current_song.song, 0)
-            self.reset_volume()
+                self._play_sound(self.current_song.song)
+
+    def _play_sound(self, sound: pygame.mixer.Sound):
+        self.current_sound = sound
+        self.reset_volume()
+        self._channel.play(sound, 0)
 
     def set_current_song(self, song, num_plays=-1):
         self.current_song = song
         self.num_plays = num_plays
         self.played_intro = False
+        self.waiting_for_song = False
 
     def set_fade_in_time(self, fade_in):
         self.fade_in_time = max(fade_in, 1)
@@ -181,8 +351,10 @@ class Channel():
         logging.debug("%s Clear", self.nid)
         self._channel.stop()
         self.current_song = None
+        self.current_sound = None
         self.num_plays = 0
         self.played_intro = False
+        self.waiting_for_song = False
         self.last_state = "stopped"
         self.state = "stopped"
 
@@ -239,6 +411,7 @@ class Channel():
         logging.debug("%s Stop: %s", self.nid, self.last_state)
         self._channel.stop()
         self.played_intro = False
+        self.waiting_for_song = False
         self.last_state = "stopped"
         self.state = "stopped"
 
@@ -251,7 +424,10 @@ class Channel():
 
     def reset_volume(self):
         volume = utils.clamp(self.crossfade_volume * self.local_volume * self.global_volume, 0, 1)
-        self._channel.set_volume(volume)
+        # Set on the sound rather than the channel, since changing the volume of
+        # a channel waits on the mixer, which is locked while a song is decoding
+        if self.current_sound:
+            self.current_sound.set_volume(volume)
 
 class ChannelPair():
     def __init__(self, nid):
@@ -307,7 +483,8 @@ class ChannelPair():
         self.battle.set_fade_out_time(fade_out)
 
     def clear(self):
-        if self.current_song:
+        # The song may have moved on to another channel since
+        if self.current_song and self.current_song.channel is self:
             self.current_song.channel = None
         self.current_song = None
         self.channel.clear()
@@ -450,8 +627,18 @@ class SoundController(ABC):
 
     @abstractmethod
     def load_songs(self, nids: Set[NID]):
+        """Starts decoding the songs in the background"""
         pass
 
+    @abstractmethod
+    def is_loading_songs(self) -> bool:
+        return False
+
+    @abstractmethod
+    def get_music_stats(self) -> dict:
+        """Bytes of decoded music held in memory, and how long each song took to decode"""
+        return {}
+
     @abstractmethod
     def flush(self, should_interrupt_current_song=True):
         pass
@@ -539,6 +726,12 @@ class NullSoundController(ABC):
     def load_songs(self, nids: Set[NID]):
         pass
 
+    def is_loading_songs(self) -> bool:
+        return False
+
+    def get_music_stats(self) -> dict:
+        return {}
+
     def flush(self, should_interrupt_current_song=True):
         return None
 
@@ -661,18 +854,18 @@ class DefaultSoundController(SoundController):
         oldest_channel.set_current_song(song, num_plays)
 
     def battle_fade_in(self, next_song_nid, fade=DEFAULT_FADE_TIME_MS, from_start=True) -> Optional[SongObject]:
-        song = MUSIC.get(next_song_nid)
+        song = MUSIC.request(next_song_nid)
         if not song:
             logging.warning("Song '%s' does not exist", next_song_nid)
             return None
-        if song.battle:
+        if song.has_battle:
             self.crossfade(fade)
             return song
         else:
             return self.fade_in(next_song_nid, fade_in=fade, from_start=from_start)
 
     def battle_fade_back(self, song, from_start=True):
-        if song.battle:
+        if song.has_battle:
             self.crossfade()
         elif from_start:
             self.fade_back()
@@ -691,7 +884,9 @@ class DefaultSoundController(SoundController):
 
     def fade_in(self, next_song_nid: NID, num_plays=-1, fade_in=DEFAULT_FADE_TIME_MS, from_start=False) -> Optional[SongObject]:
         logging.info("Fade in '%s'" % next_song_nid)
-        next_song = MUSIC.get(next_song_nid)
+        # Does not wait for the song to be decoded
+        # The channel starts playing (and fading in) once it's ready
+        next_song = MUSIC.request(next_song_nid)
         if not next_song:
             logging.warning("Song '%s' does not exist", next_song_nid)
             return None
@@ -817,6 +1012,8 @@ class DefaultSoundController(SoundController):
             self.current_channel.set_fade_in_time(1)
             self.current_channel.fade_in()
 
+        MUSIC.trim()
+
     # === Other Miscellaneous Funcs ===
     def play_sfx(self, sound, loop=False, volume=1) -> Optional[pygame.mixer.Sound]:
         sfx = SFX.get(sound)
@@ -840,6 +1037,12 @@ class DefaultSoundController(SoundController):
     def load_songs(self, nids: Set[NID]):
         MUSIC.preload(nids)
 
+    def is_loading_songs(self) -> bool:
+        return MUSIC.decoder.is_busy()
+
+    def get_music_stats(self) -> dict:
+        return MUSIC.get_stats()
+
     def flush(self, should_interrupt_current_song=True):
         """Simply flushes the song cache from memory - this prevents memory bloat.
 
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.utilities.typing import NID, Pos
+
+if TYPE_CHECKING:
+    from app.engine.objects.unit import UnitObject
+
+class SpatialUnitIndex():
+    """
+    Keeps track of which units are standing where, bucketed by team and
+    by square chunks of the map, so that neighbourhood queries only have
+    to look at the units in the chunks that overlap the area searched,
+    instead of every unit in the game.
+
+    The game board adds and removes units as they arrive on and leave the map.
+    AI units trying out positions (test arrive and leave) are moved too,
+    so queries see the same positions as unit.position would.
+    Units walking along a path have left the board but are still on the map,
+    so they are kept as moving units, which are found wherever their
+    unit.position is at the time of the query.
+
+    Queries return units in no particular order.
+    """
+    bucket_size = 4
+
+    def __init__(self):
+        # Key: unit, Value: (team, position)
+        self.units: Dict[UnitObject, Tuple[NID, Pos]] = {}
+        # Key: team, Value: units in each chunk of the map
+        self.buckets: Dict[NID, Dict[Pos, Set[UnitObject]]] = {}
+        # Units in the middle of moving, whose positions change without telling the index
+        self.moving: Set[UnitObject] = set()
+
+    def __len__(self) -> int:
+        return len(self.units) + len(self.moving)
+
+    def _get_chunk(self, pos: Pos) -> Pos:
+        return (pos[0] // self.bucket_size, pos[1] // self.bucket_size)
+
+    def add(self, unit: UnitObject, pos: Pos):
+        if unit in self.units or unit in self.moving:
+            self.remove(unit)
+        self.units[unit] = (unit.team, pos)
+        self.buckets.setdefault(unit.team, {}).setdefault(self._get_chunk(pos), set()).add(unit)
+
+    def add_moving(self, unit: UnitObject):
+        """
+        Keeps the unit in the index while it moves,
+        until it is added or removed again
+        """
+        self.remove(unit)
+        self.moving.add(unit)
+
+    def remove(self, unit: UnitObject):
+        self.moving.discard(unit)
+        if unit not in self.units:
+            return
+        team, pos = self.units.pop(unit)
+        chunks = self.buckets[team]
+        chunk = self._get_chunk(pos)
+        chunks[chunk].discard(unit)
+        if not chunks[chunk]:
+            del chunks[chunk]
+
+    def clear(self):
+        self.units.clear()
+        self.buckets.clear()
+        self.moving.clear()
+
+    def get_position(self, unit: UnitObject) -> Optional[Pos]:
+        if unit in self.units:
+            return self.units[unit][1]
+        if unit in self.moving:
+            return unit.position
+        return None
+
+    def _get_team_buckets(self, teams: Optional[Iterable[NID]]) -> List[Dict[Pos, Set[UnitObject]]]:
+        if teams is None:
+            return list(self.buckets.values())
+        return [self.buckets[team] for team in teams if team in self.buckets]
+
+    def _iter_moving(self, teams: Optional[Iterable[NID]]) -> Iterator[Tuple[UnitObject, Pos]]:
+        if teams is not None:
+            teams = set(teams)
+        for unit in self.moving:
+            if unit.position and (teams is None or unit.team in teams):
+                yield unit, unit.position
+
+    def get_units(self, teams: Optional[Iterable[NID]] = None) -> List[UnitObject]:
+        """Every unit in the index on one of the teams (or any team if teams is None)"""
+        if teams is None:
+            return list(self.units) + [unit for unit, _ in self._iter_moving(None)]
+        res = [unit for chunks in self._get_team_buckets(teams) for units in chunks.values() for unit in units]
+        return res + [unit for unit, _ in self._iter_moving(teams)]
+
+    def _iter_rect(self, x1: int, y1: int, x2: int, y2: int,
+                   teams: Optional[Iterable[NID]]) -> Iterator[Tuple[UnitObject, Pos]]:
+        cx1, cy1 = self._get_chunk((x1, y1))
+        cx2, cy2 = self._get_chunk((x2, y2))
+        for chunks in self._get_team_buckets(teams):
+            # Only look at chunks that exist if the rectangle covers more chunks than there are
+            if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(chunks):
+                candidates = (units for (cx, cy), units in chunks.items() if cx1 <= cx <= cx2 and cy1 <= cy <= cy2)
+            else:
+                candidates = (chunks[(cx, cy)] for cx in range(cx1, cx2 + 1) for cy in range(cy1, cy2 + 1)
+                              if (cx, cy) in chunks)
+            for units in candidates:
+                for unit in units:
+                    pos = self.units[unit][1]
+                    if x1 <= pos[0] <= x2 and y1 <= pos[1] <= y2:
+                        yield unit, pos
+        for unit, pos in self._iter_moving(teams):
+            if x1 <= pos[0] <= x2 and y1 <= pos[1] <= y2:
+                yield unit, pos
+
+    def in_rect(self, corner1: Pos, corner2: Pos, teams: Optional[Iterable[NID]] = None) -> List[UnitObject]:
+        """Every unit with a position between the two corners (inclusive)"""
+        x1, x2 = sorted((corner1[0], corner2[0]))
+        y1, y2 = sorted((corner1[1], corner2[1]))
+        return [unit for unit, _ in self._iter_rect(x1, y1, x2, y2, teams)]
+
+    def in_radius(self, pos: Pos, radius: int, teams: Optional[Iterable[NID]] = None) -> List[Tuple[UnitObject, int]]:
+        """Every unit within radius (Manhattan distance) of pos, with its distance"""
+        x, y = pos
+        res = []
+        for unit, (ux, uy) in self._iter_rect(x - radius, y - radius, x + radius, y + radius, teams):
+            distance = abs(ux - x) + abs(uy - y)
+            if distance <= radius:
+                res.append((unit, distance))
+        return res
+
+    def in_region(self, region, teams: Optional[Iterable[NID]] = None) -> List[UnitObject]:
+        """Every unit standing in the region"""
+        if not region.position:
+            return []
+        x, y = region.position
+        width, height = region.size
+        return [unit for unit, pos in self._iter_rect(x, y, x + width - 1, y + height - 1, teams)
+                if region.contains(pos)]
+
+    def nearest(self, pos: Pos, num: int = 1, teams: Optional[Iterable[NID]] = None,
+                condition: Optional[Callable[[UnitObject], bool]] = None) -> List[Tuple[UnitObject, int]]:
+        """
+        The num closest units to pos that satisfy condition, with their distances,
+        sorted by distance. Every unit tied with the last one is also returned,
+        so callers can break ties however they like.
+
+        Searches outwards one ring of chunks at a time, and stops once
+        no unit in the next ring could be closer than the ones already found.
+        """
+        if num <= 0:
+            return []
+        team_buckets = self._get_team_buckets(teams)
+        num_chunks = sum(len(chunks) for chunks in team_buckets)
+        x, y = pos
+        cx, cy = self._get_chunk(pos)
+        # Moving units are not in any chunk, so they are all looked at first
+        found: List[Tuple[UnitObject, int]] = [
+            (unit, abs(ux - x) + abs(uy - y)) for unit, (ux, uy) in self._iter_moving(teams)
+            if condition is None or condition(unit)]
+        found.sort(key=lambda pair: pair[1])
+        chunks_seen = 0
+        ring = 0
+        while chunks_seen < num_chunks:
+            if len(found) >= num:
+                # Any unit in this ring is at least this far away
+                min_distance = (ring - 1) * self.bucket_size + 1
+                if found[num - 1][1] < min_distance:
+                    break
+            for chunk in self._get_ring(cx, cy, ring):
+                for chunks in team_buckets:
+                    units = chunks.get(chunk)
+                    if units is None:
+                        continue
+                    chunks_seen += 1
+                    for unit in units:
+                        if condition is None or condition(unit):
+                            ux, uy = self.units[unit][1]
+                            found.append((unit, abs(ux - x) + abs(uy - y)))
+            found.sort(key=lambda pair: pair[1])
+            ring += 1
+        if len(found) > num:
+            last_distance = found[num - 1][1]
+            found = [pair for pair in found if pair[1] <= last_distance]
+        return found
+
+    def _get_ring(self, cx: int, cy: int, ring: int) -> Iterator[Pos]:
+        """Chunks exactly ring chunks away from (cx, cy), by Chebyshev distance"""
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for i in range(cx - ring, cx + ring + 1):
+            yield (i, cy - ring)
+            yield (i, cy + ring)
+        for j in range(cy - ring + 1, cy + ring):
+            yield (cx - ring, j)
+            yield (cx + ring, j)
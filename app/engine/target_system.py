@@ -4,7 +4,7 @@ from functools import lru_cache
 
 from app.data.database.database import DB
 from app.engine import (combat_calcs, item_funcs, item_system,
-                        line_of_sight, skill_system)
+                        line_of_sight, position_mask, skill_system)
 from app.engine.movement import movement_funcs
 from app.engine.game_state import GameState
 from app.utilities import utils
@@ -24,7 +24,10 @@ class TargetSystem():
             from app.engine.game_state import game
             self.game = game
 
-    # Consider making these sections faster
+    # With at least this many moves, get_shell spreads out a mask of the moves
+    # instead of adding up the shell around each move
+    mask_threshold = 8
+
     def get_shell(self, valid_moves: Set[Pos], potential_range: Set[int],
                   bounds: Tuple[int, int, int, int], manhattan_restriction: Optional[Set[Pos]] = None) -> Set[Pos]:
         """Finds positions in a shell of radius {potential_range} from each of the positions in {valid_moves}.
@@ -38,6 +41,15 @@ class TargetSystem():
         Returns:
             The set of positions in the shell within {bounds} and that fall within the {manhattan_restriction}
         """
+        if len(valid_moves) >= self.mask_threshold:
+            grid = position_mask.get_grid(bounds)
+            moves_mask = grid.from_positions(valid_moves)
+            if moves_mask is not None:
+                offsets = self._cached_base_manhattan_spheres(frozenset(potential_range))
+                if manhattan_restriction:
+                    offsets = frozenset([offset for offset in offsets if offset in manhattan_restriction])
+                return grid.to_positions(grid.spread(moves_mask, offsets))
+
         valid_attacks = set()
         if manhattan_restriction:
             for valid_move in valid_moves:
@@ -59,7 +71,7 @@ class TargetSystem():
         return sphere
 
     @lru_cache(1024)
-    def _cached_base_manhattan_spheres(self, rng: FrozenSet[int]) -> Set[Pos]:
+    def _cached_base_manhattan_spheres(self, rng: FrozenSet[int]) -> FrozenSet[Pos]:
         _range = range  # For speed
         _abs = abs  # For speed
         sphere = set()
@@ -70,7 +82,7 @@ class TargetSystem():
                 dy = r - magn
                 sphere.add((dx, dy))
                 sphere.add((dx, -dy))
-        return sphere
+        return frozenset(sphere)
 
     def get_nearest_open_tile(self, unit: UnitObject, position: Pos, check_for_valid_path: bool = False) -> Optional[Pos]:
         """Given a unit and their position, determines the nearest tile without a unit on it.
@@ -118,6 +130,9 @@ class TargetSystem():
         """
         if pos is None:
             pos = unit.position
+        if pos and self.game.board:
+            nearest = self.game.board.unit_index.nearest(pos, condition=lambda u: skill_system.check_enemy(u, unit))
+            return nearest[0][1] if nearest else -1
         enemy_list = [u for u in self.game.units if u.position and skill_system.check_enemy(u, unit)]
         if not enemy_list:
             return -1  # No enemies
@@ -308,6 +323,28 @@ class TargetSystem():
         """
         return self._get_all_attackable_positions(unit, valid_moves, self._get_all_spells(unit, show_abilities=True), force)
 
+    def get_attack_ranges(self, unit: UnitObject) -> Tuple[tuple, tuple]:
+        """Returns what the unit's weapons and spells can reach with, apart from where the unit can move
+
+        For every weapon and every spell the unit could attack with (as in get_all_attackable_positions_weapons
+        and get_all_attackable_positions_spells), gives the item's uid, its range,
+        and whether the unit can only use it without moving.
+        If these and the valid moves are the same, so are the attackable positions.
+
+        Args:
+            unit (UnitObject): The unit to get the ranges for.
+
+        Returns:
+            The ranges of the weapons, and the ranges of the spells
+        """
+        def get_ranges(items: List[ItemObject]) -> tuple:
+            no_attack_after_move = skill_system.no_attack_after_move(unit)
+            return tuple((item.uid, frozenset(item_funcs.get_range(unit, item)),
+                          bool(no_attack_after_move or item_system.no_attack_after_move(unit, item)))
+                         for item in items)
+        return (get_ranges(self._get_all_weapons(unit, show_abilities=True)),
+                get_ranges(self._get_all_spells(unit, show_abilities=True)))
+
     def get_possible_attack_positions(self, unit: UnitObject, target: Pos, moves: Set[Pos],
                                       item: ItemObject) -> List[Pos]:
         """
@@ -327,11 +364,17 @@ class TargetSystem():
         item_range = item_funcs.get_range(unit, item)
         restriction = item_system.range_restrict(unit, item)
         valid_moves: Set[Pos] = set()
-        for move in moves:
-            possible_strike_locations = \
-                self.get_shell({move}, item_range, self.game.board.bounds, restriction)
-            if target in possible_strike_locations:
-                valid_moves.add(move)
+        if not restriction:
+            # Ranges are symmetric, so no need to find the shell around each move
+            bounds = self.game.board.bounds
+            if bounds[0] <= target[0] <= bounds[2] and bounds[1] <= target[1] <= bounds[3]:
+                valid_moves = {move for move in moves if utils.calculate_distance(move, target) in item_range}
+        else:
+            for move in moves:
+                possible_strike_locations = \
+                    self.get_shell({move}, item_range, self.game.board.bounds, restriction)
+                if target in possible_strike_locations:
+                    valid_moves.add(move)
 
         # Filter away possible attacks that aren't in line of sight
         if DB.constants.value('line_of_sight') and not item_system.ignore_line_of_sight(unit, item):
@@ -2,12 +2,89 @@ from app.data.database.components import Component
 from app.data.database.database import DB
 from app.engine.game_state import GameState, game
 from app.engine import evaluate
+import functools
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 
 from app.utilities import str_utils
 import logging
 
+# What kind of phrase a {...} is, checked in order
+PHRASE_KINDS = [
+    ('eval', re.compile(r'\{e:[^{}]*\}').match),
+    ('eval', re.compile(r'\{eval:[^{}]*\}').match),
+    ('data', re.compile(r'\{d:[^{}]*\}').match),
+    ('data', re.compile(r'\{data:[^{}]*\}').search),
+    ('field', re.compile(r'\{f:[^{}]*\}').match),
+    ('field', re.compile(r'\{field:[^{}]*\}').match),
+    ('var', re.compile(r'\{v:[^{}]*\}').match),
+    ('var', re.compile(r'\{var:[^{}]*\}').match),
+    ('skill', re.compile(r'\{s:[^{}]*\}').match),
+    ('skill', re.compile(r'\{skill:[^{}]*\}').match),
+    ('item', re.compile(r'\{i:[^{}]*\}').match),
+    ('item', re.compile(r'\{item:[^{}]*\}').match),
+    ('local', re.compile(r'\{[^:{}]*\}').match),
+]
+
+LOCAL_RE = re.compile(r'\{[^{}]*\}')
+DATA_RES = (re.compile(r'\{d:[^{}]*\}'), re.compile(r'\{data:[^{}]*\}'))
+FIELD_RES = (re.compile(r'\{f:[^{}]*\}'), re.compile(r'\{field:[^{}]*\}'))
+SKILL_RES = (re.compile(r'\{s:[^{}]*\}'), re.compile(r'\{skill:[^{}]*\}'))
+ITEM_RES = (re.compile(r'\{i:[^{}]*\}'), re.compile(r'\{item:[^{}]*\}'))
+EVAL_RES = (re.compile(r'\{e:[^{}]*\}'), re.compile(r'\{eval:[^{}]*\}'))
+VAR_RES = (re.compile(r'\{v:[^{}]*\}'), re.compile(r'\{var:[^{}]*\}'))
+
+def _find_all(patterns, text: str) -> List[str]:
+    short, long = patterns
+    return short.findall(text) + long.findall(text)
+
+@functools.lru_cache(4096)
+def get_phrase_kind(text: str) -> str:
+    for kind, check in PHRASE_KINDS:
+        if check(text):
+            return kind
+    return 'text'
+
+class PhraseNode():
+    """A {...} in a template. Parts are literal text or nested phrases"""
+    __slots__ = ['parts']
+
+    def __init__(self, parts: List[Union[str, 'PhraseNode']]):
+        self.parts = parts
+
+    @classmethod
+    def from_nested(cls, nested: list) -> 'PhraseNode':
+        """From the nested character lists that str_utils.nested_expr returns"""
+        parts = []
+        for item in nested:
+            if isinstance(item, list):
+                parts.append(cls.from_nested(item))
+            elif parts and isinstance(parts[-1], str):
+                parts[-1] += item
+            else:
+                parts.append(item)
+        return cls(parts)
+
+class TextTemplate():
+    """
+    A string split into the phrases that need to be evaluated.
+    Only depends on the string, so it is parsed once and reused.
+    """
+    __slots__ = ['phrases', 'sources', 'replace_order']
+
+    def __init__(self, text: str):
+        to_evaluate = str_utils.matched_expr(text, '{', '}')
+        self.sources: List[str] = to_evaluate
+        self.phrases: List[PhraseNode] = [PhraseNode.from_nested(str_utils.nested_expr(to_eval, '{', '}'))
+                                          for to_eval in to_evaluate]
+        # sort by length so we don't accidentally substitute a shorter inside a longer,
+        # e.g. "{e:1} or {e:2 + {e:1}}". which would end up not working
+        self.replace_order: List[int] = sorted(range(len(to_evaluate)), key=lambda idx: len(to_evaluate[idx]), reverse=True)
+
+@functools.lru_cache(1024)
+def get_template(text: str) -> TextTemplate:
+    return TextTemplate(text)
+
 class TextEvaluator():
     def __init__(self, logger: logging.Logger, game: GameState, unit=None, unit2=None, position=None, local_args=None) -> None:
         self.logger = logger
@@ -49,7 +126,8 @@ class TextEvaluator():
            Nested phrases that get passed to this function result in the text
            being passed back without evaluation
         """
-        if re.match(r'\{e:[^{}]*\}', text) or re.match(r'\{eval:[^{}]*\}', text): # eval statement
+        kind = get_phrase_kind(text)
+        if kind == 'eval':
             # check for a fallback term
             expr, fallback = self._split_eval(text)
             eval_text, err = self._evaluate_evals(expr)
@@ -58,48 +136,37 @@ class TextEvaluator():
                 eval_text, _ = self._evaluate_evals(fallback)
             # if fallback fails we don't care
             return eval_text
-        elif re.match(r'\{d:[^{}]*\}', text) or re.findall(r'\{data:[^{}]*\}', text):
+        elif kind == 'data':
             return self._evaluate_data(text)
-        elif re.match(r'\{f:[^{}]*\}', text) or re.match(r'\{field:[^{}]*\}', text):
+        elif kind == 'field':
             return self._evaluate_unit_fields(text)
-        elif re.match(r'\{v:[^{}]*\}', text) or re.match(r'\{var:[^{}]*\}', text):
+        elif kind == 'var':
             return self._evaluate_vars(text)
-        elif re.match(r'\{s:[^{}]*\}', text) or re.match(r'\{skill:[^{}]*\}', text):
+        elif kind == 'skill':
             return self._evaluate_skill_db(text)
-        elif re.match(r'\{i:[^{}]*\}', text) or re.match(r'\{item:[^{}]*\}', text):
+        elif kind == 'item':
             return self._evaluate_item_db(text)
-        elif re.match(r'\{[^:{}]*\}', text):
+        elif kind == 'local':
             return self._evaluate_locals(text, local_args or {})
         else:
             return text
 
     def _evaluate_all(self, text: str, local_args=None) -> str:
-        def recursive_parse(parse_list) -> str:
-            copy = [""] * len(parse_list)
-            for idx, nested in enumerate(parse_list):
-                if isinstance(nested, list):
-                    recursively_parsed = recursive_parse(nested)
-                    copy[idx] = recursively_parsed
-                else:
-                    copy[idx] = nested
-            return str(self._evaluate_phrase('{' + ''.join(copy) + '}', local_args))
-        to_evaluate = str_utils.matched_expr(text, '{', '}')
-        evaluated = []
-        for to_eval in to_evaluate:
-            parsed = str_utils.nested_expr(to_eval, '{', '}')
-            evaled = recursive_parse(parsed)
-            evaluated.append(evaled)
-        evaluated_pairs = zip(to_evaluate, evaluated)
-        # sort by length so we don't accidentally substitute a shorter inside a longer,
-        # e.g. "{e:1} or {e:2 + {e:1}}". which would end up not working
-        evaluated_pairs = sorted(evaluated_pairs, key=lambda pair: len(pair[0]), reverse=True)
-        for to_eval, evaled in evaluated_pairs:
-            text = text.replace(to_eval, evaled)
+        if '{' not in text:
+            return text
+
+        def evaluate_phrase(phrase: PhraseNode) -> str:
+            inner = ''.join(part if isinstance(part, str) else evaluate_phrase(part) for part in phrase.parts)
+            return str(self._evaluate_phrase('{' + inner + '}', local_args))
+        template = get_template(text)
+        evaluated = [evaluate_phrase(phrase) for phrase in template.phrases]
+        for idx in template.replace_order:
+            text = text.replace(template.sources[idx], evaluated[idx])
         return text
 
     def _evaluate_locals(self, text, local_args: Dict[str, str]) -> str:
         local_args = local_args or {}
-        to_evaluate: List[str] = re.findall(r'\{[^{}]*\}', text)
+        to_evaluate: List[str] = LOCAL_RE.findall(text)
         evaluated = []
         for to_eval in to_evaluate:
             to_eval = to_eval[1:-1]
@@ -117,7 +184,7 @@ class TextEvaluator():
         if not self.game:
             return "??"
         # find data fields {d:}
-        to_evaluate: List[str] = re.findall(r'\{d:[^{}]*\}', text) + re.findall(r'\{data:[^{}]*\}', text)
+        to_evaluate: List[str] = _find_all(DATA_RES, text)
         evaluated = []
         for to_eval in to_evaluate:
             to_eval = self.trim_eval_tags(to_eval)
@@ -167,7 +234,7 @@ class TextEvaluator():
 
     def _evaluate_unit_fields(self, text) -> str:
         # find unit fields {f:}
-        to_evaluate: List[str] = re.findall(r'\{f:[^{}]*\}', text) + re.findall(r'\{field:[^{}]*\}', text)
+        to_evaluate: List[str] = _find_all(FIELD_RES, text)
         evaluated = []
         for to_eval in to_evaluate:
             to_eval = self.trim_eval_tags(to_eval)
@@ -210,7 +277,7 @@ class TextEvaluator():
 
     def _evaluate_skill_db(self, text) -> str:
         # find skill queries
-        to_evaluate: List[str] = re.findall(r'\{s:[^{}]*\}', text) + re.findall(r'\{skill:[^{}]*\}', text)
+        to_evaluate: List[str] = _find_all(SKILL_RES, text)
         evaluated = []
         for to_eval in to_evaluate:
             to_eval = self.trim_eval_tags(to_eval)
@@ -240,7 +307,7 @@ class TextEvaluator():
 
     def _evaluate_item_db(self, text) -> str:
         # find item queries
-        to_evaluate: List[str] = re.findall(r'\{i:[^{}]*\}', text) + re.findall(r'\{item:[^{}]*\}', text)
+        to_evaluate: List[str] = _find_all(ITEM_RES, text)
         evaluated = []
         for to_eval in to_evaluate:
             to_eval = self.trim_eval_tags(to_eval)
@@ -271,7 +338,7 @@ class TextEvaluator():
     def _evaluate_evals(self, text: str) -> Tuple[str, bool]:
         """Returns evaluated text with no nesting, also returns whether any evaluations failed"""
         # Set up variables so evals work well
-        to_evaluate = re.findall(r'\{e:[^{}]*\}', text) + re.findall(r'\{eval:[^{}]*\}', text)
+        to_evaluate = _find_all(EVAL_RES, text)
         evaluated = []
         err = False
         for to_eval in to_evaluate:
@@ -294,7 +361,7 @@ class TextEvaluator():
     def _evaluate_vars(self, text) -> str:
         if not self.game:
             return "??"
-        to_evaluate = re.findall(r'\{v:[^{}]*\}', text) + re.findall(r'\{var:[^{}]*\}', text)
+        to_evaluate = _find_all(VAR_RES, text)
         evaluated = []
         for to_eval in to_evaluate:
             key = self.trim_eval_tags(to_eval)
@@ -62,8 +62,7 @@ class TitleStartState(State):
         game.memory['transition_speed'] = 0.5
 
         # Wait until saving thread has finished
-        if save.SAVE_THREAD:
-            save.SAVE_THREAD.join()
+        save.SAVE_WRITER.join()
 
         game.state.refresh()
 
@@ -666,7 +665,7 @@ class TitleNewState(TitleLoadState):
             else:
                 get_sound_thread().play_sfx('Save')
                 build_new_game(selection)
-                save.SAVE_THREAD.join()
+                save.SAVE_WRITER.join()
                 save.check_save_slots()
                 options, color = save.get_save_title(save.SAVE_SLOTS)
                 self.menu.set_colors(color)
@@ -710,7 +709,7 @@ class TitleNewChildState(State):
             if selection == 'Overwrite':
                 get_sound_thread().play_sfx('Save')
                 build_new_game(self.menu.owner)  # game.memory['option_owner']
-                save.SAVE_THREAD.join()
+                save.SAVE_WRITER.join()
                 save.check_save_slots()
                 options, color = save.get_save_title(save.SAVE_SLOTS)
                 game.memory['title_menu'].set_colors(color)
@@ -1,6 +1,7 @@
 from __future__ import annotations
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
+import bisect
 import math
 import logging
 from dataclasses import dataclass
@@ -8,6 +9,7 @@ from dataclasses import dataclass
 from app.data.resources.resources import RESOURCES
 
 import app.engine.action as Action
+from app.engine import action_codec
 from app.constants import WINHEIGHT, WINWIDTH
 from app.engine import base_surf, engine, gui, image_mods
 from app.engine.background import SpriteBackground
@@ -49,6 +51,10 @@ class ActionLog():
         self.current_move = None
         self.current_move_index = 0
         self.action_groups = []
+        # Where each LockTurnwheel action is in the action log, and what it set the lock to
+        # Only kept while the turnwheel is in use, since the action log can't change then
+        self.lock_indices: Optional[List[int]] = None
+        self.lock_values: List[bool] = []
 
     def append(self, action):
         logging.debug("Add Action %d: %s", self.action_index + 1, action)
@@ -213,6 +219,12 @@ class ActionLog():
         self.current_move_index = len(self.action_groups)
 
         # Determine starting lock
+        self.lock_indices = []
+        self.lock_values = []
+        for action_index, action in enumerate(self.actions):
+            if isinstance(action, Action.LockTurnwheel):
+                self.lock_indices.append(action_index)
+                self.lock_values.append(action.lock)
         self.locked = self.get_last_lock()
 
         # Get the text message
@@ -345,6 +357,7 @@ class ActionLog():
         if self.hovered_unit:
             self.hover_off()
         self.actions = self.actions[:self.action_index + 1]
+        self.lock_indices = None
 
     def reset(self):
         """
@@ -355,8 +368,13 @@ class ActionLog():
             self.hover_off()
         while not self.at_far_future():
             self.run_action_forward()
+        self.lock_indices = None
 
     def get_last_lock(self) -> bool:
+        if self.lock_indices is not None:
+            # Last lock before the current action
+            idx = bisect.bisect_left(self.lock_indices, self.action_index)
+            return self.lock_values[idx - 1] if idx > 0 else False
         cur_index = self.action_index
         while cur_index > 0:
             cur_index -= 1
@@ -420,18 +438,26 @@ class ActionLog():
         self.record -= 1
 
     def save(self):
-        return ([action.save() for action in self.actions], self._first_free_action, self.record)
+        # Actions are saved as compact records, see action_codec
+        encoder = action_codec.ActionEncoder()
+        records = [encoder.encode(action.save()) for action in self.actions]
+        return (records, self._first_free_action, self.record, encoder.schemas)
 
     @classmethod
     def restore(cls, serial):
         self = cls()
-        if len(serial) == 2:  # deprecated
-            actions, first_free_action = serial
-            record = 0
+        if len(serial) == 4:
+            records, first_free_action, record, schemas = serial
+            self.actions = Action.restore_records(records, schemas)
+            self.action_index = len(self.actions) - 1
         else:
-            actions, first_free_action, record = serial
-        for name, action in actions:
-            self.append(getattr(Action, name).restore(action))
+            if len(serial) == 2:  # deprecated
+                actions, first_free_action = serial
+                record = 0
+            else:  # deprecated
+                actions, first_free_action, record = serial
+            for name, action in actions:
+                self.append(getattr(Action, name).restore(action))
         self._first_free_action = first_free_action
         self.record = record
         return self
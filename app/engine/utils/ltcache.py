@@ -1,18 +1,122 @@
+from __future__ import annotations
+
 import functools
-import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, Optional, Set, Tuple
+
+# Something that changed, such as (unit, 'position') or (skill, 'data')
+Alteration = Tuple[Hashable, str]
+# The objects a cached result depends on and which of their aspects it read
+Dependencies = Tuple[FrozenSet[Hashable], FrozenSet[str]]
+
+class CacheEntry():
+    __slots__ = ['value', 'objs', 'aspects']
+
+    def __init__(self, value: Any, dependencies: Optional[Dependencies]):
+        self.value = value
+        if dependencies is None:
+            # Could have read anything
+            self.objs: Optional[FrozenSet[Hashable]] = None
+            self.aspects: FrozenSet[str] = frozenset()
+        else:
+            self.objs, self.aspects = dependencies
 
 class LTCache():
-    _state: uuid.UUID
+    """
+    Cache for expensive hooks that only need to be recalculated when the game state changes.
+
+    Each entry records the objects and aspects of those objects it depends on.
+    Entries that don't know what they depend on are dropped whenever anything changes.
+    Entries that do are only dropped when one of their objects changes in one of their aspects.
+    """
+    max_size = 4096
+
     def __init__(self):
-        self._state = uuid.uuid1()
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        # Keys of entries that could depend on anything
+        self._global_keys: Set[Hashable] = set()
+        # Keys of entries that depend on an object
+        self._keys_by_obj: Dict[Hashable, Set[Hashable]] = {}
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.invalidations: int = 0
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, value: Any, dependencies: Optional[Dependencies] = None):
+        if key in self._entries:
+            self._remove(key)
+        entry = CacheEntry(value, dependencies)
+        self._entries[key] = entry
+        if entry.objs is None:
+            self._global_keys.add(key)
+        else:
+            for obj in entry.objs:
+                self._keys_by_obj.setdefault(obj, set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        if entry.objs is None:
+            self._global_keys.discard(key)
+        else:
+            for obj in entry.objs:
+                keys = self._keys_by_obj.get(obj)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys_by_obj[obj]
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._global_keys.clear()
+        self._keys_by_obj.clear()
+
+    def invalidate(self, alterations: Optional[Iterable[Alteration]] = None):
+        """
+        alterations: What changed. If None, anything could have changed,
+        so everything is dropped. An empty list means nothing hooks can see changed.
+        """
+        if alterations is None:
+            self.clear()
+            return
+        alterations = list(alterations)
+        if not alterations:
+            return
+        to_remove = set(self._global_keys)
+        for obj, aspect in alterations:
+            for key in self._keys_by_obj.get(obj, ()):
+                if aspect in self._entries[key].aspects:
+                    to_remove.add(key)
+        for key in to_remove:
+            self._remove(key)
+        self.invalidations += len(to_remove)
 
     def alter_state(self):
-        self._state = uuid.uuid1()
+        self.invalidate(None)
 
-    def get_state(self) -> uuid.UUID:
-        return self._state
+    def get_stats(self) -> Dict[str, int]:
+        return {'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations}
 
-LT_CACHE = None
+LT_CACHE: Optional[LTCache] = None
 def init() -> LTCache:
     """Init the LTCache instance."""
     global LT_CACHE
@@ -20,29 +124,36 @@ def init() -> LTCache:
         LT_CACHE = LTCache()
     return LT_CACHE
 
-def get_state() -> uuid.UUID:
-    """Get the current state of the LTCache."""
-    global LT_CACHE
+def alter_state(alterations: Optional[Iterable[Alteration]] = None):
+    """Alter the state of the LTCache. If alterations are not given, assumes anything could have changed."""
+    if LT_CACHE is not None:
+        LT_CACHE.invalidate(alterations)
+
+def get_stats() -> Dict[str, int]:
     if LT_CACHE is None:
-        return uuid.uuid1()
-    return LT_CACHE.get_state()
+        return {}
+    return LT_CACHE.get_stats()
 
-def alter_state():
-    """Alter the state of the LTCache."""
-    global LT_CACHE
-    if LT_CACHE is not None:
-        LT_CACHE.alter_state()
+def ltcached(func: Callable = None, *, dependencies: Callable[..., Optional[Dependencies]] = None):
+    """Decorator to cache the result of a function.
+
+    Can be used bare, in which case the result is dropped whenever the game state changes,
+    or with a `dependencies` function that takes the same arguments as the decorated
+    function and returns the objects and aspects the result depends on (or None if unknown).
+    """
+    if func is None:
+        return functools.partial(ltcached, dependencies=dependencies)
 
-def ltcached(func):
-    """Decorator to cache the result of a function."""
-    func = functools.lru_cache()(func)
-    prev_state = get_state()
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        nonlocal prev_state
-        curr_state = get_state()
-        if curr_state != prev_state:
-            func.cache_clear()
-            prev_state = curr_state
-        return func(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+        cache = LT_CACHE
+        if cache is None:
+            return func(*args, **kwargs)
+        key = (wrapper, args, tuple(kwargs.items())) if kwargs else (wrapper, args)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry.value
+        value = func(*args, **kwargs)
+        cache.put(key, value, dependencies(*args, **kwargs) if dependencies else None)
+        return value
+    return wrapper
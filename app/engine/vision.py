@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from app.engine.bresenham_line_algorithm import get_line
+from app.utilities import utils
+from app.utilities.typing import NID, Pos
+
+if TYPE_CHECKING:
+    from app.engine.game_board import GameBoard
+
+class UnitSight(NamedTuple):
+    team: NID
+    vantage_point: Optional[Pos]
+    # Sight range from skills, on top of the fog of war radius
+    extra_range: int
+    # Positions within the unit's sight range (ignoring line of sight)
+    positions: FrozenSet[Pos]
+
+def get_sphere(pos: Pos, radius: int, width: int, height: int) -> FrozenSet[Pos]:
+    """Every position on a width x height board within radius of pos"""
+    x, y = pos
+    return frozenset((i, j) for i in range(max(0, x - radius), min(width, x + radius + 1))
+                     for j in range(max(0, y - radius + abs(i - x)), min(height, y + radius - abs(i - x) + 1)))
+
+class LineOfSightTable():
+    """
+    For each position a line of sight is checked from, a table of whether
+    it can see each position on the board (one byte each: not checked yet,
+    dark, or lit). Each line is only found once and then looked up,
+    until the opacity of the board changes.
+
+    When the opacity of one position changes, only the tables of
+    positions that checked lines long enough to pass through it are thrown away.
+    Past max_table_bytes, the oldest tables are thrown away to make room.
+    """
+    max_table_bytes = 4 * 1024 * 1024
+
+    # Values in the tables
+    unknown = 0
+    dark = 1
+    lit = 2
+
+    def __init__(self, board: GameBoard):
+        self.board = board
+        # Key: position seen from, Value: (farthest distance checked, table)
+        self.tables: Dict[Pos, Tuple[int, bytearray]] = {}
+        self.opacity_version: int = board.opacity_version
+
+    def opacity_changed(self, pos: Optional[Pos] = None):
+        if pos and self.opacity_version == self.board.opacity_version - 1:
+            # A line can only pass through positions at most as far away as its end
+            self.tables = {source: entry for source, entry in self.tables.items()
+                           if utils.calculate_distance(source, pos) > entry[0]}
+        else:
+            self.tables.clear()
+        self.opacity_version = self.board.opacity_version
+
+    def has_line(self, source: Pos, dest: Pos) -> bool:
+        """Same as get_line(source, dest, board.get_opacity)"""
+        if self.opacity_version != self.board.opacity_version:
+            self.opacity_changed()
+        width, height = self.board.width, self.board.height
+        x, y = dest
+        if not (0 <= x < width and 0 <= y < height):
+            return get_line(source, dest, self.board.get_opacity)
+        entry = self.tables.get(source)
+        if entry is None:
+            if not (0 <= source[0] < width and 0 <= source[1] < height):
+                return get_line(source, dest, self.board.get_opacity)
+            if len(self.tables) >= max(self.max_table_bytes // (width * height), 1):
+                del self.tables[next(iter(self.tables))]
+            entry = self.tables[source] = (0, bytearray(width * height))
+        table = entry[1]
+        idx = y * width + x
+        seen = table[idx]
+        if not seen:
+            seen = table[idx] = self.lit if get_line(source, dest, self.board.get_opacity) else self.dark
+            distance = utils.calculate_distance(source, dest)
+            if distance > entry[0]:
+                self.tables[source] = (distance, table)
+        return seen == self.lit
+
+    def get_visible_positions(self, source: Pos, radius: int) -> FrozenSet[Pos]:
+        """Every position on the board within radius of source that it has a line of sight to"""
+        has_line = self.has_line
+        return frozenset(pos for pos in get_sphere(source, max(radius, 0), self.board.width, self.board.height)
+                         if has_line(source, pos))
+
+class VisionEngine():
+    """
+    Keeps track of what each unit can see, so the fog of war can be
+    checked in constant time.
+
+    When a unit moves, only the positions that entered or left its sight
+    are changed in its team's fog of war grid.
+
+    For fog line of sight, what can be seen from a vantage point with a radius
+    is cached until the opacity of the map changes. Each team also gets a
+    count of how many of its units can see each position with line of sight,
+    which is updated as units move. Sight ranges are the ones the unit last
+    updated its vision with, the same as the fog of war grids.
+    """
+    max_los_entries = 1024
+
+    def __init__(self, board: GameBoard):
+        self.board = board
+        # Key: unit nid
+        self.sights: Dict[NID, UnitSight] = {}
+        # Key: (vantage point, radius), Value: positions that can be seen
+        self.los_cache: OrderedDict[Tuple[Pos, int], FrozenSet[Pos]] = OrderedDict()
+        # Key: (team, fog of war radius), Value: number of units on that team that can see each position
+        self.los_layers: Dict[Tuple[NID, int], Dict[Pos, int]] = {}
+        self.los_table = LineOfSightTable(board)
+
+    def opacity_changed(self, pos: Optional[Pos] = None):
+        """pos is the position whose opacity changed, or None if it could have been anywhere"""
+        self.los_table.opacity_changed(pos)
+        if pos:
+            for key in [key for key in self.los_cache if utils.calculate_distance(key[0], pos) <= key[1]]:
+                del self.los_cache[key]
+        else:
+            self.los_cache.clear()
+        self.los_layers.clear()
+
+    def get_sight(self, unit_nid: NID) -> Optional[UnitSight]:
+        return self.sights.get(unit_nid)
+
+    def _get_sphere(self, pos: Pos, radius: int) -> FrozenSet[Pos]:
+        """Every position on the board within radius of pos"""
+        return get_sphere(pos, radius, self.board.width, self.board.height)
+
+    def set_sight(self, unit_nid: NID, team: NID, pos: Optional[Pos], sight_range: int, extra_range: int) -> FrozenSet[Pos]:
+        """
+        Moves the unit's vision to pos (None if the unit can no longer see anything)
+        and updates the team's fog of war grid with the difference.
+
+        Returns every position now within the unit's sight range
+        """
+        old_sight = self.sights.get(unit_nid)
+        positions = self._get_sphere(pos, sight_range) if pos else frozenset()
+
+        if old_sight and old_sight.team != team:
+            self._remove_sight(unit_nid, old_sight)
+            old_sight = None
+        old_positions = old_sight.positions if old_sight else frozenset()
+        grid = self.board.fog_of_war_grids[team]
+        for position in old_positions - positions:
+            grid.get(position).discard(unit_nid)
+        for position in positions - old_positions:
+            grid.get(position).add(unit_nid)
+        if old_sight:
+            self._update_los_layers(old_sight, -1)
+
+        new_sight = UnitSight(team, pos, extra_range, positions)
+        self.sights[unit_nid] = new_sight
+        self._update_los_layers(new_sight, 1)
+        return positions
+
+    def _remove_sight(self, unit_nid: NID, sight: UnitSight):
+        grid = self.board.fog_of_war_grids[sight.team]
+        for position in sight.positions:
+            grid.get(position).discard(unit_nid)
+        self._update_los_layers(sight, -1)
+        del self.sights[unit_nid]
+
+    def _update_los_layers(self, sight: UnitSight, change: int):
+        if not sight.vantage_point:
+            return
+        for (team, default_range), layer in self.los_layers.items():
+            if team == sight.team:
+                for position in self.get_los_positions(sight.vantage_point, default_range + sight.extra_range):
+                    layer[position] = layer.get(position, 0) + change
+
+    def get_los_positions(self, vantage_point: Pos, radius: int) -> FrozenSet[Pos]:
+        """Every position within radius of the vantage point that it has a line of sight to"""
+        key = (vantage_point, radius)
+        positions = self.los_cache.get(key)
+        if positions is None:
+            positions = self.los_table.get_visible_positions(vantage_point, radius)
+            self.los_cache[key] = positions
+            while len(self.los_cache) > self.max_los_entries:
+                self.los_cache.popitem(last=False)
+        else:
+            self.los_cache.move_to_end(key)
+        return positions
+
+    def _get_los_layer(self, team: NID, default_range: int) -> Dict[Pos, int]:
+        key = (team, default_range)
+        if key not in self.los_layers:
+            layer: Dict[Pos, int] = {}
+            for sight in self.sights.values():
+                if sight.team == team and sight.vantage_point:
+                    for position in self.get_los_positions(sight.vantage_point, default_range + sight.extra_range):
+                        layer[position] = layer.get(position, 0) + 1
+            self.los_layers[key] = layer
+        return self.los_layers[key]
+
+    def in_line_of_sight(self, pos: Pos, team: NID, default_range: int) -> bool:
+        """
+        Whether any unit on the team can see pos with line of sight,
+        when each unit can see default_range plus its extra sight range away.
+        Same as line_of_sight.simple_check
+        """
+        return self._get_los_layer(team, default_range).get(pos, 0) > 0
+
@@ -1,4 +1,5 @@
-from typing import List
+import time
+from typing import Dict, List
 from app.events.event_commands import EventCommand
 from app.events.event_prefab import EventPrefab
 from app.events.triggers import EventTrigger
@@ -7,17 +8,30 @@ from app.events.event import Event
 from app.events import triggers
 from app.engine.game_state import game
 from app.engine import action, evaluate
+from app.utilities.typing import NID
 
 import logging
 
+class TriggerStats():
+    __slots__ = ['count', 'candidates', 'triggered', 'total_time']
+
+    def __init__(self):
+        self.count: int = 0  # Number of times the trigger was checked
+        self.candidates: int = 0  # Number of event conditions evaluated
+        self.triggered: int = 0  # Number of events whose conditions passed
+        self.total_time: float = 0.
+
 class EventManager():
     def __init__(self):
         self.all_events: list[Event] = []  # Keeps all events, both in use and not yet used
         self.event_stack: list[Event] = []  # A stack of events that haven't been used yet
+        # Key: trigger nid, Value: How much time was spent finding events for that trigger
+        self.trigger_stats: Dict[NID, TriggerStats] = {}
 
     def get_triggered_events(self, trigger: EventTrigger, level_nid=None):
         """returns a list of all events that are triggered according to the conditions supplied in the arg
         """
+        start = time.perf_counter()
         triggered_events = []
         if level_nid:
             event_source_nid = level_nid
@@ -26,7 +40,8 @@ class EventManager():
                 event_source_nid = game.level_nid
             else:
                 event_source_nid = None
-        for event_prefab in DB.events.get(trigger.nid, event_source_nid):
+        event_prefabs = DB.events.get(trigger.nid, event_source_nid)
+        for event_prefab in event_prefabs:
             try:
                 args = trigger.to_args()
                 result = evaluate.evaluate(event_prefab.condition, unit1=args.get('unit1', None), unit2=args.get('unit2', None), position=args.get('position', None), local_args=args)
@@ -34,8 +49,26 @@ class EventManager():
                     triggered_events.append(event_prefab)
             except:
                 logging.error("Condition {%s} could not be evaluated" % event_prefab.condition)
+
+        stats = self.trigger_stats.get(trigger.nid)
+        if not stats:
+            stats = self.trigger_stats[trigger.nid] = TriggerStats()
+        stats.count += 1
+        stats.candidates += len(event_prefabs)
+        stats.triggered += len(triggered_events)
+        stats.total_time += time.perf_counter() - start
         return triggered_events
 
+    def get_trigger_report(self, num: int = 10) -> str:
+        """The triggers that took the most time to check, slowest first"""
+        slowest = sorted(self.trigger_stats.items(), key=lambda item: item[1].total_time, reverse=True)[:num]
+        return '\n'.join("%s: checked %d times, %d conditions, %d triggered in %.2f ms" %
+                         (nid, stats.count, stats.candidates, stats.triggered, stats.total_time * 1000)
+                         for nid, stats in slowest)
+
+    def clear_trigger_stats(self):
+        self.trigger_stats.clear()
+
     def should_trigger(self, trigger: EventTrigger, level_nid=None):
         """Check whether or not there are any events to trigger for the conditions given
         """
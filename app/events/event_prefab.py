@@ -24,6 +24,9 @@ def get_event_version(script: str) -> EventVersion.EVENT:
         return EventVersion.EVENT
 
 class EventPrefab(Prefab):
+    # Incremented whenever any event's trigger or level changes, so EventCatalogs know to reindex
+    index_generation = 0
+
     def __init__(self, name):
         self.name = name
         self.trigger = None
@@ -35,6 +38,11 @@ class EventPrefab(Prefab):
 
         self._source: List[str] = []
 
+    def __setattr__(self, name, value):
+        if name in ('trigger', 'level_nid'):
+            EventPrefab.index_generation += 1
+        super().__setattr__(name, value)
+
     @property
     def nid(self):
         if not self.name:
@@ -97,10 +105,65 @@ class EventCatalog(Data[EventPrefab]):
     def __init__(self, vals: List[EventPrefab] | None = None):
         super().__init__(vals)
         self.inspector = EventInspectorEngine(self)
-
-    def get(self, trigger_nid, level_nid):
-        return [event for event in self._list if event.trigger == trigger_nid and
-                (not event.level_nid or event.level_nid == level_nid)]
+        # Key: trigger nid, Value: events with that trigger, in order
+        self._trigger_index: Dict[NID, List[EventPrefab]] = {}
+        # Key: (trigger nid, level nid), Value: result of get
+        self._trigger_level_index: Dict[Tuple[NID, NID], List[EventPrefab]] = {}
+        self._index_generation: int = -1
+
+    def _events_changed(self):
+        self._index_generation = -1
+
+    def _get_trigger_index(self) -> Dict[NID, List[EventPrefab]]:
+        if self._index_generation != EventPrefab.index_generation:
+            self._trigger_index.clear()
+            self._trigger_level_index.clear()
+            for event in self._list:
+                self._trigger_index.setdefault(event.trigger, []).append(event)
+            self._index_generation = EventPrefab.index_generation
+        return self._trigger_index
+
+    def get(self, trigger_nid, level_nid) -> List[EventPrefab]:
+        trigger_index = self._get_trigger_index()
+        key = (trigger_nid, level_nid)
+        if key not in self._trigger_level_index:
+            self._trigger_level_index[key] = \
+                [event for event in trigger_index.get(trigger_nid, []) if
+                 (not event.level_nid or event.level_nid == level_nid)]
+        return list(self._trigger_level_index[key])
+
+    # Anything that changes the order or contents of the list has to reindex
+    def append(self, val: EventPrefab, overwrite: bool = False):
+        super().append(val, overwrite)
+        self._events_changed()
+
+    def delete(self, val: EventPrefab):
+        super().delete(val)
+        self._events_changed()
+
+    def remove_key(self, key: NID):
+        super().remove_key(key)
+        self._events_changed()
+
+    def pop(self, idx: Optional[int] = None):
+        super().pop(idx)
+        self._events_changed()
+
+    def insert(self, idx: int, val: EventPrefab):
+        super().insert(idx, val)
+        self._events_changed()
+
+    def clear(self):
+        super().clear()
+        self._events_changed()
+
+    def sort(self, sort_func=None):
+        super().sort(sort_func)
+        self._events_changed()
+
+    def move_index(self, old_index: int, new_index: int):
+        super().move_index(old_index, new_index)
+        self._events_changed()
 
     def get_by_level(self, level_nid: Optional[NID]) -> List[EventPrefab]:
         return [event for event in self._list if (not event.level_nid or not level_nid or event.level_nid == level_nid)]
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Optional, Tuple
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
 from app.engine.text_evaluator import TextEvaluator
 from app.events import event_commands
@@ -64,11 +65,77 @@ class IteratorInfo():
         self.iterator = EventIterator.restore(s_dict['iterator'])
         return self
 
+class ParsedScript():
+    """
+    The commands of an event script, along with where each conditional
+    and loop command jumps to, so control flow doesn't need to search
+    through the commands.
+
+    Shared between every EventProcessor running the same script,
+    so nothing here should be modified after it's built.
+    """
+    def __init__(self, script: str):
+        self.script = script
+        self.commands: List[event_commands.EventCommand] = event_commands.parse_script_to_commands(script)
+        # Key: index of an if, elif, else, or for command
+        # Value: index after the end (or endf) of its block
+        self.block_ends: Dict[int, int] = {}
+        # Key: index of an if or elif command
+        # Value: index of the next elif, else, or end of the same block
+        self.next_clauses: Dict[int, int] = {}
+        self._build_jump_table()
+
+    def _build_jump_table(self):
+        # Each frame holds the indices of an if and the clauses that follow it.
+        # Clauses outside of any if (which are errors) go in the bottom frame,
+        # so they find the same end that searching forward would find
+        if_frames: List[List[int]] = [[]]
+        for_frames: List[int] = []
+        for idx, command in enumerate(self.commands):
+            nid = command.nid
+            if nid == 'if':
+                if_frames.append([idx])
+            elif nid in ('elif', 'else', 'end'):
+                frame = if_frames[-1]
+                if frame and self.commands[frame[-1]].nid in ('if', 'elif'):
+                    self.next_clauses[frame[-1]] = idx
+                if nid == 'end':
+                    for clause_idx in frame:
+                        self.block_ends[clause_idx] = idx + 1
+                    if len(if_frames) > 1:
+                        if_frames.pop()
+                    else:
+                        frame.clear()
+                else:
+                    frame.append(idx)
+            elif nid == 'for':
+                for_frames.append(idx)
+            elif nid == 'endf':
+                if for_frames:
+                    self.block_ends[for_frames.pop()] = idx + 1
+
+# Key: (event nid, hash of the script)
+_parsed_scripts: OrderedDict[Tuple[NID, int], ParsedScript] = OrderedDict()
+MAX_PARSED_SCRIPTS = 128
+
+def get_parsed_script(nid: NID, script: str) -> ParsedScript:
+    key = (nid, hash(script))
+    parsed = _parsed_scripts.get(key)
+    if parsed is None or parsed.script != script:
+        parsed = ParsedScript(script)
+        _parsed_scripts[key] = parsed
+        while len(_parsed_scripts) > MAX_PARSED_SCRIPTS:
+            _parsed_scripts.popitem(last=False)
+    else:
+        _parsed_scripts.move_to_end(key)
+    return parsed
+
 class EventProcessor():
     def __init__(self, nid: NID, script: str, text_evaluator: TextEvaluator):
         self.nid = nid
         self.script = script
-        self.commands: List[event_commands.EventCommand] = event_commands.parse_script_to_commands(script)
+        self.parsed_script = get_parsed_script(nid, script)
+        self.commands: List[event_commands.EventCommand] = self.parsed_script.commands
         self.command_pointer = 0
 
         self.logger = logging.getLogger()
@@ -107,52 +174,27 @@ class EventProcessor():
         truth = self._get_truth(base_conditional)
         if truth:
             return index + 1
-        # not true, so seek next clause
-        level = 0
-        curr_index = index + 1
-        while(curr_index) < len(self.commands):
-            curr_command = self.commands[curr_index]
-            if level == 0:
-                if curr_command.nid in ('elif',):
-                    return self._jump_conditional(curr_index)
-                elif curr_command.nid in ('end', 'else'):
-                    return curr_index + 1
-            if curr_command.nid == 'if':
-                level += 1
-            elif curr_command.nid == 'end':
-                level -= 1
-            curr_index += 1
-        # have not found end clause
-        # maybe throw instead?
-        raise SyntaxError("Line %d: %s has no corresponding terminator" % (index, str(base_conditional)))
+        # not true, so go to next clause
+        next_index = self.parsed_script.next_clauses.get(index)
+        if next_index is None:
+            # have not found end clause
+            raise SyntaxError("Line %d: %s has no corresponding terminator" % (index, str(base_conditional)))
+        if self.commands[next_index].nid == 'elif':
+            return self._jump_conditional(next_index)
+        # end or else
+        return next_index + 1
 
     def _find_end(self, index: int) -> int:
         """given an index of an if, elif, else, for, or while command,
         gets the index of the end of the entire block.
         """
         base_conditional = self.commands[index]
-        start_command = 'if'
-        end_command = 'end'
-        if base_conditional.nid in ('if', 'elif', 'else'):
-            pass
-        elif base_conditional.nid == 'for':
-            start_command = 'for'
-            end_command = 'endf'
-        else:
+        if base_conditional.nid not in ('if', 'elif', 'else', 'for'):
             raise TypeError("%s is not a conditional command" % str(base_conditional))
-        level = 0
-        curr_index = index + 1
-        while curr_index < len(self.commands):
-            curr_command = self.commands[curr_index]
-            if curr_command.nid == start_command:
-                level += 1
-            elif curr_command.nid == end_command:
-                if level == 0:
-                    return curr_index + 1
-                else:
-                    level -= 1
-            curr_index += 1
-        raise SyntaxError("Line %d: %s has no corresponding terminator" % (index, str(base_conditional)))
+        end_index = self.parsed_script.block_ends.get(index)
+        if end_index is None:
+            raise SyntaxError("Line %d: %s has no corresponding terminator" % (index, str(base_conditional)))
+        return end_index
 
     def _build_iterator(self, index: int, command: event_commands.EventCommand) -> IteratorInfo:
         iterator_nid = command.parameters['Nid']
@@ -0,0 +1,38 @@
+import unittest
+
+from app.events.event_prefab import EventCatalog, EventPrefab
+
+class EventCatalogTests(unittest.TestCase):
+    def make_event(self, name, trigger, level_nid=None):
+        event = EventPrefab(name)
+        event.trigger = trigger
+        event.level_nid = level_nid
+        return event
+
+    def get_slow(self, catalog, trigger_nid, level_nid):
+        return [event for event in catalog if event.trigger == trigger_nid and
+                (not event.level_nid or event.level_nid == level_nid)]
+
+    def test_get(self):
+        catalog = EventCatalog()
+        for idx in range(20):
+            catalog.append(self.make_event('Event%d' % idx, ['level_start', 'unit_wait', 'combat_end'][idx % 3],
+                                           [None, '0', '1', '2'][idx % 4]))
+        queries = [(trigger, level) for trigger in ('level_start', 'unit_wait', 'combat_end', 'turn_change')
+                   for level in (None, '0', '1', '3')]
+        for trigger, level in queries:
+            self.assertEqual(catalog.get(trigger, level), self.get_slow(catalog, trigger, level))
+
+        # Changing an event's trigger or level
+        catalog[3].trigger = 'turn_change'
+        catalog[4].level_nid = '3'
+        # Adding, removing and reordering events
+        catalog.append(self.make_event('New', 'unit_wait', '1'))
+        catalog.insert(0, self.make_event('First', 'unit_wait'))
+        catalog.remove_key(catalog[8].nid)
+        catalog.move_index(2, 10)
+        for trigger, level in queries:
+            self.assertEqual(catalog.get(trigger, level), self.get_slow(catalog, trigger, level))
+
+        catalog.clear()
+        self.assertEqual(catalog.get('unit_wait', '1'), [])
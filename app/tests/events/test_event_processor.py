@@ -48,6 +48,21 @@ class EventProcessorUnitTests(unittest.TestCase):
         self.assertEqual(processor._jump_conditional(18), 19)
         self.assertEqual(processor._find_end(19), 21)
 
+    def test_parsed_script_cache(self):
+        script_path = Path(__file__).parent / 'test_files' / 'processor' / 'conditionals.event'
+        script = script_path.read_text()
+        processor = EventProcessor('conditionals', script, self.text_evaluator)
+        other_processor = EventProcessor('conditionals', script, self.text_evaluator)
+        # Parsed once and shared
+        self.assertIs(processor.commands, other_processor.commands)
+        # Changing the script parses it again
+        changed_processor = EventProcessor('conditionals', script + '\nend', self.text_evaluator)
+        self.assertIsNot(processor.commands, changed_processor.commands)
+
+        self.assertEqual(processor.parsed_script.next_clauses[8], 11)
+        self.assertEqual(processor.parsed_script.next_clauses[11], 13)
+        self.assertEqual(processor.parsed_script.block_ends[19], 21)
+
     def test_event_processor_handles_conditionals(self):
         script_path = Path(__file__).parent / 'test_files' / 'processor' / 'second_conditional.event'
         processor = EventProcessor('conditionals', script_path.read_text(), self.text_evaluator)
@@ -1,5 +1,6 @@
 from unittest.mock import MagicMock, Mock
 
+from app.engine.fog_of_war import FogOfWarLevelConfig, FogOfWarType
 from app.engine.game_state import GameState
 from app.engine.overworld.overworld_manager import OverworldManager, OverworldManagerInterface
 from app.engine.query_engine import GameQueryEngine
@@ -21,6 +22,7 @@ def get_mock_game() -> GameState:
     game.overworld_registry = {}
 
     game.game_vars = {}
+    game.get_current_fog_info = lambda: FogOfWarLevelConfig(False, FogOfWarType.GBA_DEPRECATED, 0, 0, 0)
 
     # Need to mock a function that returns it's own MagicMock with stack set to None
     get_skill = MagicMock()
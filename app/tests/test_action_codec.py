@@ -0,0 +1,52 @@
+import io
+import unittest
+from enum import Enum
+
+from app.engine import action_codec
+
+class Color(Enum):
+    RED = 1
+
+class ActionCodecTests(unittest.TestCase):
+    def make_actions(self, num):
+        actions = []
+        for i in range(num):
+            unit = ('unit', 'Eirika' if i % 2 else 'Seth')
+            actions.append(('Move', {'unit': unit, 'old_pos': ('generic', (i, 2)), 'new_pos': ('generic', (i, 3)),
+                                     'path': ('list', [('generic', (i, 2)), ('generic', (i, 3))])}))
+            actions.append(('Wait', {'unit': unit, 'data': ('generic', {'a': [1.5, None, True], 'b': {3}, 'c': Color.RED}),
+                                     'update_fow_action': ('action', ('UpdateFogOfWar', {'unit': unit, 'prev_pos': ('generic', None)}))}))
+            # Same class, different kinds
+            actions.append(('Move', {'unit': unit, 'old_pos': ('generic', None), 'new_pos': ('generic', (i, -4)),
+                                     'path': ('generic', None)}))
+            actions.append(('SetObjData', {'obj': ('item', 100 + i), 'keyword': ('generic', 'uses'), 'value': ('generic', -i)}))
+        return actions
+
+    def test_records(self):
+        actions = self.make_actions(10)
+        encoder = action_codec.ActionEncoder()
+        records = [encoder.encode(action) for action in actions]
+        # Move twice, Wait, UpdateFogOfWar and SetObjData
+        self.assertEqual(len(encoder.schemas), 5)
+        self.assertEqual([action_codec.expand(record, encoder.schemas) for record in records], actions)
+
+    def test_stream(self):
+        actions = self.make_actions(action_codec.FRAME_SIZE)  # Several frames
+        for compress in (True, False):
+            data = action_codec.encode_actions(actions, compress)
+            self.assertTrue(action_codec.is_encoded(data))
+            self.assertEqual(action_codec.decode_actions(data), actions)
+
+        fp = io.BytesIO()
+        writer = action_codec.ActionLogWriter(fp)
+        writer.close()
+        self.assertEqual(action_codec.decode_actions(fp.getvalue()), [])
+
+        with self.assertRaises(ValueError):
+            action_codec.decode_actions(b'not an action log')
+        newer = action_codec.MAGIC + bytes((action_codec.VERSION + 1, 0))
+        with self.assertRaises(ValueError):
+            action_codec.decode_actions(newer)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.engine.ai_planning import AIProfile, PositionSnapshot
+
+class AIPlanningTests(unittest.TestCase):
+    def test_position_snapshot(self):
+        thinker = MagicMock(position=(0, 0), team='enemy')
+        ally = MagicMock(position=(1, 0), team='enemy')
+        enemy = MagicMock(position=(2, 0), team='player')
+        offmap = MagicMock(position=None, team='player')
+        snapshot = PositionSnapshot([thinker, ally, enemy, offmap], thinker)
+
+        # The snapshot does not follow the thinking unit around
+        thinker.position = (5, 5)
+        self.assertIs(snapshot.get_unit((0, 0)), thinker)
+        self.assertIsNone(snapshot.get_unit((5, 5)))
+        self.assertEqual(snapshot.get_positions(lambda u: u.team == 'player'), {(2, 0)})
+        self.assertEqual(snapshot.get_positions(lambda u: u.team == 'enemy'), {(1, 0)})
+
+    def test_profile(self):
+        profile = AIProfile('Bandit')
+        with profile.timed('scoring'):
+            profile.candidates += 1
+        self.assertGreaterEqual(profile.times['scoring'], 0)
+        self.assertIn('Bandit', profile.get_report())
+        self.assertIn('1 candidates', profile.get_report())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import threading
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+from app.constants import COLORKEY
+from app.data.resources.combat_anims import CombatAnimation, Frame, WeaponAnimation
+from app.data.resources.combat_palettes import Palette
+
+class BattleAnimRegistryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+
+    @classmethod
+    def tearDownClass(cls):
+        pygame.display.quit()
+
+    def setUp(self):
+        from app.engine import battle_animation
+        self.battle_animation = battle_animation
+        self.registry = battle_animation.BattleAnimRegistry()
+        self.combat_anim = CombatAnimation('Knight')
+        self.weapon_anim = WeaponAnimation('Lance')
+        image = pygame.Surface((64, 32)).convert()
+        image.fill((0, 1, 0))
+        image.fill((0, 2, 0), (8, 8, 16, 16))
+        image.set_colorkey(COLORKEY)
+        self.weapon_anim.image = image
+        for idx in range(2):
+            self.weapon_anim.frames.append(Frame('frame%d' % idx, (idx * 32, 0, 32, 32), (0, 0)))
+        self.palettes = []
+        for nid, color in (('Blue', (0, 0, 255)), ('Red', (255, 0, 0)), ('Green', (0, 255, 0))):
+            palette = Palette(nid)
+            palette.colors = {(0, 0): COLORKEY, (1, 0): (40, 40, 40), (2, 0): color}
+            self.palettes.append(palette)
+
+    def make(self, palette):
+        return self.battle_animation.BattleAnimation(self.weapon_anim, palette.nid, palette, None, None)
+
+    def build(self, palette):
+        key = self.battle_animation.get_anim_key(self.combat_anim, self.weapon_anim, palette.nid, palette)
+        return self.registry.build(key, lambda: self.make(palette))
+
+    def test_palette_applied(self):
+        anim = self.build(self.palettes[1])
+        image = anim.image_directory['frame0']
+        self.assertEqual(image.get_at((0, 0))[:3], (40, 40, 40))
+        self.assertEqual(image.get_at((10, 10))[:3], (255, 0, 0))
+        self.assertIs(self.build(self.palettes[1]), anim)
+
+    def test_budget(self):
+        anim_bytes = 2 * 32 * 32 * 4
+        self.registry.max_bytes = anim_bytes * 2
+        blue, red = self.build(self.palettes[0]), self.build(self.palettes[1])
+        self.assertEqual(self.registry.total_bytes, anim_bytes * 2)
+        # Using blue makes red the least recently used
+        self.assertIs(self.build(self.palettes[0]), blue)
+        self.build(self.palettes[2])
+        self.assertEqual(len(self.registry), 2)
+        self.assertEqual(self.registry.total_bytes, anim_bytes * 2)
+        self.assertIs(self.build(self.palettes[0]), blue)
+        self.assertIsNot(self.build(self.palettes[1]), red)
+
+    def test_shared_frames(self):
+        registry = self.battle_animation.battle_anim_registry
+        registry.clear()
+        unit1, unit2 = object(), object()
+        palette = self.palettes[0]
+        anim1 = self.battle_animation.BattleAnimation.get_anim(self.combat_anim, self.weapon_anim, palette.nid, palette, unit1, None)
+        anim2 = self.battle_animation.BattleAnimation.get_anim(self.combat_anim, self.weapon_anim, palette.nid, palette, unit2, None)
+        self.assertIsNot(anim1, anim2)
+        self.assertIs(anim1.unit, unit1)
+        self.assertIs(anim2.unit, unit2)
+        self.assertIs(anim1.image_directory, anim2.image_directory)
+        self.assertEqual(len(registry), 1)
+        registry.clear()
+
+    def test_prewarm(self):
+        prewarmer = self.battle_animation.BattleAnimPrewarmer(self.registry)
+        palette = self.palettes[0]
+        key = self.battle_animation.get_anim_key(self.combat_anim, self.weapon_anim, palette.nid, palette)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_make():
+            started.set()
+            release.wait()
+            return self.make(palette)
+
+        prewarmer.submit(key, slow_make)
+        started.wait()
+        self.assertIn(key, self.registry)
+        # Asking for an animation that is being prewarmed waits for it instead of building it again
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(self.registry.build(key, lambda: self.fail("Built twice"))))
+        waiter.start()
+        release.set()
+        waiter.join()
+        prewarmer.join()
+        self.assertIs(results[0], self.registry.get(key))
+
+if __name__ == '__main__':
+    unittest.main()
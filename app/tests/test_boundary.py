@@ -0,0 +1,188 @@
+import os
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+from app.constants import TILEWIDTH, TILEHEIGHT
+from app.engine.fog_of_war import FogOfWarLevelConfig, FogOfWarType
+
+class FakeUnit():
+    def __init__(self, nid, team, position, movement, max_range, aura=False, passes=False):
+        self.nid = nid
+        self.team = team
+        self.position = position
+        self.movement = movement
+        self.max_range = max_range
+        self.aura = aura  # Enemies near this unit have one less range
+        self.passes = passes  # Can move through other units
+        self.ai_group = None
+
+    def get_movement(self):
+        return self.movement
+
+    def get_ai(self):
+        return None
+
+class FakeGame():
+    """
+    Just enough of the game for the boundary to find ranges with:
+    units walk around other teams' units, and attack out to their max range
+    """
+    def __init__(self, width, height):
+        from app.engine.target_system import TargetSystem
+        self.width, self.height = width, height
+        self.units = []
+        self.board = MagicMock()
+        self.board.check_bounds = lambda pos: 0 <= pos[0] < width and 0 <= pos[1] < height
+        self.board.fog_region_set = set()
+        self.path_system = MagicMock()
+        self.path_system.get_valid_moves = self.get_valid_moves
+        self.target_system = MagicMock()
+        self.target_system.find_manhattan_spheres = TargetSystem(self).find_manhattan_spheres
+        self.target_system.get_all_attackable_positions_weapons = \
+            lambda unit, moves, force=False: self.get_attacks(moves, self.get_range(unit))
+        self.target_system.get_all_attackable_positions_spells = \
+            lambda unit, moves, force=False: self.get_attacks(moves, 1) if unit.max_range > 1 else set()
+        self.target_system.get_attack_ranges = \
+            lambda unit: ((('weapon', self.get_range(unit), False),), (('spell', 1, False),) if unit.max_range > 1 else ())
+
+    def get_unit(self, nid):
+        return next(unit for unit in self.units if unit.nid == nid)
+
+    def get_current_fog_info(self):
+        return FogOfWarLevelConfig(False, FogOfWarType.GBA_DEPRECATED, 0, 0, 0)
+
+    def ai_group_active(self, ai_group):
+        return True
+
+    def get_range(self, unit):
+        for other in self.units:
+            if other.aura and other.position and other.team != unit.team and \
+                    abs(other.position[0] - unit.position[0]) + abs(other.position[1] - unit.position[1]) <= 3:
+                return max(unit.max_range - 1, 1)
+        return unit.max_range
+
+    def get_valid_moves(self, unit, force=False):
+        blocked = {other.position for other in self.units
+                   if other.position and other.team != unit.team and not unit.passes}
+        moves = {unit.position}
+        frontier = [unit.position]
+        for _ in range(unit.movement):
+            new_frontier = []
+            for (x, y) in frontier:
+                for pos in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                    if self.board.check_bounds(pos) and pos not in blocked and pos not in moves:
+                        moves.add(pos)
+                        new_frontier.append(pos)
+            frontier = new_frontier
+        return moves
+
+    def get_attacks(self, moves, max_range):
+        return {(x + dx, y + dy) for (x, y) in moves for dx in range(-max_range, max_range + 1)
+                for dy in range(-max_range, max_range + 1)
+                if 0 < abs(dx) + abs(dy) <= max_range and self.board.check_bounds((x + dx, y + dy))}
+
+class BoundaryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+        # Other tests may have reset the sprites without loading their images
+        from app.engine import sprites
+        sprites.load_images()
+
+    @classmethod
+    def tearDownClass(cls):
+        pygame.display.quit()
+
+    def setUp(self):
+        from app.engine import boundary
+        self.rng = random.Random(5)
+        self.game = FakeGame(14, 11)
+        patcher = patch.object(boundary, 'game', self.game)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.BoundaryInterface = boundary.BoundaryInterface
+        self.full_size = (self.game.width * TILEWIDTH, self.game.height * TILEHEIGHT)
+
+    def make_boundary(self, displaying=()):
+        bounds = self.BoundaryInterface(self.game.width, self.game.height)
+        bounds.show()
+        bounds.show_all_enemy_attacks()
+        bounds.displaying_units = set(displaying)
+        bounds.reset()
+        return bounds
+
+    def draw(self, bounds):
+        surf = pygame.Surface(self.full_size, pygame.SRCALPHA)
+        bounds.draw(surf, self.full_size, (0, 0, *self.full_size))
+        return pygame.image.tobytes(surf, 'RGBA')
+
+    def move(self, bounds, unit, pos):
+        # In the same order as game.leave and game.arrive
+        bounds.leave(unit)
+        unit.position = pos
+        bounds.arrive(unit)
+
+    def assertMatchesReset(self, bounds):
+        expected = self.make_boundary(bounds.displaying_units)
+        for mode in ('attack', 'spell', 'movement'):
+            self.assertEqual(bounds.grids[mode], expected.grids[mode], mode)
+        self.assertEqual(self.draw(bounds), self.draw(expected))
+
+    def free_position(self):
+        while True:
+            pos = (self.rng.randrange(self.game.width), self.rng.randrange(self.game.height))
+            if all(unit.position != pos for unit in self.game.units):
+                return pos
+
+    def test_random_moves(self):
+        for idx in range(12):
+            team = 'player' if idx % 3 == 0 else 'enemy'
+            unit = FakeUnit('unit%d' % idx, team, None, self.rng.randrange(1, 5), self.rng.randrange(1, 3),
+                            aura=(idx == 3), passes=(idx == 4))
+            unit.position = self.free_position()
+            self.game.units.append(unit)
+        bounds = self.make_boundary(displaying=('unit1', 'unit2'))
+        self.draw(bounds)
+        for _ in range(40):
+            unit = self.rng.choice(self.game.units)
+            self.move(bounds, unit, self.free_position())
+            self.assertMatchesReset(bounds)
+
+    def test_aura_range_change(self):
+        enemy = FakeUnit('enemy', 'enemy', (3, 3), 2, 2, passes=True)
+        player = FakeUnit('player', 'player', (12, 9), 1, 1, aura=True)
+        self.game.units = [enemy, player]
+        bounds = self.make_boundary(displaying=('enemy',))
+        self.draw(bounds)
+        self.assertIn((7, 3), bounds.dictionaries['attack']['enemy'])
+
+        # Walking past the enemy doesn't change where it can move, only its range
+        moves = self.game.get_valid_moves(enemy)
+        self.move(bounds, player, (3, 5))
+        self.assertEqual(self.game.get_valid_moves(enemy), moves)
+        self.assertNotIn((7, 3), bounds.dictionaries['attack']['enemy'])
+        self.assertMatchesReset(bounds)
+
+        self.move(bounds, player, (12, 9))
+        self.assertIn((7, 3), bounds.dictionaries['attack']['enemy'])
+        self.assertMatchesReset(bounds)
+
+    def test_unchanged_units_kept(self):
+        enemy = FakeUnit('enemy', 'enemy', (3, 3), 2, 1, passes=True)
+        player = FakeUnit('player', 'player', (10, 8), 2, 1)
+        self.game.units = [enemy, player]
+        bounds = self.make_boundary()
+        attacks = bounds.dictionaries['attack']['enemy']
+        # Moving inside the enemy's area of influence changes neither its moves nor its range
+        self.move(bounds, player, (4, 4))
+        self.move(bounds, player, (3, 5))
+        self.assertIs(bounds.dictionaries['attack']['enemy'], attacks)
+        self.assertMatchesReset(bounds)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -143,4 +143,62 @@ class CombatCalcTests(unittest.TestCase):
         self.attacker.can_be_seen = False
         self.check_counter(False, "Should not counter without LOS")
         DB.constants.get("line_of_sight").set_value(False)
-        self.check_counter(True, "Should counter if LOS is disabled, even if no LOS")
\ No newline at end of file
+        self.check_counter(True, "Should counter if LOS is disabled, even if no LOS")
+
+
+class CombatForecastTests(unittest.TestCase):
+    def test_memoized_in_forecast(self):
+        from app.engine import combat_calcs
+        calls = []
+
+        @combat_calcs.memoized_in_forecast
+        def stat(unit, item):
+            calls.append((unit, item))
+            return len(calls)
+
+        # Not memoized outside of a forecast
+        stat('unit', 'item')
+        stat('unit', 'item')
+        self.assertEqual(len(calls), 2)
+
+        combat_calcs._memo = {}
+        try:
+            self.assertEqual(stat('unit', 'item'), 3)
+            self.assertEqual(stat('unit', 'item'), 3)
+            self.assertEqual(stat('unit', 'other_item'), 4)
+            # Keyword arguments are part of the key
+            self.assertEqual(stat('unit', item='item'), 5)
+            self.assertEqual(stat(unit='unit', item='item'), 6)
+            self.assertEqual(stat('unit', item='item'), 5)
+        finally:
+            combat_calcs._memo = None
+
+    def test_forecast_engine(self):
+        from app.engine import combat_calcs
+        from app.engine.combat_forecast import CombatForecastEngine
+        unit = MagicMock()
+        target = MagicMock()
+        item = MagicMock()
+        memos = []
+
+        def compute_damage(*args, **kwargs):
+            memos.append(combat_calcs._memo)
+            return 5
+        with patch('app.engine.combat_calcs.compute_damage', compute_damage), \
+                patch('app.engine.combat_calcs.compute_hit', return_value=80), \
+                patch('app.engine.combat_calcs.compute_crit', return_value=10), \
+                patch('app.engine.combat_calcs.can_counterattack', return_value=True), \
+                patch('app.engine.combat_calcs.compute_attack_phases', return_value=2), \
+                patch('app.engine.combat_calcs.compute_multiattacks', return_value=2):
+            engine = CombatForecastEngine()
+            forecast = engine.get_forecast(unit, item, target, (1, 1))
+            self.assertEqual(forecast.damage, 5)
+            self.assertEqual(forecast.hit, 80)
+            self.assertEqual(forecast.num_attacks, 4)
+            self.assertIs(engine.get_forecast(unit, item, target, (1, 1)), forecast)
+            # Damage is computed for the attack, the crit, and the counter
+            self.assertEqual(len(memos), 3)
+            engine.get_forecast(unit, item, target, (2, 1))
+            # Every position gets its own memo
+            self.assertIsNot(memos[0], memos[-1])
+            self.assertIsNone(combat_calcs._memo)
@@ -0,0 +1,35 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.engine import evaluate
+
+class EvaluateTests(unittest.TestCase):
+    def setUp(self):
+        self.game = MagicMock()
+        self.game.query_engine.func_dict = {'double': lambda x: x * 2}
+        self.unit = MagicMock()
+        self.unit.nid = 'Eirika'
+        evaluate.clear_expression_stats()
+
+    def test_context_layers(self):
+        self.assertEqual(evaluate.evaluate('double(2) + math.floor(1.5)', self.unit, game=self.game), 5)
+        # Names must also be visible from nested scopes, like comprehensions
+        self.assertEqual(evaluate.evaluate(' [x for x in range(3) if unit.nid == "Eirika"] ', self.unit, game=self.game), [0, 1, 2])
+        # Local args shadow everything else
+        self.assertEqual(evaluate.evaluate('double', self.unit, game=self.game, local_args={'double': 3}), 3)
+        with self.assertRaises(NameError):
+            evaluate.evaluate('not_a_name', self.unit, game=self.game)
+
+    def test_code_cache(self):
+        code = evaluate.get_code('unit.nid')
+        self.assertIs(evaluate.get_code('unit.nid'), code)
+
+    def test_hot_expressions(self):
+        for _ in range(3):
+            evaluate.evaluate('unit.nid', self.unit, game=self.game)
+        evaluate.evaluate('double(1)', self.unit, game=self.game)
+        counts = {string: count for string, count, total_time in evaluate.get_hot_expressions()}
+        self.assertEqual(counts, {'unit.nid': 3, 'double(1)': 1})
+
+if __name__ == '__main__':
+    unittest.main()
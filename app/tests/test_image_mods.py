@@ -0,0 +1,70 @@
+import os
+import random
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+from app.constants import COLORKEY
+
+class ImageModsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+
+    @classmethod
+    def tearDownClass(cls):
+        pygame.display.quit()
+
+    def make_image(self, alpha: bool):
+        rng = random.Random(5)
+        image = pygame.Surface((24, 16), pygame.SRCALPHA if alpha else 0)
+        for x in range(24):
+            for y in range(16):
+                color = COLORKEY if rng.random() < 0.2 else (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+                image.set_at((x, y), (*color, rng.choice((0, 100, 255)) if alpha else 255))
+        return image
+
+    def get_pixels(self, image):
+        return [image.get_at((x, y)) for x in range(image.get_width()) for y in range(image.get_height())]
+
+    def test_make_gray(self):
+        from app.engine import image_mods
+        for alpha in (False, True):
+            image = self.make_image(alpha)
+            original = self.get_pixels(image)
+            grayed = self.get_pixels(image_mods.make_gray_colorkey(image))
+            for old, new in zip(original, grayed):
+                if old.a == 0 or old[:3] == COLORKEY:
+                    self.assertEqual(new, old)
+                else:
+                    avg = int(old.r * 0.298 + old.g * 0.587 + old.b * 0.114)
+                    self.assertEqual(new.r, new.g)
+                    self.assertEqual(new.g, new.b)
+                    self.assertLessEqual(abs(new.r - avg), 1)
+                    self.assertEqual(new.a, old.a)
+
+    def test_invert(self):
+        from app.engine import image_mods
+        image = self.make_image(False)
+        original = self.get_pixels(image)
+        image_mods.invert_surface(image)
+        for old, new in zip(original, self.get_pixels(image)):
+            if old[:3] == COLORKEY:
+                self.assertEqual(new, old)
+            else:
+                self.assertEqual(new[:3], (255 - old.r, 255 - old.g, 255 - old.b))
+
+    def test_cached_transform(self):
+        from app.engine import image_mods
+        image = self.make_image(False)
+        original = self.get_pixels(image)
+        grayed = image_mods.cached_transform('test', image_mods.make_gray, image)
+        # The image passed in is not changed
+        self.assertEqual(self.get_pixels(image), original)
+        self.assertIs(image_mods.cached_transform('test', image_mods.make_gray, self.make_image(False)), grayed)
+        self.assertIsNot(image_mods.cached_transform('test', image_mods.make_gray_colorkey, image), grayed)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,7 @@ from app.engine.item_components.weapon_components import Damage, Hit, Crit
 from app.engine.item_components.extra_components import CustomTriangleMultiplier
 from app.engine.objects.item import ItemObject
 from app.engine.objects.skill import SkillObject
+from app.engine.objects.unit import UnitObject
 from app.engine.skill_components.base_components import CanUseWeaponType, CannotUseWeaponType, ChangeAI, ChangeBuyPrice, IgnoreAlliances, Locktouch, SkillTag
 from app.engine.skill_components.combat_components import DamageMultiplier
 from app.engine.skill_components.combat2_components import Vantage
@@ -54,6 +55,10 @@ class ItemSkillComponentTests(unittest.TestCase):
         mock_unit.skills = [mock_skill]
         mock_unit.ai = 'Pursue'
         mock_unit.team = 'player'
+        # Hooks dispatch through the unit's skill hook table
+        mock_unit._skill_hook_table = {}
+        mock_unit._skill_hook_table_generation = SkillObject.component_generation
+        mock_unit.get_skill_hook_implementers = lambda *hook_names: UnitObject.get_skill_hook_implementers(mock_unit, *hook_names)
         self.assertEqual(expected_result, call_hook(mock_unit))
 
     def test_skill_hooks_set_union_behavior(self):
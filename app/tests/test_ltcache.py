@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.engine.utils.ltcache import LTCache
+
+class LTCacheTests(unittest.TestCase):
+    def test_invalidate_by_dependency(self):
+        cache = LTCache()
+        unit, skill = 'unit', 'skill'
+        cache.put('charge', True, (frozenset({unit, skill}), frozenset({'data'})))
+        cache.put('mana', True, (frozenset({unit, skill}), frozenset({'mana'})))
+        cache.put('anything', True)
+
+        # Nothing that hooks can see changed
+        cache.invalidate([])
+        self.assertIsNotNone(cache.get('anything'))
+
+        # Entries that could depend on anything are always dropped
+        cache.invalidate([(unit, 'hp')])
+        self.assertIsNone(cache.get('anything'))
+        self.assertIsNotNone(cache.get('charge'))
+        self.assertIsNotNone(cache.get('mana'))
+
+        cache.invalidate([(skill, 'data')])
+        self.assertIsNone(cache.get('charge'))
+        self.assertIsNotNone(cache.get('mana'))
+
+        cache.invalidate(None)
+        self.assertIsNone(cache.get('mana'))
+
+    def test_eviction(self):
+        cache = LTCache()
+        cache.max_size = 2
+        cache.put(1, 'a', (frozenset({'unit'}), frozenset({'hp'})))
+        cache.put(2, 'b')
+        cache.get(1)
+        cache.put(3, 'c')
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1).value, 'a')
+        self.assertEqual(cache.evictions, 1)
+
+    def test_condition_dependencies(self):
+        from app.engine import skill_system
+        from app.engine.skill_components.attribute_components import TerrainSkill
+        from app.engine.skill_components.charge_components import CheckMana
+        from app.engine.skill_components.conditional_components import CombatCondition, Condition
+        unit, item, skill = MagicMock(name='unit'), MagicMock(name='item'), MagicMock(name='skill')
+        skill.components = [CombatCondition(), CheckMana(2)]
+        self.assertEqual(skill_system._condition_dependencies(skill, unit),
+                         (frozenset({skill, unit}), frozenset({'equipment', 'mana'})))
+        self.assertEqual(skill_system._condition_dependencies(skill, unit, item),
+                         (frozenset({skill, unit, item}), frozenset({'mana'})))
+        # Tags include those given by other skills, whose conditions could read anything
+        skill.components.append(TerrainSkill())
+        self.assertIsNone(skill_system._condition_dependencies(skill, unit))
+        # So could an evaluated condition
+        skill.components = [CheckMana(2), Condition('True')]
+        self.assertIsNone(skill_system._condition_dependencies(skill, unit))
+
+if __name__ == '__main__':
+    unittest.main()
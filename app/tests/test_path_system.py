@@ -56,6 +56,44 @@ class PathSystemTests(unittest.TestCase):
             self.assertGreater(len(valid_moves), 0, 'get_valid_moves did not return a valid move')
             self.assertIn((1, 1), valid_moves, 'current position is not valid_moves')
 
+    def test_valid_moves_cache(self):
+        with patch('app.engine.equations.parser.movement') as movement_mock, \
+             patch('app.engine.objects.unit.UnitObject.movement_left', new_callable=PropertyMock) as movement_left_mock:
+            movement_instance = movement_mock.return_value
+            movement_instance.method.return_value = 5
+            movement_left_mock.return_value = 5
+            cache = self.game.board.reachability_cache
+
+            valid_moves = self.path_system.get_valid_moves(self.player_unit)
+            self.assertEqual(cache.misses, 1)
+            valid_moves.clear()  # Callers are free to modify what they get back
+            valid_moves = self.path_system.get_valid_moves(self.player_unit)
+            self.assertEqual(cache.hits, 1, 'Repeated query did not use the cache')
+            self.assertIn((6, 1), valid_moves)
+
+            # Cached path agrees with the move range
+            path = self.path_system.get_cached_path(self.player_unit, (4, 3))
+            self.assertEqual(path[0], (4, 3))
+            self.assertEqual(path[-1], (1, 1))
+            self.assertEqual(len(path), 6)
+            self.assertIsNone(self.path_system.get_cached_path(self.player_unit, (20, 20)))
+
+            # Occupancy changes outside the move range don't invalidate
+            enemy = UnitObject('enemy')
+            enemy.team = 'enemy'
+            self.game.board.set_unit((20, 20), enemy)
+            hits = cache.hits
+            self.path_system.get_valid_moves(self.player_unit)
+            self.assertEqual(cache.hits, hits + 1)
+
+            # But changes within it do
+            self.game.board.remove_unit((20, 20), enemy)
+            self.game.board.set_unit((2, 1), enemy)
+            with patch.object(self.game.board, 'in_vision', return_value=True):
+                valid_moves = self.path_system.get_valid_moves(self.player_unit)
+            self.assertEqual(cache.misses, 2)
+            self.assertNotIn((6, 1), valid_moves, 'Enemy unit did not block movement')
+
     def test_get_path(self):
         goal = (28, 14)
 
@@ -1,7 +1,9 @@
 import unittest
+from unittest.mock import MagicMock
 
 from app.utilities.grid import BoundedGrid
-from app.engine.pathfinding import node, pathfinding
+from app.engine.pathfinding import distance_field, node, pathfinding
+from app.engine.pathfinding.cost_array import CostArray, MovementGrid
 
 class PathfindingTests(unittest.TestCase):
     """
@@ -69,6 +71,30 @@ x   x   x   x   x   x   x   x   x
         self.assertNotIn((3, 6), valid_moves, 'Ignored wall')
         self.assertNotIn((3, 6), valid_moves, 'Ignored wall')
 
+    def test_djikstra_predecessors(self):
+        pathfinder = pathfinding.Djikstra((5, 5), self.simple_grid)
+        can_move_through = lambda x: True
+        valid_moves = pathfinder.process(can_move_through, 3)
+        predecessors = pathfinder.get_predecessors()
+        self.assertEqual(set(predecessors.keys()), valid_moves)
+        self.assertIsNone(predecessors[(5, 5)], 'Start position should have no predecessor')
+        # Walk back to the start from the edge of the range
+        pos, steps = (5, 8), 0
+        while predecessors[pos]:
+            pos = predecessors[pos]
+            steps += 1
+        self.assertEqual(pos, (5, 5))
+        self.assertEqual(steps, 3)
+
+        # Another search sharing the same cost array invalidates the scratch arrays
+        cost_array = CostArray.from_grid(self.simple_grid)
+        grid = MovementGrid((11, 11), self.simple_grid.bounds, cost_array)
+        grid._cells = self.simple_grid.cells()
+        pathfinder = pathfinding.Djikstra((5, 5), grid)
+        self.assertEqual(pathfinder.process(can_move_through, 3), valid_moves)
+        pathfinding.AStar((1, 1), (3, 3), grid).process(can_move_through)
+        self.assertRaises(ValueError, pathfinder.get_predecessors)
+
     def test_astar(self):
         # Test the simple grid with no limit
         pathfinder = pathfinding.AStar((5, 5), None, self.simple_grid)
@@ -98,6 +124,64 @@ x   x   x   x   x   x   x   x   x
         path = pathfinder.process(can_move_through, adj_good_enough=True)
         self.assertEqual(path[0], (7, 8), f'Did not find the best end: {path}')
 
+    def test_distance_field(self):
+        can_move_through = lambda x: True
+        cost_array = CostArray.from_grid(self.complex_grid)
+        field = distance_field.compute_distance_field(
+            cost_array, self.complex_grid.bounds, {(7, 7)}, can_move_through)
+        # Same cost as the path AStar finds
+        for start in [(1, 7), (1, 3), (8, 10), (4, 4)]:
+            path = pathfinding.AStar(start, (7, 7), self.complex_grid).process(can_move_through)
+            cost = sum(self.complex_grid.get(pos).cost for pos in path[:-1])
+            self.assertEqual(field.get_distance(start), cost, f'Wrong distance from {start}')
+            field_path = field.get_path(start)
+            self.assertEqual(field_path[0], (7, 7), 'Did not find the end')
+            self.assertEqual(field_path[-1], start, 'Did not start at the beginning')
+            self.assertEqual(sum(self.complex_grid.get(pos).cost for pos in field_path[:-1]), cost)
+        self.assertEqual(field.get_distance((1, 1)), float('inf'), 'Ignored bounds')
+        self.assertEqual(field.get_path((0, 7)), [], 'Ignored bounds')
+
+        # Multiple sources and blocked positions
+        blocked = {(2, 7)}
+        field = distance_field.compute_distance_field(
+            cost_array, self.complex_grid.bounds, {(7, 7), (1, 10)}, lambda pos: pos not in blocked)
+        self.assertEqual(field.get_distance((1, 7)), 3)
+        self.assertEqual(field.get_path((1, 7))[0], (1, 10))
+        self.assertEqual(field.get_distance((2, 7)), 4, 'Blocked positions can still be started from')
+
+    def test_distance_field_from_start(self):
+        # A field with the start as its source gives the path out to every goal at once
+        can_move_through = lambda x: True
+        cost_array = CostArray.from_grid(self.complex_grid)
+        start = (1, 7)
+        field = distance_field.compute_distance_field(
+            cost_array, self.complex_grid.bounds, {start}, can_move_through)
+        start_cost = self.complex_grid.get(start).cost
+        for goal in [(7, 7), (4, 7), (8, 10), (4, 4)]:
+            path = pathfinding.AStar(start, goal, self.complex_grid).process(can_move_through)
+            cost = sum(self.complex_grid.get(pos).cost for pos in path[:-1])
+            field_cost = field.get_distance(goal) - start_cost + self.complex_grid.get(goal).cost
+            self.assertEqual(field_cost, cost, f'Wrong cost to {goal}')
+            field_path = list(reversed(field.get_path(goal)))
+            self.assertEqual(field_path[0], goal)
+            self.assertEqual(field_path[-1], start)
+            self.assertEqual(sum(self.complex_grid.get(pos).cost for pos in field_path[:-1]), cost)
+
+    def test_distance_field_service(self):
+        cost_array = CostArray.from_grid(self.complex_grid)
+        board = MagicMock()
+        board.get_movement_grid.return_value = MagicMock(cost_array=cost_array, bounds=self.complex_grid.bounds)
+        board.can_move_through = lambda team, pos: True
+        service = distance_field.DistanceFieldService(board)
+        # Both limits can enter every passable position, so they share one field
+        field = service.get_distance_field('foot', 'enemy', [(7, 7)], max_movement_limit=5)
+        self.assertIs(service.get_distance_field('foot', 'enemy', {(7, 7)}), field)
+        self.assertEqual(len(service.fields), 1)
+        # But a limit that keeps the unit out of the mud does not
+        limited = service.get_distance_field('foot', 'enemy', [(7, 7)], max_movement_limit=1)
+        self.assertIsNot(limited, field)
+        self.assertGreater(limited.get_distance((1, 7)), field.get_distance((1, 7)))
+
     def test_thetastar(self):
         # Test the simple grid
         pathfinder = pathfinding.ThetaStar((5, 5), (1, 1), self.simple_grid)
@@ -0,0 +1,32 @@
+import random
+import unittest
+
+from app.engine import position_mask
+
+class PositionMaskTests(unittest.TestCase):
+    def setUp(self):
+        self.bounds = (3, 2, 14, 9)
+        self.grid = position_mask.get_grid(self.bounds)
+        rng = random.Random(11)
+        self.positions = {(rng.randint(3, 14), rng.randint(2, 9)) for _ in range(30)}
+
+    def test_round_trip(self):
+        mask = self.grid.from_positions(self.positions)
+        self.assertEqual(self.grid.to_positions(mask), self.positions)
+        self.assertEqual(self.grid.to_positions(0), set())
+        self.assertIsNone(self.grid.from_positions([(2, 2)]))
+        self.assertIs(position_mask.get_grid(self.bounds), self.grid)
+
+    def test_spread(self):
+        offsets = frozenset([(-1, 0), (11, 0), (0, -7), (2, 3), (-12, 0)])
+        expected = {(x + dx, y + dy) for x, y in self.positions for dx, dy in offsets}
+        expected = {pos for pos in expected if self.grid.contains(pos)}
+        mask = self.grid.spread(self.grid.from_positions(self.positions), offsets)
+        self.assertEqual(self.grid.to_positions(mask), expected)
+
+        # Positions on the left edge don't wrap around to the row above
+        mask = self.grid.from_positions([(3, 5)])
+        self.assertEqual(self.grid.to_positions(self.grid.spread(mask, frozenset([(-1, 0)]))), set())
+
+if __name__ == '__main__':
+    unittest.main()
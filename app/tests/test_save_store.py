@@ -0,0 +1,122 @@
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import unittest
+
+from app.engine import save_store
+
+class SaveStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.save_dir = tempfile.mkdtemp()
+        self.store_dir = os.path.join(self.save_dir, 'game-sections')
+        self.actions = [('Move', {'unit': 'Eirika', 'pos': (i % 7, i % 5)}) for i in range(600)]
+        self.s_dict = {'units': [{'nid': 'unit%d' % i, 'stats': list(range(30))} for i in range(20)],
+                       'turncount': 3,
+                       'level': {'nid': '0', 'tiles': list(range(1000))},
+                       'action_log': (self.actions, 12, 599)}
+
+    def tearDown(self):
+        shutil.rmtree(self.save_dir)
+
+    def get_loc(self, name):
+        return os.path.join(self.save_dir, name + '.p')
+
+    def test_round_trip(self):
+        save_store.write_save(self.get_loc('game-0'), self.s_dict, self.store_dir)
+        self.assertEqual(save_store.read_save(self.get_loc('game-0')), self.s_dict)
+
+        # Ordinary pickled saves can still be read
+        with open(self.get_loc('game-1'), 'wb') as fp:
+            pickle.dump(self.s_dict, fp)
+        self.assertIsNone(save_store.read_manifest(self.get_loc('game-1')))
+        self.assertEqual(save_store.read_save(self.get_loc('game-1')), self.s_dict)
+
+    def test_incremental(self):
+        first = save_store.write_save(self.get_loc('game-0'), self.s_dict, self.store_dir)
+        self.assertGreater(first, 0)
+        # Nothing changed, so nothing new to write
+        self.assertEqual(save_store.write_save(self.get_loc('game-suspend'), self.s_dict, self.store_dir), 0)
+
+        # Only the changed section and the last chunk of the action log are written
+        self.s_dict['turncount'] = 4
+        self.s_dict['units'][0]['stats'][0] = 100
+        self.actions.append(('Wait', {'unit': 'Eirika'}))
+        self.assertEqual(save_store.write_save(self.get_loc('game-suspend'), self.s_dict, self.store_dir), 2)
+        self.assertEqual(save_store.read_save(self.get_loc('game-suspend')), self.s_dict)
+        self.assertEqual(save_store.read_save(self.get_loc('game-0'))['turncount'], 3)
+
+    def test_collect_garbage(self):
+        save_store.write_save(self.get_loc('game-0'), self.s_dict, self.store_dir)
+        shutil.copy(self.get_loc('game-0'), self.get_loc('game-restart0'))
+        self.s_dict['level']['nid'] = '1'
+        save_store.write_save(self.get_loc('game-0'), self.s_dict, self.store_dir)
+        # The restart save still uses the old level
+        self.assertEqual(save_store.collect_garbage(self.store_dir), 0)
+
+        os.remove(self.get_loc('game-restart0'))
+        self.assertEqual(save_store.collect_garbage(self.store_dir), 1)
+        self.assertEqual(save_store.read_save(self.get_loc('game-0')), self.s_dict)
+
+    def write_meta(self, name, metadata):
+        meta_loc = self.get_loc(name) + 'meta'
+        with open(meta_loc, 'wb') as fp:
+            pickle.dump(metadata, fp)
+        return meta_loc
+
+    def test_catalog(self):
+        index_loc = os.path.join(self.save_dir, 'game-catalog.pidx')
+        catalog = save_store.SaveCatalog(index_loc)
+        meta_0 = self.write_meta('game-0', {'kind': 'start', 'playtime': 0})
+        catalog.put(meta_0, {'kind': 'start', 'playtime': 0})
+        self.assertEqual(catalog.get(meta_0), {'kind': 'start', 'playtime': 0})
+        self.assertIsNone(catalog.get(self.get_loc('game-1') + 'meta'))
+
+        # Saves the catalog was not told about are read from their metadata file
+        meta_1 = self.write_meta('game-1', {'kind': 'battle', 'playtime': 10})
+        self.assertEqual(catalog.get(meta_1), {'kind': 'battle', 'playtime': 10})
+        # As are saves that changed since
+        self.write_meta('game-0', {'kind': 'battle', 'playtime': 1000})
+        self.assertEqual(catalog.get(meta_0), {'kind': 'battle', 'playtime': 1000})
+
+        os.remove(meta_1)
+        catalog.remove(meta_1)
+        self.assertIsNone(catalog.get(meta_1))
+
+        # The catalog is read back from its index, without reading the metadata files
+        with open(index_loc, 'ab') as fp:
+            fp.write(b'\x10\x00\x00\x00half a record')
+        with self.assertLogs(level='WARNING'):
+            catalog = save_store.SaveCatalog(index_loc)
+        self.assertEqual(catalog.entries[meta_0][1], {'kind': 'battle', 'playtime': 1000})
+        self.assertNotIn(meta_1, catalog.entries)
+        # The half written record was dropped
+        self.assertEqual(catalog.num_records, 1)
+
+        # Old records are thrown away once there are enough of them
+        for i in range(100):
+            catalog.put(meta_0, {'kind': 'battle', 'playtime': i})
+        self.assertLess(catalog.num_records, 40)
+        catalog = save_store.SaveCatalog(index_loc)
+        self.assertEqual(catalog.get(meta_0), {'kind': 'battle', 'playtime': 99})
+
+    def test_writer(self):
+        writer = save_store.SaveWriter(max_pending=2)
+        written = []
+        lock = threading.Lock()
+
+        def write(num):
+            with lock:
+                written.append(num)
+
+        with self.assertLogs(level='ERROR'):
+            for num in range(10):
+                writer.submit(write, num)
+            writer.submit(lambda: 1 / 0)  # Errors are logged, and don't stop the writer
+            writer.submit(write, 10)
+            writer.join()
+        self.assertEqual(written, list(range(11)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+import wave
+from unittest.mock import patch
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+import pygame
+
+from app.data.resources.sounds import SongPrefab
+from app.utilities.data import Data
+
+class MusicCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.mixer.init(44100, -16, 2)
+        pygame.mixer.set_num_channels(8)
+
+    @classmethod
+    def tearDownClass(cls):
+        pygame.mixer.quit()
+
+    def setUp(self):
+        from app.engine import sound
+        self.song_dir = tempfile.mkdtemp()
+        self.music = Data()
+        for nid in ('a', 'b', 'c'):
+            prefab = SongPrefab(nid, self.write_wav(nid, 1.0))
+            self.music.append(prefab)
+        self.music.get('c').set_battle_full_path(self.write_wav('c-battle', 0.5))
+        patcher = patch.object(sound, 'RESOURCES')
+        patcher.start().music = self.music
+        self.addCleanup(patcher.stop)
+        # One second of 44.1 kHz, 16 bit stereo
+        self.song_bytes = 44100 * 4
+        self.music_dict = sound.MusicDict()
+
+    def tearDown(self):
+        shutil.rmtree(self.song_dir)
+
+    def write_wav(self, nid, seconds):
+        path = os.path.join(self.song_dir, nid + '.wav')
+        with wave.open(path, 'wb') as fp:
+            fp.setnchannels(2)
+            fp.setsampwidth(2)
+            fp.setframerate(44100)
+            fp.writeframes(bytes(int(44100 * seconds) * 4))
+        return path
+
+    def test_background_decoding(self):
+        song = self.music_dict.request('c')
+        self.assertTrue(song.has_battle)
+        self.assertIs(self.music_dict.get('c'), song)
+        self.assertTrue(song.ready)
+        self.assertEqual(song.nbytes, self.song_bytes * 3 // 2)
+        self.assertIsNotNone(song.battle)
+        self.assertIsNone(self.music_dict.request('missing'))
+
+        self.music.get('a').full_path = os.path.join(self.song_dir, 'nothing.wav')
+        with self.assertLogs(level='WARNING'):
+            self.assertIsNone(self.music_dict.get('a'))
+        self.assertIsNone(self.music_dict.request('a'))
+
+    def test_budget(self):
+        with patch.object(self.music_dict, 'get_max_bytes', return_value=self.song_bytes * 5 // 2):
+            a, b = self.music_dict.get('a'), self.music_dict.get('b')
+            a.channel = object()  # Playing, so it must be kept
+            self.music_dict.get('c')
+            self.music_dict.trim()
+            self.assertTrue(a.ready)
+            self.assertFalse(b.ready)
+            self.assertIsNone(b.song)
+            stats = self.music_dict.get_stats()
+            self.assertEqual(stats['resident_bytes'], self.song_bytes * 5 // 2)
+            self.assertEqual(stats['songs']['b']['bytes'], 0)
+
+            # Thrown away songs are decoded again when asked for
+            self.assertIs(self.music_dict.get('b'), b)
+            self.assertTrue(b.ready)
+            self.music_dict.trim()
+            self.assertFalse(self.music_dict['c'].ready)
+            self.assertEqual(self.music_dict.resident_bytes(), self.song_bytes * 2)
+
+    def test_channel_waits_for_song(self):
+        from app.engine import sound
+        channel = sound.Channel('music', 0, pygame.USEREVENT)
+        song = sound.SongObject(self.music.get('a'))
+        channel.set_current_song(song)
+        channel.fade_in()
+        self.assertTrue(channel.waiting_for_song)
+        self.assertFalse(channel.is_playing())
+        # The fade doesn't start until the song is ready
+        self.assertFalse(channel.update([], channel.last_update + 10000))
+        self.assertEqual(channel.state, 'fade_in')
+
+        song.load()
+        channel.update([], 5000)
+        self.assertFalse(channel.waiting_for_song)
+        self.assertTrue(channel.is_playing())
+        self.assertEqual(channel.last_update, 5000)
+        channel.stop()
+
+if __name__ == '__main__':
+    unittest.main()
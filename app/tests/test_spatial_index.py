@@ -0,0 +1,116 @@
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.engine.spatial_index import SpatialUnitIndex
+from app.utilities import utils
+
+class SpatialUnitIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = SpatialUnitIndex()
+        self.rng = random.Random(7)
+        self.units = []
+        for i in range(40):
+            unit = MagicMock(name='unit%d' % i)
+            unit.team = self.rng.choice(['player', 'enemy', 'other'])
+            unit.position = (self.rng.randrange(30), self.rng.randrange(20))
+            self.index.add(unit, unit.position)
+            self.units.append(unit)
+
+    def move(self, unit, pos):
+        unit.position = pos
+        self.index.add(unit, pos)
+
+    def test_radius(self):
+        for _ in range(50):
+            pos = (self.rng.randrange(30), self.rng.randrange(20))
+            radius = self.rng.randrange(8)
+            expected = {(unit, utils.calculate_distance(unit.position, pos)) for unit in self.units
+                        if unit.team == 'enemy' and utils.calculate_distance(unit.position, pos) <= radius}
+            self.assertEqual(set(self.index.in_radius(pos, radius, teams=('enemy',))), expected)
+
+    def test_rect_and_region(self):
+        expected = {unit for unit in self.units if 3 <= unit.position[0] <= 9 and 2 <= unit.position[1] <= 13}
+        self.assertEqual(set(self.index.in_rect((9, 2), (3, 13))), expected)
+
+        region = MagicMock(name='region')
+        region.position = (3, 2)
+        region.size = (7, 12)
+        region.contains = lambda pos: 3 <= pos[0] < 10 and 2 <= pos[1] < 14
+        self.assertEqual(set(self.index.in_region(region)), expected)
+        region.position = None
+        self.assertEqual(self.index.in_region(region), [])
+
+    def test_nearest(self):
+        for _ in range(50):
+            pos = (self.rng.randrange(30), self.rng.randrange(20))
+            num = self.rng.randrange(1, 5)
+            found = self.index.nearest(pos, num, teams=('player', 'other'))
+            distances = sorted(utils.calculate_distance(unit.position, pos) for unit in self.units if unit.team != 'enemy')
+            last_distance = distances[num - 1]
+            self.assertEqual([distance for _, distance in found], [d for d in distances if d <= last_distance])
+
+        # Closest unit satisfying a condition
+        odd = [unit for unit in self.units if unit.position[0] % 2]
+        found = self.index.nearest((0, 0), condition=lambda unit: unit.position[0] % 2)
+        self.assertEqual(found[0][1], min(utils.calculate_distance(unit.position, (0, 0)) for unit in odd))
+        self.assertEqual(self.index.nearest((0, 0), condition=lambda unit: False), [])
+
+    def test_move_and_remove(self):
+        unit = self.units[0]
+        self.move(unit, (100, 100))
+        self.assertEqual(self.index.get_position(unit), (100, 100))
+        self.assertEqual(self.index.in_radius((100, 100), 0), [(unit, 0)])
+        self.assertEqual(self.index.nearest((99, 99), num=1), [(unit, 2)])
+
+        self.index.remove(unit)
+        self.assertEqual(self.index.in_radius((100, 100), 0), [])
+        self.assertEqual(len(self.index), len(self.units) - 1)
+        self.assertNotIn(unit, self.index.get_units())
+        # Removing twice does nothing
+        self.index.remove(unit)
+        self.assertEqual(len(self.index), len(self.units) - 1)
+
+    def test_moving_unit(self):
+        unit = self.units[0]
+        unit.team = 'enemy'
+        self.move(unit, (100, 100))
+        self.index.add_moving(unit)
+        self.assertEqual(len(self.index), len(self.units))
+        # Found wherever it has walked to so far
+        unit.position = (101, 100)
+        self.assertEqual(self.index.get_position(unit), (101, 100))
+        self.assertEqual(self.index.in_radius((100, 100), 1, teams=('enemy',)), [(unit, 1)])
+        self.assertEqual(self.index.in_radius((100, 100), 1, teams=('player',)), [])
+        self.assertEqual(self.index.in_rect((101, 99), (102, 102)), [unit])
+        self.assertEqual(self.index.nearest((102, 100)), [(unit, 1)])
+        self.assertIn(unit, self.index.get_units(teams=('enemy',)))
+        unit.position = (102, 100)
+        self.assertEqual(self.index.in_radius((100, 100), 1), [])
+
+        # Arriving puts it back into its chunk
+        self.index.add(unit, unit.position)
+        self.assertEqual(self.index.moving, set())
+        self.assertEqual(self.index.in_radius((102, 100), 0), [(unit, 0)])
+        self.assertEqual(len(self.index), len(self.units))
+
+    def test_quick_leave_keeps_position(self):
+        from app.engine import action
+        unit = self.units[0]
+        game = MagicMock(name='game')
+        game.board.unit_index = self.index
+
+        def leave(unit, test=False):
+            self.index.remove(unit)
+            unit.position = None
+        game.leave = leave
+        with patch.object(action, 'game', game):
+            action.QuickLeave(unit, keep_position=True).do()
+            # Starts walking
+            unit.position = (50, 50)
+            self.assertEqual(self.index.in_radius((50, 50), 0), [(unit, 0)])
+            action.QuickLeave(unit, test=True).do()
+            self.assertEqual(self.index.in_radius((50, 50), 0), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -73,6 +73,24 @@ class TargetSystemUnitTests(unittest.TestCase):
         self.assertNotIn((4, 1), valid_positions)
         self.assertNotIn((-5, 0), valid_positions)
 
+    def test_get_shell_many_moves(self):
+        # Enough moves to use a mask of positions, which should find the same shell as the positions one at a time
+        bounds = (2, 1, 20, 12)
+        manhattan_restriction = {(x, y) for x in range(-10, 11) for y in range(-10, 11) if x == 0 or y == 0}
+        valid_moves = {(x, y) for x in range(0, 12) for y in range(0, 12) if abs(x - 6) + abs(y - 5) <= 4 and 2 <= x and 1 <= y}
+        for potential_range in ({1}, {0, 1, 2}, {2, 3}, {5, 9}, set(range(1, 30))):
+            for restriction in (None, manhattan_restriction):
+                expected = set()
+                for move in valid_moves:
+                    expected |= self.target_system.get_shell({move}, potential_range, bounds, restriction)
+                self.assertEqual(self.target_system.get_shell(valid_moves, potential_range, bounds, restriction), expected)
+
+        # Positions out of bounds can't be part of a mask
+        valid_moves.add((0, 0))
+        valid_positions = self.target_system.get_shell(valid_moves, {3}, bounds)
+        self.assertIn((2, 1), valid_positions)
+        self.assertNotIn((0, 3), valid_positions)
+
     def test_get_possible_attack_positions(self):
         self.player_unit.position = (0, 0)
         self.enemy_unit.position = (0, 1)
@@ -127,6 +145,17 @@ class TargetSystemUnitTests(unittest.TestCase):
         num_positions = (self.game.board.bounds[2] - self.game.board.bounds[0] + 1) * (self.game.board.bounds[3] - self.game.board.bounds[1] + 1) - 1
         self.assertEqual(len(valid_positions), num_positions)
 
+    def test_get_attack_ranges(self):
+        self.player_unit.position = (1, 1)
+        weapon = self.mock_weapon(None, 1, 2)
+        self.target_system._get_all_weapons = MagicMock(return_value=[weapon])
+        self.target_system._get_all_spells = MagicMock(return_value=[])
+        self.assertEqual(self.target_system.get_attack_ranges(self.player_unit),
+                         (((weapon.uid, frozenset({1, 2}), False),), ()))
+
+        weapon.components[2].value = 3
+        self.assertEqual(self.target_system.get_attack_ranges(self.player_unit)[0][0][1], frozenset({1, 2, 3}))
+
     def test_targets_in_range_adjacent(self):
         """
         An adjacent enemy should be a valid target
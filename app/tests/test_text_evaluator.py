@@ -2,7 +2,7 @@ import logging
 import unittest
 from unittest.mock import MagicMock
 
-from app.engine.text_evaluator import TextEvaluator
+from app.engine.text_evaluator import TextEvaluator, get_template
 from app.tests.mocks.mock_game import get_mock_game
 
 
@@ -29,4 +29,14 @@ class TextEvaluatorTests(unittest.TestCase):
     def testNestedEval(self):
         text = "{e:1}+{e:1+{e:1}}"
         evaled = self.text_evaluator._evaluate_all(text)
-        self.assertEqual(evaled, "1+2")
\ No newline at end of file
+        self.assertEqual(evaled, "1+2")
+
+    def testTemplate(self):
+        text = "{v:TimesRescued} times, {it}! {e:1+{v:TimesRescued}}"
+        # Parsed once
+        self.assertIs(get_template(text), get_template(text))
+        # but evaluated against the current locals each time
+        self.assertEqual(self.text_evaluator._evaluate_all(text, {'it': 'Seth'}), "10 times, Seth! 11")
+        self.assertEqual(self.text_evaluator._evaluate_all(text, {'it': 'Erika'}), "10 times, Erika! 11")
+        self.mock_game.level_vars['TimesRescued'] = 2
+        self.assertEqual(self.text_evaluator._evaluate_all(text, {'it': 'Erika'}), "2 times, Erika! 3")
@@ -0,0 +1,115 @@
+import os
+import random
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+from app.constants import TILEWIDTH, TILEHEIGHT, COLORKEY
+from app.utilities.data import Data
+
+class TileMapChunkTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+
+    @classmethod
+    def tearDownClass(cls):
+        pygame.display.quit()
+
+    def setUp(self):
+        from app.engine.objects.tilemap import TileMapObject, LayerObject, CHUNK_SIZE
+        self.rng = random.Random(3)
+        self.tilemap = TileMapObject()
+        self.tilemap.width, self.tilemap.height = 37, 21
+        self.tilemap.autotile_fps = 29
+        self.tilemap.layers = Data()
+        for nid, bounds in (('base', (0, 0, 37, 21)), ('bridge', (5, 3, 20, 9)), ('house', (30, 18, 37, 21))):
+            layer = LayerObject(nid, False, self.tilemap)
+            layer.image = self.make_image(bounds)
+            layer.pixel_bounds = [bounds[0] * TILEWIDTH, bounds[1] * TILEHEIGHT, bounds[2] * TILEWIDTH, bounds[3] * TILEHEIGHT]
+            self.tilemap.layers.append(layer)
+        water = self.tilemap.layers.get('base')
+        water.autotile_images = [self.make_image((0, 0, 4, 4)) for _ in range(3)]
+        water.autotile_chunks = {(0, 0)}
+        self.chunk_size = CHUNK_SIZE
+
+    def make_image(self, bounds):
+        image = pygame.Surface((self.tilemap.width * TILEWIDTH, self.tilemap.height * TILEHEIGHT)).convert()
+        image.fill(COLORKEY)
+        image.set_colorkey(COLORKEY)
+        for x in range(bounds[0], bounds[2]):
+            for y in range(bounds[1], bounds[3]):
+                if self.rng.random() < 0.7:
+                    color = (self.rng.randrange(256), self.rng.randrange(256), self.rng.randrange(256))
+                    image.fill(color, (x * TILEWIDTH, y * TILEHEIGHT, TILEWIDTH, TILEHEIGHT))
+        return image
+
+    def draw_layers(self, cull_rect):
+        # Draws every layer straight onto the image, without the chunk cache
+        image = pygame.Surface((cull_rect[2], cull_rect[3])).convert()
+        image.fill(COLORKEY)
+        for layer in self.tilemap.background_layers():
+            if layer.visible and layer.should_draw(cull_rect):
+                image.blit(layer.get_image(cull_rect), (0, 0))
+                autotile_image = layer.get_autotile_image(cull_rect)
+                if autotile_image:
+                    image.blit(autotile_image, (0, 0))
+        return image
+
+    def assertSameImage(self, cull_rect):
+        expected = pygame.image.tobytes(self.draw_layers(cull_rect), 'RGB')
+        self.assertEqual(pygame.image.tobytes(self.tilemap.get_full_image(cull_rect), 'RGB'), expected)
+
+    def test_full_image(self):
+        cull_rects = [(0, 0, 240, 160), (100, 37, 240, 160), (400, 180, 240, 160),
+                      (-8, -16, 240, 160), (0, 0, 37 * TILEWIDTH, 21 * TILEHEIGHT), (2000, 0, 240, 160)]
+        for visible in ((True, False, False), (True, True, False), (False, True, True), (True, True, True)):
+            for layer, vis in zip(self.tilemap.layers, visible):
+                layer.visible = vis
+            for frame in range(3):
+                self.tilemap.layers.get('base').autotile_frame = frame
+                for cull_rect in cull_rects:
+                    self.assertSameImage(cull_rect)
+
+    def get_chunk_images(self, chunk):
+        return {key: image for key, image in self.tilemap.chunk_cache.items() if key[0] == chunk}
+
+    def test_chunks_reused(self):
+        self.tilemap.layers.get('bridge').visible = False
+        cull_rect = (0, 0, 240, 160)
+        self.tilemap.get_full_image(cull_rect)
+        chunk_image = self.tilemap.chunk_cache[((0, 0), ('base',), (0,))]
+        self.tilemap.get_full_image((16, 16, 240, 160))
+        self.assertIs(self.tilemap.chunk_cache[((0, 0), ('base',), (0,))], chunk_image)
+
+        # Turning on a layer only rebuilds the chunks it is in
+        far_chunk = (1, 1)
+        self.tilemap.get_full_image((self.chunk_size * TILEWIDTH, self.chunk_size * TILEHEIGHT, 240, 160))
+        far_images = self.get_chunk_images(far_chunk)
+        self.tilemap.layers.get('bridge').visible = True
+        self.assertSameImage(cull_rect)
+        self.assertIn(((0, 0), ('base', 'bridge'), (0,)), self.tilemap.chunk_cache)
+        self.tilemap.get_full_image((self.chunk_size * TILEWIDTH, self.chunk_size * TILEHEIGHT, 240, 160))
+        self.assertEqual(self.get_chunk_images(far_chunk), far_images)
+
+    def test_chunk_budget(self):
+        chunk_bytes = self.chunk_size * TILEWIDTH * self.chunk_size * TILEHEIGHT * 4
+        self.tilemap.max_chunk_bytes = chunk_bytes * 2
+        for frame in range(3):
+            self.tilemap.layers.get('base').autotile_frame = frame
+            self.assertSameImage((0, 0, 240, 160))
+        # Only the images of the two most recent autotile frames are kept
+        self.assertEqual(self.tilemap.chunk_cache_bytes, chunk_bytes * 2)
+        self.assertEqual([key[2] for key in self.tilemap.chunk_cache], [(1,), (2,)])
+        # Thrown away images are made again when they are needed
+        self.tilemap.layers.get('base').autotile_frame = 0
+        self.assertSameImage((0, 0, 240, 160))
+        self.assertEqual([key[2] for key in self.tilemap.chunk_cache], [(2,), (0,)])
+
+        self.tilemap.clear_chunk_cache()
+        self.assertEqual(self.tilemap.chunk_cache_bytes, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -93,3 +93,42 @@ class TurnwheelTests(unittest.TestCase):
         self.assertTrue(type(action_groups[0]) == ActionLog.Move)
         self.assertEqual(6, action_groups[0].begin)
         self.assertEqual(9, action_groups[0].end)
+
+    def test_last_lock(self):
+        action_log = ActionLog()
+        for act in [action.Action(), action.LockTurnwheel(True), action.Action(), action.Action(),
+                    action.LockTurnwheel(False), action.Action(), action.LockTurnwheel(True), action.Action()]:
+            action_log.append(act)
+        # Without the turnwheel set up, the action log is searched
+        expected = []
+        for action_index in range(-1, len(action_log.actions)):
+            action_log.action_index = action_index
+            expected.append(action_log.get_last_lock())
+        self.assertEqual(expected, [False, False, False, True, True, True, False, False, True])
+
+        action_log.set_up()
+        self.assertTrue(action_log.locked)
+        for action_index in range(-1, len(action_log.actions)):
+            action_log.action_index = action_index
+            self.assertEqual(action_log.get_last_lock(), expected[action_index + 1])
+
+    def test_save_restore(self):
+        action_log = ActionLog()
+        for act in [action.MarkPhase('player'), action.LockTurnwheel(True), action.Action(),
+                    action.MarkActionGroupEnd('free'), action.LockTurnwheel(False)]:
+            action_log.append(act)
+        action_log.set_first_free_action()
+        action_log.stop_recording()
+
+        serial = action_log.save()
+        restored = ActionLog.restore(serial)
+        self.assertEqual([act.save() for act in restored.actions], [act.save() for act in action_log.actions])
+        self.assertEqual(restored.action_index, action_log.action_index)
+        self.assertEqual(restored._first_free_action, action_log._first_free_action)
+        self.assertFalse(restored.is_recording())
+
+        # Older saves stored every action in its serialized form
+        old_serial = ([act.save() for act in action_log.actions], action_log._first_free_action, action_log.record)
+        restored = ActionLog.restore(old_serial)
+        self.assertEqual([act.save() for act in restored.actions], [act.save() for act in action_log.actions])
+        self.assertEqual(restored.action_index, action_log.action_index)
@@ -191,5 +191,27 @@ class UnitObjectUnitTests(unittest.TestCase):
         skill_calls = [call(110), call(120)]
         self.game.get_skill.assert_has_calls(skill_calls)
 
+    def test_skill_hook_table(self):
+        from app.engine.objects.skill import SkillObject
+        from app.engine.skill_components.combat2_components import Vantage
+        from app.utilities.data import Data
+        unit = self.db_unit
+        self.assertEqual(unit.get_skill_hook_implementers('vantage'), [])
+
+        vantage = Vantage()
+        skill = SkillObject('Vantage', 'Vantage', '', components=Data([vantage]))
+        unit.add_skill(skill)
+        self.assertEqual(unit.get_skill_hook_implementers('vantage'), [(skill, vantage)])
+
+        # Components added after the skill is given to the unit are found too
+        other = Vantage()
+        other.nid = 'other_vantage'
+        skill.components.append(other)
+        SkillObject.components_changed()
+        self.assertEqual(unit.get_skill_hook_implementers('vantage'), [(skill, vantage), (skill, other)])
+
+        unit.remove_skill(skill, None)
+        self.assertEqual(unit.get_skill_hook_implementers('vantage'), [])
+
 if __name__ == '__main__':
     unittest.main()
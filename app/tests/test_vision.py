@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.data.serialization.versions import CURRENT_SERIALIZATION_VERSION
+from app.engine.bresenham_line_algorithm import get_line
+from app.engine.game_board import GameBoard
+from app.utilities import utils
+
+class VisionEngineTests(unittest.TestCase):
+    def setUp(self):
+        from app.data.database.database import DB
+        DB.load('testing_proj.ltproj', CURRENT_SERIALIZATION_VERSION)
+        tilemap = MagicMock(name='tilemap')
+        tilemap.width = 12
+        tilemap.height = 10
+        self.board = GameBoard(tilemap)
+        self.vision = self.board.vision
+        self.walls = {(4, 2), (4, 3), (4, 4), (7, 6), (8, 6)}
+        for pos in self.walls:
+            self.board.opacity_grid.insert(pos, True)
+        self.board.opacity_changed()
+
+    def simple_check(self, pos, vantage_points, default_range):
+        # Brute force version of line_of_sight.simple_check
+        return any(s_pos == pos or (utils.calculate_distance(pos, s_pos) <= default_range + extra_range and
+                                    get_line(s_pos, pos, self.board.get_opacity))
+                   for s_pos, extra_range in vantage_points)
+
+    def all_positions(self):
+        return [(x, y) for x in range(self.board.width) for y in range(self.board.height)]
+
+    def test_fog_of_war_grid(self):
+        self.vision.set_sight('a', 'player', (2, 3), 2, 0)
+        grid = self.board.fog_of_war_grids['player']
+        for pos in self.all_positions():
+            self.assertEqual('a' in grid.get(pos), utils.calculate_distance(pos, (2, 3)) <= 2, pos)
+
+        # Only the difference changes when the unit moves
+        self.vision.set_sight('a', 'player', (3, 3), 2, 0)
+        for pos in self.all_positions():
+            self.assertEqual('a' in grid.get(pos), utils.calculate_distance(pos, (3, 3)) <= 2, pos)
+
+        self.vision.set_sight('a', 'player', None, 2, 0)
+        self.assertFalse(any('a' in grid.get(pos) for pos in self.all_positions()))
+
+        # Changing teams takes vision away from the old team
+        self.vision.set_sight('a', 'player', (3, 3), 2, 0)
+        self.vision.set_sight('a', 'enemy', (3, 3), 2, 0)
+        self.assertFalse(any('a' in grid.get(pos) for pos in self.all_positions()))
+        self.assertIn('a', self.board.fog_of_war_grids['enemy'].get((3, 4)))
+
+    def test_line_of_sight(self):
+        self.vision.set_sight('a', 'player', (2, 3), 3, 1)
+        self.vision.set_sight('b', 'player', (9, 8), 2, 0)
+        self.vision.set_sight('c', 'enemy', (6, 3), 2, 0)
+        vantage_points = [((2, 3), 1), ((9, 8), 0)]
+        for default_range in (0, 2, 4):
+            for pos in self.all_positions():
+                self.assertEqual(self.vision.in_line_of_sight(pos, 'player', default_range),
+                                 self.simple_check(pos, vantage_points, default_range), (pos, default_range))
+
+        # Layers are kept up to date as units move
+        self.vision.set_sight('a', 'player', (5, 3), 3, 1)
+        vantage_points = [((5, 3), 1), ((9, 8), 0)]
+        for pos in self.all_positions():
+            self.assertEqual(self.vision.in_line_of_sight(pos, 'player', 2),
+                             self.simple_check(pos, vantage_points, 2), pos)
+
+        # And when the map changes
+        self.board.opacity_grid.insert((4, 3), False)
+        self.board.opacity_changed()
+        self.assertTrue(self.vision.in_line_of_sight((3, 3), 'player', 2))
+
+    def test_los_table(self):
+        table = self.vision.los_table
+        positions = self.all_positions()
+        for _ in range(2):  # The second time, from the tables
+            for source in positions:
+                for dest in positions:
+                    self.assertEqual(table.has_line(source, dest), get_line(source, dest, self.board.get_opacity), (source, dest))
+
+        # Only the tables that checked lines through a position whose opacity changed are thrown away
+        table.tables.clear()
+        table.has_line((11, 0), (10, 0))
+        far_entry = table.tables[(11, 0)]
+        table.has_line((5, 5), (5, 9))
+        self.board.opacity_grid.insert((5, 7), True)
+        self.board.opacity_changed((5, 7))
+        self.assertNotIn((5, 5), table.tables)
+        self.assertIs(table.tables[(11, 0)], far_entry)
+        for dest in positions:
+            self.assertEqual(table.has_line((5, 5), dest), get_line((5, 5), dest, self.board.get_opacity), dest)
+            self.assertEqual(table.has_line(dest, (5, 8)), get_line(dest, (5, 8), self.board.get_opacity), dest)
@@ -0,0 +1,101 @@
+"""
+Compares the size and load time of a saved action log
+pickled as tuples (how it used to be saved) against action_codec.
+
+Usage: python -m app.utilities.action_log_benchmark [save_file]
+
+Without a save file, a made up action log of a long chapter is used.
+"""
+import io
+import pickle
+import random
+import sys
+import time
+import zlib
+
+from app.engine import action_codec, save_store
+
+def make_actions(num: int = 5000, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    units = ['Eirika', 'Seth', 'Franz', 'Gilliam', 'Vanessa', 'Moulder'] + ['Soldier%d' % i for i in range(20)]
+    actions = []
+    for _ in range(num):
+        unit = ('unit', rng.choice(units))
+        pos = (rng.randrange(30), rng.randrange(20))
+        roll = rng.random()
+        if roll < 0.3:
+            path = [(pos[0] + i, pos[1]) for i in range(rng.randrange(1, 8))]
+            actions.append(('Move', {'unit': unit, 'old_pos': ('generic', pos), 'new_pos': ('generic', path[-1]),
+                                     'prev_movement_left': ('generic', 5), 'new_movement_left': ('generic', None),
+                                     'path': ('list', [('generic', p) for p in path]), 'has_moved': ('generic', False),
+                                     'event': ('generic', False), 'follow': ('generic', True),
+                                     'speed': ('generic', 20), 'silent': ('generic', False)}))
+        elif roll < 0.6:
+            old_hp = rng.randrange(1, 40)
+            actions.append(('ChangeHP', {'unit': unit, 'num': ('generic', -rng.randrange(1, 20)),
+                                         'old_hp': ('generic', old_hp)}))
+        elif roll < 0.8:
+            actions.append(('SetObjData', {'obj': ('item', rng.randrange(100, 400)), 'keyword': ('generic', 'uses'),
+                                           'value': ('generic', rng.randrange(40)), 'old_value': ('generic', rng.randrange(40))}))
+        elif roll < 0.9:
+            actions.append(('Wait', {'unit': unit, 'action_state': ('generic', (True, True, True, False, False)),
+                                     'update_fow_action': ('action', ('UpdateFogOfWar', {'unit': unit, 'prev_pos': ('generic', pos)}))}))
+        else:
+            actions.append(('AddSkill', {'unit': unit, 'skill_obj': ('skill', rng.randrange(100, 900)),
+                                         'initiator': ('generic', None), 'source': ('generic', 'Vulnerary'),
+                                         'source_type': ('generic', 'item'), 'reset_skill_data': ('generic', True)}))
+    return actions
+
+def time_it(func, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def encode_records(actions: list) -> tuple:
+    encoder = action_codec.ActionEncoder()
+    return [encoder.encode(action) for action in actions], encoder.schemas
+
+def run(actions: list):
+    records, schemas = encode_records(actions)
+    assert [action_codec.expand(record, schemas) for record in records] == actions
+
+    pickled = pickle.dumps(actions)
+    pickled_zlib = zlib.compress(pickled)
+    pickled_records = pickle.dumps((records, schemas))
+    encoded = action_codec.encode_actions(actions, compress=False)
+    encoded_zlib = action_codec.encode_actions(actions)
+    assert action_codec.decode_actions(encoded_zlib) == actions
+
+    def read_records(data):
+        reader = action_codec.ActionLogReader(io.BytesIO(data))
+        return list(reader.iter_records()), reader.schemas
+
+    print("%d actions, %d schemas" % (len(actions), len(schemas)))
+    print("Load times are to get back to what ActionLog.restore reads (tuples or records)")
+    print("%-22s %10s %12s %12s" % ('', 'bytes', 'save (ms)', 'load (ms)'))
+    rows = [('pickled tuples', pickled, lambda: pickle.dumps(actions), lambda: pickle.loads(pickled)),
+            ('pickled tuples + zlib', pickled_zlib, lambda: zlib.compress(pickle.dumps(actions)),
+             lambda: pickle.loads(zlib.decompress(pickled_zlib))),
+            ('pickled records', pickled_records, lambda: pickle.dumps((records, schemas)),
+             lambda: pickle.loads(pickled_records)),
+            ('codec', encoded, lambda: action_codec.encode_actions(actions, compress=False),
+             lambda: read_records(encoded)),
+            ('codec + zlib', encoded_zlib, lambda: action_codec.encode_actions(actions),
+             lambda: read_records(encoded_zlib))]
+    for name, data, save, load in rows:
+        print("%-22s %10d %12.2f %12.2f" % (name, len(data), time_it(save) * 1000, time_it(load) * 1000))
+    print("%-22s %10s %12.2f" % ('tuples to records', '', time_it(lambda: encode_records(actions)) * 1000))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        serial = save_store.read_save(sys.argv[1])['action_log']
+        if len(serial) == 4:
+            records, _, _, schemas = serial
+            run([action_codec.expand(record, schemas) for record in records])
+        else:
+            run(serial[0])
+    else:
+        run(make_actions())